@@ -6,169 +6,144 @@ if 'SUMO_HOME' in os.environ:
 else:
     sys.exit("please declare environment variable 'SUMO_HOME'")
 
+import numpy as np
 import traci
+import traci.constants as tc
 import sumolib
 
+from flow.utils.scats import SCATSPlans, phase_degree_of_saturation
 
-def get_e1(tl_id, e1_add_file):
+
+def get_e1(e1_add_file):
     """
-    Input: the controlled tl list
+    Input: the additional file defining the E1 detectors
     ---
-    Return e1s, dict <lane:e1.id>
+    Return e1s, dict <lane:e1.id> for all E1 detectors in the file
     """
-    # get the list of lanes which are controlled by the named tl (incoming lanes)
-    lanes = traci.trafficlight.getControlledLanes(tl_id)
     e1s = {}
     for e1 in sumolib.output.parse(e1_add_file, 'e1Detector'):
         # example of e1: <[('file', 'e1output.xml'), ('freq', '120'), ('friendlyPos', 'x'), ('id', 'e1det_-gneE19_0'),
         # ('lane', '-gneE19_0'), ('pos', '183.6')],child_dict={}>
-        if e1.lane in lanes:
-            e1s[e1.lane] = e1.id
+        e1s[e1.lane] = e1.id
     # some instances in e1s: {'-gneE19_0': 'e1det_-gneE19_0', '-gneE25_0': 'e1det_-gneE25_0',
     # '-gneE29_0': 'e1det_-gneE29_0', 'gneE15_0': 'e1det_gneE15_0'}
     return e1s
 
 
-def program_split(each_tl):
-    splits_of_programs = {}
-    duration_of_programs = {}
-    tlLogic = traci.trafficlight.getAllProgramLogics(each_tl)
-    for logic in tlLogic:
-        dura = []
-        cycle_dura = 0
-        for phase in logic.phases:
-            dura.append(phase.duration)
-            cycle_dura += phase.duration
-        splits_of_programs.update({logic.programID: [dura[i] / cycle_dura for i in range(len(dura))]})
-        duration_of_programs.update({logic.programID: cycle_dura})
-    return splits_of_programs, duration_of_programs
-
-
-def occu_info(occu_each_lane, e1s, tl_id):
-    lanes = traci.trafficlight.getControlledLanes(tl_id)
-    avoid_lane_repeated = ""
-    for lane in lanes:
-        if avoid_lane_repeated != lane:
-            occu_each_lane[lane] += (traci.inductionloop.getLastStepOccupancy(e1s[lane]) / 100)  # percentage to float
+def get_tl_info(tl_id, all_e1s):
+    """
+    Load the static information of a tl once, before the simulation runs
+    ---
+    Return a dict with
+    1. lanes: the controlled lanes (incoming lanes), without consecutive repetitions
+    2. e1s: dict <lane:e1.id> for the controlled lanes
+    """
+    # get the list of lanes which are controlled by the named tl (incoming lanes)
+    controlled_lanes = traci.trafficlight.getControlledLanes(tl_id)
+    lanes = [lane for i, lane in enumerate(controlled_lanes) if i == 0 or controlled_lanes[i - 1] != lane]
+    e1s = {lane: e1 for lane, e1 in all_e1s.items() if lane in controlled_lanes}
+    return {"lanes": lanes, "e1s": e1s}
+
+
+def occu_info(occu_each_lane, tl_info, occupancy):
+    for lane in tl_info["lanes"]:
+        occu_each_lane[lane] += occupancy[tl_info["e1s"][lane]] / 100  # percentage to float
         # accumulate for the phase
-        avoid_lane_repeated = lane
     return occu_each_lane
 
 
-def construct_DS(tl_ids):
-    DS_each_phase = {}
+def subscribe(tl_ids, tl_info):
+    """Subscribe to the data needed at every step, which is then fetched along with each simulation step"""
+    traci.simulation.subscribe([tc.VAR_TIME, tc.VAR_MIN_EXPECTED_VEHICLES])
     for each_tl in tl_ids:
-        DS_each_phase.update({each_tl: {}})
-        tlLogic = traci.trafficlight.getAllProgramLogics(each_tl)
-        # (Logic(programID='0', type=0, currentPhaseIndex=0, phases=(Phase(duration=42.0, state='GGgrrrGGgrrr',
-        # minDur=42.0, maxDur=42.0, next=()), Phase(duration=3.0, state='yyyrrryyyrrr', minDur=3.0, maxDur=3.0,
-        # next=()), Phase(duration=42.0, state='rrrGGgrrrGGg', minDur=42.0, maxDur=42.0, next=()), Phase(duration=3.0,
-        # state='rrryyyrrryyy', minDur=3.0, maxDur=3.0, next=())), subParameter={}),)
-        i = 0  # add index to phase
-        for logic in tlLogic:
-            if logic.programID == traci.trafficlight.getProgram(each_tl):
-                for phase in logic.phases:
-                    DS_each_phase[each_tl][i] = 0
-            i += 1
-    return DS_each_phase
-
-
-def is_a_cycle(phase_count, tl_id):
-    tlLogic = traci.trafficlight.getAllProgramLogics(tl_id)
-    for logic in tlLogic:
-        if logic.programID == traci.trafficlight.getProgram(tl_id):
-            if len(logic.phases) == phase_count:
-                return True
-    return False
-
-
-def infer_all_candidate(tl_id, DS_each_phase, splits_of_programs, duration_of_programs):
-    DS_this_cycle = sum(DS_each_phase)
-    this_program = traci.trafficlight.getProgram(tl_id)
-    tlLogic = traci.trafficlight.getAllProgramLogics(tl_id)
-    next_program = this_program  # initial
-    DS_next_cycle = DS_this_cycle  # initial
-    for split_id, split_dura in splits_of_programs.items():
-        DS_temp = DS_next_cycle
-        if split_id != this_program:
-            DS_temp = 0
-            for logic in tlLogic:
-                if logic.programID == split_id:
-                    for i in range(len(logic.phases)):
-                        DS_temp += DS_each_phase[i] * splits_of_programs[this_program][i] * duration_of_programs[
-                            this_program] / (splits_of_programs[split_id][i] * duration_of_programs[split_id])
-
-        if DS_next_cycle > DS_temp:
-            DS_next_cycle = DS_temp
-            next_program = split_id
-    return next_program
+        traci.trafficlight.subscribe(each_tl, [tc.TL_NEXT_SWITCH, tc.TL_PHASE_DURATION])
+        for e1 in set(tl_info[each_tl]["e1s"][lane] for lane in tl_info[each_tl]["lanes"]):
+            traci.inductionloop.subscribe(e1, [tc.LAST_STEP_OCCUPANCY])
 
 
 def run(tl_ids, e1_add_file):
-    """Get predefined information
+    """Get predefined information once
     1. the incoming lane (E1 detector) <lane:e1.id> -> tl_id
-    2. the phase split, duration for all predefined signal plans -> infer DS
+    2. the phase durations of all predefined signal plans, compiled for the DS engine
     """
-    tl_lane_pair = {}
-    for each_tl in tl_ids:
-        e1s = get_e1(each_tl, e1_add_file)
-        tl_lane_pair.update({each_tl: e1s})
-
-    tl_program_split = {}
-    tl_program_dura = {}
-    for each_tl in tl_ids:
-        splits_of_programs, duration_of_programs = program_split(each_tl)
-        tl_program_split.update({each_tl: splits_of_programs})
-        tl_program_dura.update({each_tl: duration_of_programs})
+    all_e1s = get_e1(e1_add_file)
+    tl_info = {each_tl: get_tl_info(each_tl, all_e1s) for each_tl in tl_ids}
+    plans = SCATSPlans.from_logics({each_tl: traci.trafficlight.getAllProgramLogics(each_tl) for each_tl in tl_ids})
+    rows = {each_tl: plans.index(each_tl) for each_tl in tl_ids}
 
     """Store information for all controlled tls within a cycle
-    1. DS for each phase in a cycle
-    2. Phase count for each tl
+    1. DS for each phase in a cycle, one row per tl
+    2. Phase count for each tl, 0 during the partial phase before the first switch
     3. occupancy initial setting
     4. last switch time for each tl
+    5. current program of each tl (column in the plans), which is only changed by this controller
     """
 
     # initial cycle
-    DS_each_phase = construct_DS(tl_ids)  # dict, {<tl_id: <phase_index: 0>}
+    DS_each_phase = np.zeros((len(plans.tl_ids), plans.max_phases))
     Phase_count = {each_tl: 0 for each_tl in tl_ids}
     last_switch_time = {each_tl: 0 for each_tl in tl_ids}
+    program = np.zeros(len(plans.tl_ids), dtype=int)
 
     occu_info_all = {}
     for each_tl in tl_ids:
         traci.trafficlight.setProgram(each_tl, "0")
-        occu_info_all.update({each_tl: {lane: 0 for lane in tl_lane_pair[each_tl].keys()}})
-    while traci.simulation.getMinExpectedNumber() > 0:  # terminate until all vehicles complete their trips
-        traci.simulationStep()  # Make a simulation step and simulate up to the given sim time (in seconds).
-        current_time = traci.simulation.getTime()
+        program[rows[each_tl]] = plans.index(each_tl, "0")[1]
+        occu_info_all.update({each_tl: {lane: 0 for lane in tl_info[each_tl]["e1s"].keys()}})
 
+    subscribe(tl_ids, tl_info)
+    min_expected = traci.simulation.getMinExpectedNumber()
+    while min_expected > 0:  # terminate until all vehicles complete their trips
+        traci.simulationStep()  # Make a simulation step and simulate up to the given sim time (in seconds).
+        # all dynamic data of this step, fetched in one batch with the simulation step
+        sim_info = traci.simulation.getSubscriptionResults()
+        tl_states = traci.trafficlight.getAllSubscriptionResults()
+        occupancy = {e1: values[tc.LAST_STEP_OCCUPANCY]
+                     for e1, values in traci.inductionloop.getAllSubscriptionResults().items()}
+        current_time = sim_info[tc.VAR_TIME]
+        min_expected = sim_info[tc.VAR_MIN_EXPECTED_VEHICLES]
+
+        cycle_end = []
         for each_tl in tl_ids:
+            row = rows[each_tl]
             occu_each_lane = occu_info_all[each_tl]
             # next phase, absolute time counting from simulation start
-            next_switch_time = traci.trafficlight.getNextSwitch(each_tl)
+            next_switch_time = tl_states[each_tl][tc.TL_NEXT_SWITCH]
             # just phase switch, this is the first timestep for the current phase
             # or initial time
             if last_switch_time[each_tl] + 1 == current_time or current_time == 0:
                 # green_start_time = current_time
-                occu_each_lane = {lane: 0 for lane in tl_lane_pair[each_tl].keys()}
+                occu_each_lane = {lane: 0 for lane in tl_info[each_tl]["e1s"].keys()}
                 Phase_count[each_tl] += 1
 
             # get traffic info for this timestep and accumulate for the phase
-            occu_each_lane = occu_info(occu_each_lane, tl_lane_pair[each_tl], each_tl)
+            occu_each_lane = occu_info(occu_each_lane, tl_info[each_tl], occupancy)
 
             occu_info_all[each_tl] = occu_each_lane
             if next_switch_time == current_time:
                 last_switch_time[each_tl] = next_switch_time
-                this_phase_dura = traci.trafficlight.getPhaseDuration(each_tl)
-                DS_each_phase[each_tl][Phase_count[each_tl]] = 1 - max(occu_each_lane.values()) / this_phase_dura
-
-                if is_a_cycle(Phase_count[each_tl], each_tl):
+                if Phase_count[each_tl] == 0:
+                    # end of the partial phase before the first switch, not measured
+                    continue
+                this_phase_dura = tl_states[each_tl][tc.TL_PHASE_DURATION]
+                DS_each_phase[row, Phase_count[each_tl] - 1] = phase_degree_of_saturation(
+                    list(occu_each_lane.values()), this_phase_dura)
+
+                if Phase_count[each_tl] == plans.num_phases[row, program[row]]:
                     Phase_count[each_tl] = 0
-                    # if current_time > 20700:
-                    next_program = infer_all_candidate(each_tl, DS_each_phase[each_tl], tl_program_split[each_tl],
-                                                       tl_program_dura[each_tl])
-                    print(current_time, each_tl, traci.trafficlight.getProgram(each_tl), "-->", next_program)
-                    print('--------')
-                    traci.trafficlight.setProgram(each_tl, next_program)
+                    cycle_end.append(each_tl)
+
+        if cycle_end:
+            # select the plans of all tls which reached the end of their cycle at once
+            cycle_rows = [rows[each_tl] for each_tl in cycle_end]
+            next_programs = plans.select(DS_each_phase[cycle_rows], program[cycle_rows], cycle_rows)
+            for each_tl, row, next_program in zip(cycle_end, cycle_rows, next_programs):
+                this_program = plans.program_ids[row][program[row]]
+                next_program_id = plans.program_ids[row][next_program]
+                print(current_time, each_tl, this_program, "-->", next_program_id)
+                print('--------')
+                traci.trafficlight.setProgram(each_tl, next_program_id)
+                program[row] = next_program
 
 
 import optparse
@@ -180,9 +155,16 @@ def get_options():
                         help="scenario name, e.g., center10, center10_closing, center10_SCATS")
     optParse.add_option("--scen_path", type=str, default="../scenarios/UAV/", help="scenario directory")
     optParse.add_option("--nogui", action="store_true", default=False, help="run the commandline version of sumo")
-    optParse.add_option("--noscats", action="store_true", default=False, help="set to implement scats")
+    optParse.add_option("--noscats", action="store_true", default=False,
+                        help="only run the baseline without control, instead of scats")
+    optParse.add_option("--baseline", action="store_true", default=False,
+                        help="run the baseline without control in addition to scats")
     optParse.add_option("--run_num", type=int, default=1,
                         help="run how many times of simulation, and generate the index for output files, emission and tripinfo")
+    optParse.add_option("--seed", type=int, default=0,
+                        help="seed of the first run, the run with index n uses seed + n")
+    optParse.add_option("--num_workers", type=int, default=os.cpu_count(),
+                        help="maximum number of simulations running concurrently")
     options, args = optParse.parse_args()
     return options
 
@@ -201,40 +183,93 @@ def ensure_dir(path):
 
 
 from sumolib import checkBinary
+from concurrent.futures import ProcessPoolExecutor
+import csv
 import time
 
-if __name__ == "__main__":
-    options = get_options()
+CONTROLLED_TLS = ['389279', '659784', 'cluster_389280_434149497', 'cluster_26868380_305313534', '389357',
+                  '12639664']
 
-    if options.nogui:
-        sumoBinary = checkBinary('sumo')
-    else:
-        sumoBinary = checkBinary('sumo-gui')
 
-    n_run = options.run_num
-    scen = options.scen
-    scen_path = options.scen_path
-    output_path = f"../output/{scen}/"
-    ensure_dir(output_path)
+def simulate(sim_run):
+    """
+    Run one simulation, in its own process
+    ---
+    Input: dict describing the run, see get_runs
+    Return a dict summarizing the run
+    """
+    # the output prefix is applied to all output files, including the E1 detector outputs defined next to the
+    # scenario, so that concurrent runs never write to the same file
+    prefix = os.path.basename(os.path.normpath(sim_run["output_path"])) + "_" + str(sim_run["index"]) + "-"
+    summary = {"scats": sim_run["scats"], "index": sim_run["index"], "seed": sim_run["seed"],
+               "tripinfo": os.path.join(sim_run["output_path"], prefix + "tripinfo.xml"), "error": "", "time": 0}
+    start = time.time()
+    try:
+        traci.start([sim_run["sumo_binary"], "-c", sim_run["cfg"], "--seed", str(sim_run["seed"]),
+                     "--output-prefix", prefix,
+                     "--emission-output", os.path.join(sim_run["output_path"], "emission.xml"),
+                     "--tripinfo-output", os.path.join(sim_run["output_path"], "tripinfo.xml")],
+                    numRetries=10, label=prefix)
+        try:
+            if sim_run["scats"]:
+                run(CONTROLLED_TLS, sim_run["e1_add_file"])
+            else:
+                # terminate until all vehicles complete their trips
+                while traci.simulation.getMinExpectedNumber() > 0:
+                    traci.simulationStep()  # Make a simulation step and simulate up to the given sim time (in seconds).
+        finally:
+            traci.close()
+    except Exception as e:
+        summary["error"] = repr(e)
+    summary["time"] = time.time() - start
+    return summary
 
-    for n in range(n_run):
-        if not options.noscats:
-            traci.start([sumoBinary, "-c", scen_path + scen + ".sumocfg", "--emission-output",
-                         output_path + str(n) + "-emission.xml", "--tripinfo-output",
-                         output_path + str(n) + "-tripinfo.xml"], numRetries=10, label=str(time.time()))
 
-            controlled_tls = ['389279', '659784', 'cluster_389280_434149497', 'cluster_26868380_305313534', '389357',
-                              '12639664']
-            run(controlled_tls, "../scenarios/UAV/SCATS/e1.add.xml")
+def get_runs(options, sumo_binary):
+    """
+    Return the description of all runs, each with a deterministic seed and the output directory of its mode
+    1. scats: <output>/<scen>/
+    2. baseline without control: <output>/<scen>_noscats/
+    """
+    modes = []
+    if not options.noscats:
+        modes.append(True)
+    if options.noscats or options.baseline:
+        modes.append(False)
 
-            traci.close()
-        else:
-            traci.start([sumoBinary, "-c", scen_path + scen + ".sumocfg", "--emission-output",
-                         output_path + str(n) + "-emission.xml", "--tripinfo-output",
-                         output_path + str(n) + "-tripinfo.xml"], numRetries=10, label=str(time.time()))
+    runs = []
+    for scats in modes:
+        output_path = ensure_dir(f"../output/{options.scen}/" if scats else f"../output/{options.scen}_noscats/")
+        for n in range(options.run_num):
+            runs.append({"scats": scats, "index": n, "seed": options.seed + n, "output_path": output_path,
+                         "sumo_binary": sumo_binary, "cfg": options.scen_path + options.scen + ".sumocfg",
+                         "e1_add_file": options.scen_path + "SCATS/e1.add.xml"})
+    return runs
 
-            while traci.simulation.getMinExpectedNumber() > 0:  # terminate until all vehicles complete their trips
-                traci.simulationStep()  # Make a simulation step and simulate up to the given sim time (in seconds).
 
-            traci.close()
+def write_summary(summaries, file_name):
+    with open(file_name, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["scats", "index", "seed", "time", "tripinfo", "error"])
+        writer.writeheader()
+        writer.writerows(summaries)
+
+
+if __name__ == "__main__":
+    options = get_options()
+
+    if options.nogui:
+        sumoBinary = checkBinary('sumo')
+    else:
+        sumoBinary = checkBinary('sumo-gui')
 
+    runs = get_runs(options, sumoBinary)
+    # each run is a separate sumo instance, driven by its own worker process
+    with ProcessPoolExecutor(max_workers=max(1, min(options.num_workers, len(runs)))) as pool:
+        summaries = list(pool.map(simulate, runs))
+
+    summary_file = f"../output/{options.scen}_runs.csv"
+    write_summary(summaries, summary_file)
+    failed = [summary for summary in summaries if summary["error"]]
+    print(f"{len(summaries) - len(failed)}/{len(summaries)} runs completed, summary written to {summary_file}")
+    for summary in failed:
+        print("run", summary["index"], "scats" if summary["scats"] else "noscats", "failed:", summary["error"])
@@ -1,7 +1,11 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+import merge_timeseries
+import results_cache
+
 
 def toFloat(list_):
 	list = []
@@ -11,9 +15,36 @@ def toFloat(list_):
 	return list
 
 
-def main(hue_list):
-	# csv file to store number of running veh for compared methods
-	df = pd.read_csv('./compare_UAVTime.csv')  # example here
+def running_vehicles(emission_file):
+	"""
+	Number of running vehicles at every timestep, from the columnar cache of an emission file, see results_cache
+
+	Parameters
+	----------
+	emission_file: str, path to the -emission.xml file
+
+	Returns
+	-------
+	running: numpy array, number of vehicles at every second since the first timestep with vehicles
+	"""
+	time = results_cache.read_columns(emission_file, ['time'])['time']
+	if not len(time):
+		return np.zeros(0)
+	return np.bincount(np.floor(time - time.min()).astype(int)).astype(float)
+
+
+def main(hue_list, emission_files=None, timeseries_files=None):
+	if timeseries_files:
+		# number of running veh for compared methods, from the time series saved by flow, {hue: list of paths},
+		# see merge_timeseries.py
+		df = merge_timeseries.merge_runs({each: timeseries_files[each] for each in hue_list}, 'running')
+	elif emission_files:
+		# number of running veh for compared methods, from the emission files, {hue: path}
+		running = {each: running_vehicles(emission_files[each]) for each in hue_list}
+		df = pd.DataFrame({each: pd.Series(data) for each, data in running.items()})
+	else:
+		# csv file to store number of running veh for compared methods
+		df = pd.read_csv('./compare_UAVTime.csv')  # example here
 
 	print(df)
 
@@ -1,22 +1,21 @@
 import argparse
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import seaborn as sns
 
-if 'SUMO_HOME' in os.environ:
-    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
-    sys.path.append(tools)
-else:
-    sys.exit("please declare environment variable 'SUMO_HOME'")
+import results_cache
+import xml_recovery
 
-import sumolib
+# attributes of the trips used for the evaluation
+TRIPINFO_COLUMNS = ['id', 'duration', 'routeLength', 'fuel_abs', 'CO2_abs']
 
 
-def choose_files(path, scenario, avg_num, recover_bool):
+def choose_files(path, scenario, avg_num, recover_bool, num_workers=None):
     """
     Choose the corresponding output files for multiple simulation episodes, tripinfo files included as default
 
@@ -26,6 +25,7 @@ def choose_files(path, scenario, avg_num, recover_bool):
     scenario: str, scenario name
     avg_num: int, how many episodes to get the average, default is 8
     recover_bool: bool, whether to calibrate output file format
+    num_workers: int, maximum number of processes recovering the files, default is the number of cpus
 
     Returns
     -------
@@ -34,68 +34,84 @@ def choose_files(path, scenario, avg_num, recover_bool):
     file_num = 0
     related_file_list = []  # except for tripinfo file, such as ['-emission.xml', '-queue.xml', '_emission.csv']
     file_dict = {'-tripinfo.xml': []}
+    recover_files = []
     scenarios_list = os.listdir(path)
     if scenario in scenarios_list:
         dir_path = os.path.join(path, scenario)
         for file in os.listdir(dir_path):
             if file.endswith('tripinfo.xml'):
-                if recover_bool:
-                    recover_xml(dir_path + '/' + file)
+                recover_files.append(dir_path + '/' + file)
                 file_dict['-tripinfo.xml'].append(file)
                 file_num += 1
 
                 file_suffix = file.split('-tripinfo')[0]
                 for each in related_file_list:
                     file_name = file_suffix + each
-                    if recover_bool:
-                        recover_xml(dir_path + '/' + file)
-                    file_dict[each].append(file_name)
+                    if file_name.endswith('.xml'):
+                        recover_files.append(dir_path + '/' + file_name)
+                    file_dict.setdefault(each, []).append(file_name)
             if file_num == avg_num:
                 break
+    if recover_bool:
+        xml_recovery.recover_files(recover_files, num_workers)
     print('Evaluated files:', file_dict['-tripinfo.xml'])
     return file_dict
 
 
-def recover_xml(file_path):
-    """ Recovers incomplete output xml files written during the simulation,
-    closing tag element is probably missing when simulation terminates """
-    cmd = "xmllint --valid " + file_path + " --recover --output " + file_path
-    print()
-    print('-----')
-    print('Recover the xml file')
-    os.system(cmd)
+def read_tripinfo(file_path, cache=True):
+    """
+    Read the attributes of the trips used for the evaluation from a tripinfo file, through its columnar cache, see
+    results_cache
+
+    Parameters
+    ----------
+    file_path: str, path to the tripinfo file
+    cache: bool, whether to use the cache, otherwise the file is parsed
+
+    Returns
+    -------
+    trips: dict, {attribute: numpy array}, with the attributes id, duration, routeLength, fuel_abs and CO2_abs of
+        every trip in the file, in the order of the file
+    """
+    return results_cache.read_columns(file_path, TRIPINFO_COLUMNS, cache=cache)
+
+
+def read_tripinfos(file_paths, num_workers=None, cache=True):
+    """
+    Read several tripinfo files at once with a pool of processes, see read_tripinfo
 
+    Parameters
+    ----------
+    file_paths: list, paths to the tripinfo files
+    num_workers: int, maximum number of processes, default is the number of cpus
+    cache: bool, whether to use the cache of the files
+
+    Returns
+    -------
+    trips_list: list, trips of every file, in the order of file_paths
+    """
+    if len(file_paths) <= 1 or num_workers == 1:
+        return [read_tripinfo(file_path, cache) for file_path in file_paths]
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        return list(pool.map(read_tripinfo, file_paths, [cache] * len(file_paths)))
 
-def get_main_metric(tripinfo_files, path, speed_limit):
+
+def get_main_metric(tripinfo_files, path, speed_limit, trips_list=None, num_workers=None, cache=True):
     print()
     print('---------')
     print(path.split('/')[-1])
-    fuel = [0] * len(tripinfo_files)
-    CO2 = [0] * len(tripinfo_files)
-    duration = [0] * len(tripinfo_files)
-    all_trip_length = []
-    finished_trip_num = []
-    tt_veh = {}  # {veh_id: [travel_time_i]}
-    for i in range(0, len(tripinfo_files)):
-        trip_length = {}  # {trip length(m): vehicle count}
-        for trip in sumolib.output.parse(path + '/' + tripinfo_files[i], ['tripinfo']):
-            duration[i] += float(trip.duration)  # sum of travel time
-            # travel time for individual vehicles
-            if trip.id not in tt_veh.keys():
-                tt_veh.update({trip.id: [float(trip.duration)]})
-            else:
-                tt_veh[trip.id].append(float(trip.duration))
-
-            fuel[i] += float(trip['emissions'][0].fuel_abs)
-            CO2[i] += float(trip['emissions'][0].CO2_abs)
-
-            triplength = float(trip.routeLength)
-            if trip_length.get(triplength):
-                trip_length[triplength] += 1
-            else:
-                trip_length.update({triplength: 1})
-        all_trip_length.append(sum(triplength * num for triplength, num in trip_length.items()))
-        finished_trip_num.append(sum(num for num in trip_length.values()))  # only finished trip in tripinfo file
+    if trips_list is None:
+        trips_list = read_tripinfos([path + '/' + file for file in tripinfo_files], num_workers, cache)
+
+    fuel = [trips['fuel_abs'].sum() for trips in trips_list]
+    CO2 = [trips['CO2_abs'].sum() for trips in trips_list]
+    duration = [trips['duration'].sum() for trips in trips_list]  # sum of travel time
+    all_trip_length = [trips['routeLength'].sum() for trips in trips_list]
+    finished_trip_num = [len(trips['id']) for trips in trips_list]  # only finished trip in tripinfo file
+    tt_veh = {}  # {veh_id: [travel_time_i]}, travel time for individual vehicles
+    for trips in trips_list:
+        for veh_id, veh_duration in zip(trips['id'], trips['duration'].tolist()):
+            tt_veh.setdefault(veh_id, []).append(veh_duration)
 
     # get average value and convert unit
     avg_all_trip_length = np.mean(all_trip_length)
@@ -109,7 +125,15 @@ def get_main_metric(tripinfo_files, path, speed_limit):
     return fuel, CO2, duration, tt_veh
 
 
-def have_df_metric(scen_file_dict, path_dir, speed_limit, scenarios_legend):
+def have_df_metric(scen_file_dict, path_dir, speed_limit, scenarios_legend, num_workers=None, cache=True):
+    # read the tripinfo files of all scenarios at once, in parallel
+    file_paths = {scenario: [path_dir + '/' + scenario + '/' + file for file in files['-tripinfo.xml']]
+                  for scenario, files in scen_file_dict.items()}
+    all_trips = read_tripinfos(sum(file_paths.values(), []), num_workers, cache)
+    trips_dict = {}
+    for scenario, paths in file_paths.items():
+        trips_dict[scenario], all_trips = all_trips[:len(paths)], all_trips[len(paths):]
+
     avg_fuel = []
     avg_CO2 = []
     avg_dura = []
@@ -119,7 +143,7 @@ def have_df_metric(scen_file_dict, path_dir, speed_limit, scenarios_legend):
     scen_tag = []
     for scenario in scen_file_dict.keys():
         fuel, CO2, duration, travelt = get_main_metric(scen_file_dict[scenario]['-tripinfo.xml'],
-                                                              path_dir + '/' + scenario, speed_limit)
+                                                       path_dir + '/' + scenario, speed_limit, trips_dict[scenario])
         avg_fuel.append(fuel)
         avg_CO2.append(CO2)
         avg_dura.append(duration)
@@ -182,6 +206,14 @@ def parse_args(args):
         '--recover', type=bool, default=False,
         help='About xml.etree.ElementTree.ParseError, set to True')
 
+    parser.add_argument(
+        '--num_workers', type=int, default=None,
+        help='Maximum number of processes recovering and reading the output files, default is the number of cpus.')
+
+    parser.add_argument(
+        '--no_cache', action='store_true', default=False,
+        help='Parse the output files instead of reading their columnar cache, see results_cache.py.')
+
     return parser.parse_known_args(args)[0]
 
 
@@ -197,9 +229,11 @@ def main(args):
         # choose some scenarios for assessment
         scen_file_dict = {}
         for scenario in scenarios_list:
-            scen_file_dict.update({scenario: choose_files(path_dir, scenario, avg_num, recover_bool)})
+            scen_file_dict.update({scenario: choose_files(path_dir, scenario, avg_num, recover_bool,
+                                                          flags.num_workers)})
         # show the main metric results, CO2 emissions, fuel consumption, and travel time
-        have_df_metric(scen_file_dict, path_dir, speed_limit, scenarios_legend)
+        have_df_metric(scen_file_dict, path_dir, speed_limit, scenarios_legend, flags.num_workers,
+                       not flags.no_cache)
 
 
     else:
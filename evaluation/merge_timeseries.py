@@ -0,0 +1,136 @@
+"""
+Merge the time series recorded by flow during several runs into a single table, e.g. to draw the number of running
+vehicles of compared methods with draw_runningveh.py
+
+The time series of a run are saved by the simulation kernel of flow when SumoParams(timeseries_path=...) is set, as a
+numpy .npz archive with the time, the number of running vehicles (running), the number of vehicles in the network or
+waiting to depart (min_expected), the mean speed (mean_speed) and the number of halting vehicles (halting) at every
+step. The runs are aligned on the time since their first step, resampled to a common period, and the runs of the same
+method are averaged.
+
+python merge_timeseries.py --runs Original=../output/original AVARS=../output/avars --column running
+"""
+import argparse
+import glob
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# suffix of the time series files saved by flow
+TIMESERIES_SUFFIX = '_timeseries.npz'
+
+
+def read_timeseries(file_path):
+    """ Time series of a run, {series name: numpy array} """
+    with np.load(file_path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def find_files(path):
+    """ Time series files of a directory, or of a glob pattern, sorted by name """
+    if os.path.isdir(path):
+        path = os.path.join(path, '*' + TIMESERIES_SUFFIX)
+    return sorted(glob.glob(path))
+
+
+def resample(time, values, period=1.):
+    """
+    Average a time series over consecutive periods since its first step
+
+    Parameters
+    ----------
+    time: numpy array, time of every step, in seconds
+    values: numpy array, value at every step
+    period: float, duration of the periods, in seconds
+
+    Returns
+    -------
+    resampled: numpy array, mean value in every period, NaN for periods without any step
+    """
+    if not len(time):
+        return np.zeros(0)
+    bins = np.floor((time - time[0]) / period + 1e-6).astype(int)
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    counts = np.bincount(bins[valid], minlength=bins[-1] + 1)
+    sums = np.bincount(bins[valid], weights=values[valid], minlength=bins[-1] + 1)
+    return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def merge_runs(run_files, column='running', period=1.):
+    """
+    Align the time series of several runs of several methods
+
+    Parameters
+    ----------
+    run_files: dict, {method: list of paths to the time series files of its runs}
+    column: str, name of the series to merge
+    period: float, duration of the periods the series are resampled to, in seconds
+
+    Returns
+    -------
+    df: pandas DataFrame, one column per method, with the mean value over its runs in every period, indexed by the
+        time since the start of the runs in seconds. Methods whose runs are shorter are padded with NaN
+    """
+    merged = {}
+    for method, file_paths in run_files.items():
+        runs = []
+        for file_path in file_paths:
+            series = read_timeseries(file_path)
+            runs.append(resample(series['time'], series[column], period))
+        if not runs:
+            raise ValueError('No time series file for "{}".'.format(method))
+        table = np.full((len(runs), max(len(run) for run in runs)), np.nan)
+        for row, run in enumerate(runs):
+            table[row, :len(run)] = run
+        counts = (~np.isnan(table)).sum(axis=0)
+        merged[method] = pd.Series(np.where(counts > 0, np.nansum(table, axis=0) / np.maximum(counts, 1), np.nan))
+    df = pd.DataFrame(merged)
+    df.index = df.index * period
+    return df
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Merge the time series of several runs of several methods into a csv file.",
+        epilog="python merge_timeseries.py --runs Original=../output/original AVARS=../output/avars")
+
+    # necessary
+    parser.add_argument(
+        '--runs', nargs='+',
+        help='The runs of every method, as method=directory or method=glob pattern of the time series files.')
+
+    # optional
+    parser.add_argument(
+        '--column', type=str, default='running',
+        help='The series to merge: running, min_expected, mean_speed or halting.')
+
+    parser.add_argument(
+        '--period', type=float, default=1.,
+        help='Duration of the periods the series are resampled to, in seconds.')
+
+    parser.add_argument(
+        '--output', type=str, default='./compare_UAVTime.csv',
+        help='The csv file storing the merged series, read by draw_runningveh.py.')
+
+    return parser.parse_known_args(args)[0]
+
+
+def main(args):
+    flags = parse_args(args)
+    if not flags.runs:
+        raise ValueError("Unable to find necessary options: --runs.")
+    run_files = {}
+    for runs in flags.runs:
+        method, _, path = runs.partition('=')
+        run_files[method] = find_files(path)
+    df = merge_runs(run_files, flags.column, flags.period)
+    df.to_csv(flags.output, index=False)
+    print(df.describe())
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
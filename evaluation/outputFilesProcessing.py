@@ -1,14 +1,11 @@
 import os
+import re
 import sys
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-if 'SUMO_HOME' in os.environ:
-    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
-    sys.path.append(tools)
-else:
-    sys.exit("please declare environment variable 'SUMO_HOME'")
-
-import sumolib
+import results_cache
+import xml_recovery
 
 
 def del_small_file(dir_path, file, file_path, file_size):
@@ -44,28 +41,32 @@ def del_small_file(dir_path, file, file_path, file_size):
         return True
 
 
-def del_not_complete_file(dir_path, file, file_path, horizon):
+TIMESTEP_PATTERN = re.compile(rb'<timestep time="([^"]*)"')
+
+
+def emission_last_time(file_path):
+    """
+    Check an emission file, repairing it if it was truncated, and return the time of its last timestep, None if it has
+    no timestep
+    """
+    xml_recovery.recover_xml(file_path)
+    with open(file_path, 'rb') as f:
+        _, match = xml_recovery.rfind_in_file(f, TIMESTEP_PATTERN)
+    return float(match.group(1)) if match is not None else None
+
+
+def del_not_complete_file(dir_path, file, file_path, horizon, last_time=None):
     related_file_list = ['-tripinfo.xml', '-queue.xml', '_emission.csv', '-ssm.xml']
 
     if file.endswith('emission.xml'):
-        try:
-            content = list(sumolib.output.parse(file_path, ['timestep']))
-        except:
-            recover_xml(file_path)  # unclose tag in xml
-            content = list(sumolib.output.parse(file_path, ['timestep']))
-
-        last_timestep = content[-1]
-        if not last_timestep.time:  # last: "<timestep/>"
-            for i in range(-2, -len(content), -1):
-                last_timestep = content[i]
-                if float(last_timestep.time):
-                    break
-
-        if float(last_timestep.time) < horizon:
+        if last_time is None:
+            last_time = emission_last_time(file_path)
+
+        if last_time is None or last_time < horizon:
             os.remove(file_path)
             print()
             print('----------------------')
-            print(last_timestep.time, '< Horizon, remove:', file)
+            print(last_time, '< Horizon, remove:', file)
             file_suffix = file.split('-emission.xml')[0]
             for each in related_file_list:
                 file_name = file_suffix + each
@@ -76,21 +77,10 @@ def del_not_complete_file(dir_path, file, file_path, horizon):
                     print('Not exist:', file_name)
 
 
-def recover_xml(file_path):
-    cmd = "xmllint --valid " + file_path + " --recover --output " + file_path
-    print()
-    print('-----')
-    print('Recover the xml file')
-    os.system(cmd)
-
-
-def recover_all(path, scenario):
+def recover_all(path, scenario, num_workers=None):
     scen_path = os.path.join(path, scenario)
-    for eachFile in os.listdir(scen_path):
-        if eachFile.endswith('_emission.csv'):
-            pass
-        else:
-            recover_xml(scen_path + "/" + eachFile)
+    xml_recovery.recover_files([scen_path + "/" + eachFile for eachFile in os.listdir(scen_path)
+                                if eachFile.endswith('.xml')], num_workers)
 
 
 def del_old_file(scen_path, save_dura):
@@ -107,18 +97,26 @@ def del_old_file(scen_path, save_dura):
             print('Remove too old file:', eachFile)
 
 
-def remove_unfinished_file(path, scenario, horizon, file_size, save_dura, del_old):
+def remove_unfinished_file(path, scenario, horizon, file_size, save_dura, del_old, num_workers=None):
     scenarios_list = os.listdir(path)
     if scenario in scenarios_list:
         dir_path = os.path.join(path, scenario)
         if del_old:
             del_old_file(dir_path, save_dura)
+        emission_files = []
         for file in os.listdir(dir_path):
+            if results_cache.is_cache_file(file):
+                continue  # rebuilt if the output file changes
             file_path = dir_path + '/' + file
             if del_small_file(dir_path, file, file_path, file_size):
                 pass
-            else:
-                del_not_complete_file(dir_path, file, file_path, horizon)
+            elif file.endswith('emission.xml'):
+                emission_files.append(file)
+        # check the emission files in parallel, then remove the incomplete ones with their related files
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
+            last_times = list(pool.map(emission_last_time, [dir_path + '/' + file for file in emission_files]))
+        for file, last_time in zip(emission_files, last_times):
+            del_not_complete_file(dir_path, file, dir_path + '/' + file, horizon, last_time)
         print()
         print('Delete files with incomplete information')
         print('----')
@@ -158,6 +156,10 @@ def parse_args(args):
         help='Delete old files, please use once for any scenarios, because the last modified time of emission csv '
              'file does not be updated after using this script, default=False.')
 
+    parser.add_argument(
+        '--num_workers', type=int, default=None,
+        help='Maximum number of processes checking and recovering the output files, default is the number of cpus.')
+
     return parser.parse_known_args(args)[0]
 
 
@@ -170,8 +172,8 @@ def main(args):
         file_size = flags.file_min * 1024
         save_dura = flags.save_duration
         del_old = flags.del_old
-        remove_unfinished_file(path_dir, scenario, horizon, file_size, save_dura, del_old)
-        recover_all(path_dir, scenario)
+        remove_unfinished_file(path_dir, scenario, horizon, file_size, save_dura, del_old, flags.num_workers)
+        recover_all(path_dir, scenario, flags.num_workers)
     else:
         raise ValueError("Unable to find necessary options: --scen, and --horizon.")
 
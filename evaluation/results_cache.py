@@ -0,0 +1,219 @@
+"""
+Columnar cache of the sumo output files used for the evaluation
+
+Every sumo xml output file is converted once into a column store next to it, e.g. x-tripinfo.xml ->
+x-tripinfo.xml.parquet, which is rebuilt whenever the size or the modification time of the xml file changes. The
+evaluation scripts then only read the columns and rows they need from the cache. The cache is stored as parquet if
+pyarrow is installed, and as an uncompressed numpy .npz archive otherwise, with str columns dictionary encoded.
+"""
+import os
+import xml.parsers.expat
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+CACHE_SUFFIX = '.parquet' if pa is not None else '.npz'
+
+# version of the cache format, caches of other versions are rebuilt
+CACHE_VERSION = 1
+
+# {output file suffix: (tag of a row, tag of the parent element whose attributes are added to its rows, tags of the
+# child elements whose attributes are added to the row of their parent)}
+OUTPUT_RECORDS = {
+    '-tripinfo.xml': ('tripinfo', None, ['emissions']),
+    '-emission.xml': ('vehicle', 'timestep', []),
+}
+
+# attributes always stored as str, even if their values look like numbers, e.g. the vehicle id "108_3.75"
+STR_ATTRIBUTES = {'id', 'eclass', 'route', 'type', 'vType', 'lane', 'edge', 'departLane', 'arrivalLane', 'devices',
+                  'vaporized'}
+
+# prefix of the categories of the str columns of .npz caches, which store the index of the category of every row
+CATEGORIES_PREFIX = '__categories__'
+
+# comparison operators of the row filters
+FILTER_OPS = {
+    '==': np.equal,
+    '!=': np.not_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    'in': lambda column, value: np.isin(column, list(value)),
+    'not in': lambda column, value: ~np.isin(column, list(value)),
+}
+
+
+def is_cache_file(file_name):
+    """ Whether a file is a cache file, which is not a sumo output file """
+    return file_name.endswith(CACHE_SUFFIX)
+
+
+def cache_path(file_path):
+    """ Path to the cache of a sumo output file """
+    return file_path + CACHE_SUFFIX
+
+
+def source_key(file_path):
+    """ Key identifying the content of a file, its size and modification time, and the version of the cache """
+    stat = os.stat(file_path)
+    return '{}:{}:{}'.format(CACHE_VERSION, stat.st_size, stat.st_mtime_ns)
+
+
+def parse_output(file_path):
+    """
+    Parse a sumo output file into columns, streaming the file with a SAX parser
+
+    Parameters
+    ----------
+    file_path: str, path to the output file, whose suffix is one of OUTPUT_RECORDS
+
+    Returns
+    -------
+    columns: dict, {attribute: numpy array}, with one row per row element of the file, in the order of the file.
+        Numeric attributes are stored as float, NaN if missing, other attributes as str
+    """
+    suffix = [suffix for suffix in OUTPUT_RECORDS if file_path.endswith(suffix)]
+    if not suffix:
+        raise ValueError('Unknown sumo output file "{}", the supported outputs are {}.'.format(
+            file_path, list(OUTPUT_RECORDS)))
+    row_tag, parent_tag, child_tags = OUTPUT_RECORDS[suffix[0]]
+
+    columns = {}  # {attribute: list of values}
+    num_rows = [0]
+    parent_attrs = {}
+
+    def add_values(attrs, row):
+        for attribute, value in attrs.items():
+            if attribute not in columns:
+                columns[attribute] = [None] * num_rows[0]
+            values = columns[attribute]
+            values.extend([None] * (row + 1 - len(values)))
+            values[row] = value
+
+    def start_element(name, attrs):
+        if name == row_tag:
+            num_rows[0] += 1
+            add_values(parent_attrs, num_rows[0] - 1)
+            add_values(attrs, num_rows[0] - 1)
+        elif name in child_tags and num_rows[0]:
+            add_values(attrs, num_rows[0] - 1)
+        elif name == parent_tag:
+            parent_attrs.clear()
+            parent_attrs.update(attrs)
+
+    parser = xml.parsers.expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start_element
+    with open(file_path, 'rb') as f:
+        parser.ParseFile(f)
+
+    for attribute, values in columns.items():
+        values.extend([None] * (num_rows[0] - len(values)))
+        try:
+            if attribute in STR_ATTRIBUTES:
+                raise ValueError
+            columns[attribute] = np.array([np.nan if value is None else value for value in values], dtype=float)
+        except ValueError:
+            columns[attribute] = np.array(['' if value is None else value for value in values], dtype=str)
+    return columns
+
+
+def write_cache(file_path, columns, key):
+    """ Write the columns of a sumo output file to its cache, replacing the previous cache atomically """
+    path = cache_path(file_path)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    if pa is not None:
+        table = pa.table({attribute: pa.array(values) for attribute, values in columns.items()})
+        table = table.replace_schema_metadata({'source_key': key})
+        pq.write_table(table, tmp_path)
+    else:
+        arrays = {}
+        for attribute, values in columns.items():
+            if values.dtype.kind == 'U':
+                categories, values = np.unique(values, return_inverse=True)
+                arrays[CATEGORIES_PREFIX + attribute] = categories
+            arrays[attribute] = values
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, __source_key__=np.array(key), **arrays)
+    os.replace(tmp_path, path)
+
+
+def cached_key(file_path):
+    """ Key of the sumo output file the cache was built from, None if there is no cache """
+    path = cache_path(file_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        if pa is not None:
+            return (pq.read_schema(path).metadata or {}).get(b'source_key', b'').decode()
+        with np.load(path) as data:
+            return str(data['__source_key__'])
+    except Exception:
+        return None  # unreadable cache, rebuilt
+
+
+def update_cache(file_path):
+    """
+    Convert a sumo output file to its cache, unless the cache is up to date
+
+    Returns
+    -------
+    path: str, path to the cache
+    """
+    key = source_key(file_path)
+    if cached_key(file_path) != key:
+        write_cache(file_path, parse_output(file_path), key)
+    return cache_path(file_path)
+
+
+def read_columns(file_path, columns=None, filters=None, cache=True):
+    """
+    Read some columns of a sumo output file, from its cache
+
+    Parameters
+    ----------
+    file_path: str, path to the sumo output file
+    columns: list, attributes to read, default is all of them
+    filters: list, conditions (attribute, operator, value) that all the rows read must satisfy, e.g.
+        [('time', '>=', 600)], with the operators of FILTER_OPS
+    cache: bool, whether to use the cache, otherwise the output file is parsed
+
+    Returns
+    -------
+    data: dict, {attribute: numpy array}, with str attributes as arrays of objects
+    """
+    filters = list(filters or [])
+    if cache and pa is not None:
+        table = pq.read_table(update_cache(file_path), columns=columns, filters=filters or None)
+        return {attribute: table.column(attribute).to_numpy(zero_copy_only=False) for attribute in table.column_names}
+
+    if cache:
+        data = np.load(update_cache(file_path))
+    else:
+        data = parse_output(file_path)
+    try:
+        def column(name):
+            if CATEGORIES_PREFIX + name in data:
+                return data[CATEGORIES_PREFIX + name][data[name]]
+            return data[name]
+
+        if columns is None:
+            columns = [name for name in data if name != '__source_key__' and not name.startswith(CATEGORIES_PREFIX)]
+        mask = None
+        for attribute, op, value in filters:
+            condition = FILTER_OPS[op](column(attribute), value)
+            mask = condition if mask is None else mask & condition
+        result = {}
+        for name in columns:
+            values = column(name) if mask is None else column(name)[mask]
+            result[name] = np.array(values.tolist(), dtype=object) if values.dtype.kind == 'U' else values
+        return result
+    finally:
+        if cache:
+            data.close()
@@ -0,0 +1,156 @@
+"""
+Recovery of the xml output files of sumo truncated when the simulation terminates, replacing xmllint --recover
+
+A file is complete if it ends with the closing tag of its root element, which only requires reading its head and its
+tail. Truncated files are streamed once with a SAX parser to find the elements still open where the file ends, then
+their incomplete last element is cut and the missing closing tags are appended in place.
+"""
+import os
+import re
+import xml.parsers.expat
+from concurrent.futures import ProcessPoolExecutor
+
+# size of the blocks read from the output files
+BLOCK_SIZE = 1 << 16
+
+
+class _RootFound(Exception):
+    pass
+
+
+def rfind_in_file(f, pattern, end=None):
+    """
+    Find the last match of a pattern in a binary file, reading blocks backwards from its end, so that only the tail
+    of the file is read
+
+    Parameters
+    ----------
+    f: file, opened in binary mode
+    pattern: compiled bytes regex, whose matches are shorter than BLOCK_SIZE
+    end: int, the match must end before this offset, default is the end of the file
+
+    Returns
+    -------
+    (offset, match): offset of the match in the file and the match, (None, None) if there is no match
+    """
+    if end is None:
+        end = f.seek(0, os.SEEK_END)
+    position = end
+    buffer = b''
+    while position > 0:
+        start = max(0, position - BLOCK_SIZE)
+        f.seek(start)
+        # keep the head of the previous block, in case a match is split across blocks
+        buffer = f.read(position - start) + buffer[:BLOCK_SIZE]
+        matches = list(pattern.finditer(buffer))
+        if matches:
+            return start + matches[-1].start(), matches[-1]
+        position = start
+    return None, None
+
+
+def root_tag(f):
+    """ Tag of the root element of an xml file opened in binary mode, None if there is no element """
+    tag = []
+
+    def start_element(name, attrs):
+        tag.append(name)
+        raise _RootFound
+
+    parser = xml.parsers.expat.ParserCreate()
+    parser.StartElementHandler = start_element
+    f.seek(0)
+    try:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            parser.Parse(block, not block)
+            if not block:
+                break
+    except (_RootFound, xml.parsers.expat.ExpatError):
+        pass
+    return tag[0] if tag else None
+
+
+def is_complete(file_path):
+    """ Whether an xml file ends with the closing tag of its root element """
+    with open(file_path, 'rb') as f:
+        tag = root_tag(f)
+        if tag is None:
+            return False
+        end = f.seek(0, os.SEEK_END)
+        f.seek(max(0, end - BLOCK_SIZE))
+        tail = f.read().rstrip()
+    return tail.endswith('</{}>'.format(tag).encode())
+
+
+def recover_xml(file_path):
+    """
+    Repair an xml file truncated when the simulation terminated, in place: the incomplete last element is cut, and
+    the closing tags of the elements still open are appended. Complete files are left unchanged, as well as files
+    which are not well-formed before their end
+
+    Returns
+    -------
+    recovered: bool, whether the file was repaired
+    """
+    if is_complete(file_path):
+        return False
+
+    stack = []
+    parser = xml.parsers.expat.ParserCreate()
+    parser.StartElementHandler = lambda name, attrs: stack.append(name)
+    parser.EndElementHandler = lambda name: stack.pop()
+    with open(file_path, 'r+b') as f:
+        try:
+            while True:
+                block = f.read(BLOCK_SIZE)
+                parser.Parse(block, not block)
+                if not block:
+                    return False  # well-formed, e.g. with a self-closing root element
+        except xml.parsers.expat.ExpatError:
+            pass
+        error_index = parser.ErrorByteIndex
+        end = f.seek(0, os.SEEK_END)
+
+        # only the incomplete last element may follow the error, otherwise the file is corrupted, not truncated
+        if not stack or b'>' in _read(f, error_index, end):
+            print()
+            print('-----')
+            print('Unable to recover the xml file:', file_path)
+            return False
+        # cut the file after the last complete tag
+        tag_end, _ = rfind_in_file(f, re.compile(rb'>'), error_index)
+        f.seek(tag_end + 1)
+        f.truncate()
+        indent = '    '
+        f.write(('\n' + ''.join('{}</{}>\n'.format(indent * depth, tag)
+                                for depth, tag in reversed(list(enumerate(stack))))).encode())
+    print()
+    print('-----')
+    print('Recover the xml file:', file_path)
+    return True
+
+
+def _read(f, start, end):
+    """ Read the bytes of a binary file between two offsets """
+    f.seek(start)
+    return f.read(end - start)
+
+
+def recover_files(file_paths, num_workers=None):
+    """
+    Recover several xml files at once with a pool of processes, see recover_xml
+
+    Parameters
+    ----------
+    file_paths: list, paths to the xml files
+    num_workers: int, maximum number of processes, default is the number of cpus
+
+    Returns
+    -------
+    recovered: list, whether every file was repaired
+    """
+    if len(file_paths) <= 1 or num_workers == 1:
+        return [recover_xml(file_path) for file_path in file_paths]
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        return list(pool.map(recover_xml, file_paths))
@@ -40,6 +40,7 @@ flow_params = dict(
         render=False,
         sim_step=1,
         restart_instance=True,
+        trip_metrics=True,
         emission_path="{}/output/AVARS_dqn".format(ABS_DIR)
     ),
 
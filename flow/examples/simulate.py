@@ -49,6 +49,11 @@ def parse_args(args):
         action='store_true',
         help='Specifies whether to generate an emission file from the '
              'simulation.')
+    parser.add_argument(
+        '--trip_metrics',
+        action='store_true',
+        help='Specifies whether to collect the metrics of the trips of '
+             'vehicles during the simulation, e.g. the average travel time.')
 
     return parser.parse_known_args(args)[0]
 
@@ -68,6 +73,8 @@ if __name__ == "__main__":
 
     flow_params['sim'].render = not flags.no_render
     flow_params['simulator'] = 'aimsun' if flags.aimsun else 'traci'
+    if flags.trip_metrics:
+        flow_params['sim'].trip_metrics = True
 
     # If Aimsun is being called, replace SumoParams with AimsunParams.
     if flags.aimsun:
@@ -15,7 +15,7 @@ from copy import deepcopy
 
 from flow.core.util import ensure_dir
 from flow.utils.registry import env_constructor
-from flow.utils.rllib import FlowParamsEncoder, get_flow_params
+from flow.utils.rllib import FlowParamsEncoder, get_flow_params, on_episode_end
 from flow.utils.registry import make_create_env
 
 
@@ -153,6 +153,7 @@ def setup_exps_rllib(flow_params,
     config["kl_target"] = 0.02
     config["num_sgd_iter"] = 10
     config["horizon"] = horizon
+    config["callbacks"] = {"on_episode_end": tune.function(on_episode_end)}
 
     # save the flow params for replay
     flow_json = json.dumps(
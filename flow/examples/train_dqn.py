@@ -11,7 +11,7 @@ import json
 import sys
 from copy import deepcopy
 
-from flow.utils.rllib import FlowParamsEncoder
+from flow.utils.rllib import FlowParamsEncoder, on_episode_end
 from flow.utils.registry import make_create_env
 
 
@@ -104,6 +104,7 @@ def setup_exps_rllib(flow_params,
     config["exploration_fraction"] = 0.05
     config["model"].update({"fcnet_hiddens": [32, 32, 32]})
     config["horizon"] = horizon
+    config["callbacks"] = {"on_episode_end": tune.function(on_episode_end)}
     config["timesteps_per_iteration"] = horizon * n_rollouts
     config["num_gpus"] = 1
 
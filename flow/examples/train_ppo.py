@@ -11,7 +11,7 @@ import json
 import sys
 from copy import deepcopy
 
-from flow.utils.rllib import FlowParamsEncoder
+from flow.utils.rllib import FlowParamsEncoder, on_episode_end
 from flow.utils.registry import make_create_env
 
 
@@ -107,6 +107,7 @@ def setup_exps_rllib(flow_params,
     config["kl_target"] = 0.02
     config["num_sgd_iter"] = 10
     config["horizon"] = horizon
+    config["callbacks"] = {"on_episode_end": tune.function(on_episode_end)}
     config["num_gpus"] = 1
     config["timesteps_per_iteration"] = horizon * n_rollouts
     config['no_done_at_end'] = True
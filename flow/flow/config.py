@@ -4,12 +4,19 @@ import os
 
 PYTHON_COMMAND = "python"
 
-SUMO_SLEEP = 1.0  # Delay between initializing SUMO and connecting with TraCI
+# maximum time to wait for SUMO to accept the TraCI connection, in seconds
+SUMO_START_TIMEOUT = 100.0
 
 PROJECT_PATH = osp.abspath(osp.join(osp.dirname(__file__), '..'))
 
 LOG_DIR = PROJECT_PATH + "/data"
 
+# directory used to store files that are expensive to regenerate, e.g. the
+# post-warmup simulation states of an environment. It is private to the user,
+# as the files stored in it are unpickled
+CACHE_DIR = os.environ.get(
+    "FLOW_CACHE_DIR", osp.join(osp.expanduser("~"), ".cache", "flow"))
+
 # users set both of these in their bash_rc or bash_profile
 # and also should run aws configure after installing awscli
 AWS_ACCESS_KEY = os.environ.get("AWS_ACCESS_KEY", None)
@@ -100,7 +100,9 @@ class Experiment:
         Returns
         -------
         info_dict : dict < str, Any >
-            contains returns, average speed per step
+            contains returns, average speed per step, and the metrics of the
+            trips of every run if the simulator collects them, see the
+            get_trip_metrics method of the simulation kernel
         """
         num_steps = self.env.env_params.horizon
 
@@ -165,6 +167,9 @@ class Experiment:
             info_dict["outflows"].append(outflow)
             for key in custom_vals.keys():
                 info_dict[key].append(np.mean(custom_vals[key]))
+            trip_metrics = self.env.k.simulation.get_trip_metrics() or {}
+            for key, value in trip_metrics.items():
+                info_dict.setdefault(key, []).append(value)
 
             print("Round {0}, return: {1}".format(i, ret))
 
@@ -175,6 +180,8 @@ class Experiment:
 
         # Print the averages/std for all variables in the info_dict.
         for key in info_dict.keys():
+            if np.ndim(info_dict[key]) > 1:
+                continue  # e.g. the travel time histograms
             print("Average, std {}: {}, {}".format(
                 key, np.mean(info_dict[key]), np.std(info_dict[key])))
 
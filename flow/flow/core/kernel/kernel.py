@@ -98,10 +98,31 @@ class Kernel(object):
             step
         """
         self.vehicle.update(reset)
-        self.traffic_light.update(reset)
         self.network.update(reset)
+        self.traffic_light.update(reset)
         self.simulation.update(reset)
 
+    def get_snapshot(self):
+        """Return the state of the kernel subclasses that is not stored by the simulator.
+
+        See flow.envs.Env.warmup.
+        """
+        return {
+            "simulation": self.simulation.get_snapshot(),
+            "vehicle": self.vehicle.get_snapshot(),
+            "traffic_light": self.traffic_light.get_snapshot(),
+        }
+
+    def restore_snapshot(self, snapshot):
+        """Restore a state returned by `get_snapshot`.
+
+        This is called once the state of the simulation it was taken with is
+        loaded, and the kernel api is passed again.
+        """
+        self.simulation.restore_snapshot(snapshot["simulation"])
+        self.vehicle.restore_snapshot(snapshot["vehicle"])
+        self.traffic_light.restore_snapshot(snapshot["traffic_light"])
+
     def close(self):
         """Terminate all components within the simulation and network."""
         self.network.close()
@@ -187,6 +187,102 @@ class BaseKernelNetwork(object):
         """
         raise NotImplementedError
 
+    def subscribe_lanes(self, lane_ids):
+        """Collect the state of the given lanes at every simulation step.
+
+        Parameters
+        ----------
+        lane_ids : list of str
+            names of the lanes, as "edge_laneindex"
+        """
+        raise NotImplementedError
+
+    def get_lane_num_vehicles(self, lane_id, error=-1001):
+        """Return the number of vehicles on a subscribed lane.
+
+        Parameters
+        ----------
+        lane_id : str or list of str
+            name(s) of the lane(s), see `subscribe_lanes`
+        error : any, optional
+            value returned if the lane is not subscribed to
+
+        Returns
+        -------
+        int or list of int
+        """
+        raise NotImplementedError
+
+    def get_lane_mean_speed(self, lane_id, error=-1001):
+        """Return the mean speed of the vehicles on a subscribed lane.
+
+        If the lane is empty, the speed limit of the lane is returned.
+
+        Parameters
+        ----------
+        lane_id : str or list of str
+            name(s) of the lane(s), see `subscribe_lanes`
+        error : any, optional
+            value returned if the lane is not subscribed to
+
+        Returns
+        -------
+        float or list of float
+        """
+        raise NotImplementedError
+
+    def get_lane_num_halting(self, lane_id, error=-1001):
+        """Return the number of halting vehicles on a subscribed lane.
+
+        Vehicles are halting if their speed is below 0.1 m/s.
+
+        Parameters
+        ----------
+        lane_id : str or list of str
+            name(s) of the lane(s), see `subscribe_lanes`
+        error : any, optional
+            value returned if the lane is not subscribed to
+
+        Returns
+        -------
+        int or list of int
+        """
+        raise NotImplementedError
+
+    def get_lane_occupancy(self, lane_id, error=-1001):
+        """Return the occupancy of a subscribed lane.
+
+        Parameters
+        ----------
+        lane_id : str or list of str
+            name(s) of the lane(s), see `subscribe_lanes`
+        error : any, optional
+            value returned if the lane is not subscribed to
+
+        Returns
+        -------
+        float or list of float
+            share of the length of the lane covered by vehicles, in [0, 1]
+        """
+        raise NotImplementedError
+
+    def get_lane_vehicle_ids(self, lane_id, error=None):
+        """Return the names of the vehicles on a subscribed lane.
+
+        Parameters
+        ----------
+        lane_id : str or list of str
+            name(s) of the lane(s), see `subscribe_lanes`
+        error : any, optional
+            value returned if the lane is not subscribed to, defaults to an
+            empty tuple
+
+        Returns
+        -------
+        tuple of str or list of tuple of str
+        """
+        raise NotImplementedError
+
     def next_edge(self, edge, lane):
         """Return the next edge/lane pair from the given edge/lane.
 
@@ -1,15 +1,18 @@
 """Script containing the TraCI network kernel class."""
 import tempfile
+from bisect import bisect_right
+from itertools import repeat
 
 from flow.core.kernel.network import BaseKernelNetwork
-from flow.core.util import makexml, printxml, ensure_dir
+from flow.core.util import makexml, printxml, ensure_dir, read_cached
 import time
 import os
 import subprocess
-import xml.etree.ElementTree as ElementTree
 from lxml import etree
 from copy import deepcopy
 import random
+import numpy as np
+import traci.constants as tc
 
 E = etree.Element
 
@@ -18,6 +21,15 @@ RETRIES_ON_ERROR = 10
 # number of seconds to wait before trying to access the .net.xml file again
 WAIT_ON_ERROR = 1
 
+# lane variables collected for the lanes passed to `subscribe_lanes`
+LANE_SUBSCRIPTIONS = [
+    tc.LAST_STEP_VEHICLE_NUMBER,
+    tc.LAST_STEP_MEAN_SPEED,
+    tc.LAST_STEP_VEHICLE_HALTING_NUMBER,
+    tc.LAST_STEP_OCCUPANCY,
+    tc.LAST_STEP_VEHICLE_ID_LIST,
+]
+
 
 def _flow(name, vtype, route, **kwargs):
     return E('flow', id=name, route=route, type=vtype, **kwargs)
@@ -84,6 +96,10 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         self.rts = None
         self.cfg = None
 
+        # lanes whose state is collected at every step, and their state
+        self._subscribed_lanes = []
+        self.__lane_obs = {}
+
     def generate_network(self, network, emission_path):
         """See parent class.
 
@@ -191,6 +207,16 @@ class TraCIKernelNetwork(BaseKernelNetwork):
 
         self.total_edgestarts_dict = dict(self.total_edgestarts)
 
+        # sorted start positions of the above edges, used to find the edge of
+        # absolute positions with a binary search, as a list for single
+        # positions and as an array for vectors of positions
+        self._edgestart_ids = [edge for edge, _ in self.total_edgestarts]
+        self._edgestart_pos = [pos for _, pos in self.total_edgestarts]
+        self._edgestart_array = np.array(self._edgestart_pos, dtype=float)
+        # index of every edge in the above, used to find the start of the
+        # edges of vectors of positions
+        self._edgestart_index = {edge: i for i, edge in enumerate(self._edgestart_ids)}
+
         self.__length = sum(
             self._edges[edge_id]['length'] for edge_id in self._edges
         )
@@ -214,9 +240,75 @@ class TraCIKernelNetwork(BaseKernelNetwork):
 
         return random_num
 
+    def pass_api(self, kernel_api):
+        """See parent class.
+
+        Also renews the subscriptions of the lanes in `subscribe_lanes`, as
+        these are lost whenever sumo is restarted.
+        """
+        super(TraCIKernelNetwork, self).pass_api(kernel_api)
+        self.__lane_obs = {}
+        for lane_id in self._subscribed_lanes:
+            self.kernel_api.lane.subscribe(lane_id, LANE_SUBSCRIPTIONS)
+
     def update(self, reset):
-        """Perform no action of value (networks are static)."""
-        pass
+        """See parent class.
+
+        The network is static, so only the state of the subscribed lanes is
+        collected.
+        """
+        if self._subscribed_lanes:
+            self.__lane_obs = self.kernel_api.lane.getAllSubscriptionResults()
+
+    def subscribe_lanes(self, lane_ids):
+        """See parent class.
+
+        The state of all lanes is retrieved from sumo in a single call.
+        """
+        for lane_id in lane_ids:
+            if lane_id not in self._subscribed_lanes:
+                self._subscribed_lanes.append(lane_id)
+                if self.kernel_api is not None:
+                    self.kernel_api.lane.subscribe(lane_id, LANE_SUBSCRIPTIONS)
+        if self.kernel_api is not None:
+            self.__lane_obs = self.kernel_api.lane.getAllSubscriptionResults()
+
+    def get_lane_num_vehicles(self, lane_id, error=-1001):
+        """See parent class."""
+        if isinstance(lane_id, (list, np.ndarray)):
+            return [self.get_lane_num_vehicles(lane, error) for lane in lane_id]
+        return self.__lane_obs.get(lane_id, {}).get(
+            tc.LAST_STEP_VEHICLE_NUMBER, error)
+
+    def get_lane_mean_speed(self, lane_id, error=-1001):
+        """See parent class."""
+        if isinstance(lane_id, (list, np.ndarray)):
+            return [self.get_lane_mean_speed(lane, error) for lane in lane_id]
+        return self.__lane_obs.get(lane_id, {}).get(
+            tc.LAST_STEP_MEAN_SPEED, error)
+
+    def get_lane_num_halting(self, lane_id, error=-1001):
+        """See parent class."""
+        if isinstance(lane_id, (list, np.ndarray)):
+            return [self.get_lane_num_halting(lane, error) for lane in lane_id]
+        return self.__lane_obs.get(lane_id, {}).get(
+            tc.LAST_STEP_VEHICLE_HALTING_NUMBER, error)
+
+    def get_lane_occupancy(self, lane_id, error=-1001):
+        """See parent class."""
+        if isinstance(lane_id, (list, np.ndarray)):
+            return [self.get_lane_occupancy(lane, error) for lane in lane_id]
+        return self.__lane_obs.get(lane_id, {}).get(
+            tc.LAST_STEP_OCCUPANCY, error)
+
+    def get_lane_vehicle_ids(self, lane_id, error=None):
+        """See parent class."""
+        if error is None:
+            error = ()
+        if isinstance(lane_id, (list, np.ndarray)):
+            return [self.get_lane_vehicle_ids(lane, error) for lane in lane_id]
+        return self.__lane_obs.get(lane_id, {}).get(
+            tc.LAST_STEP_VEHICLE_ID_LIST, error)
 
     def close(self):
         """Close the network class.
@@ -249,28 +341,74 @@ class TraCIKernelNetwork(BaseKernelNetwork):
                 continue
 
     def get_edge(self, x):
-        """See parent class."""
-        for (edge, start_pos) in reversed(self.total_edgestarts):
-            if x >= start_pos:
-                return edge, x - start_pos
+        """See parent class.
+
+        The edge is found with a binary search on the sorted edge starts. If x
+        is a list or array of positions, the edges of all of them are found at
+        once and a list of tuples is returned. None is returned for positions
+        before the start of the first edge.
+        """
+        if isinstance(x, (list, np.ndarray)):
+            x = np.asarray(x, dtype=float)
+            indices = np.searchsorted(self._edgestart_array, x, side='right') - 1
+            rel_pos = x - self._edgestart_array[np.maximum(indices, 0)]
+            return [(self._edgestart_ids[i], pos) if i >= 0 else None
+                    for i, pos in zip(indices.tolist(), rel_pos.tolist())]
+
+        i = bisect_right(self._edgestart_pos, x) - 1
+        if i >= 0:
+            return self._edgestart_ids[i], x - self._edgestart_pos[i]
 
     def get_x(self, edge, position):
-        """See parent class."""
+        """See parent class.
+
+        If edge and position are lists or arrays, the absolute positions of
+        all of the pairs are computed at once and returned as an array.
+        """
+        if isinstance(edge, (list, np.ndarray)):
+            indices = np.fromiter(map(self._edgestart_index.get, edge, repeat(-1)), dtype=int, count=len(edge))
+            starts = self._edgestart_array[indices]
+            # whether the position on the edge is added to its start
+            relative = indices >= 0
+            # edges without a start of their own, e.g. internal links which
+            # are generalized for by a single element
+            for i in np.flatnonzero(~relative).tolist():
+                starts[i], relative[i] = self._edge_start(edge[i])
+            return np.where(relative, starts + np.asarray(position, dtype=float), starts)
+
+        start, relative = self._edge_start(edge)
+        return start + position if relative else start
+
+    def _edge_start(self, edge):
+        """Return the absolute position of the start of an edge.
+
+        Parameters
+        ----------
+        edge : str
+            name of the edge
+
+        Returns
+        -------
+        float
+            start of the edge
+        bool
+            whether the position on the edge is to be added to the start
+        """
         # if there was a collision which caused the vehicle to disappear,
         # return an x value of -1001
         if len(edge) == 0:
-            return -1001
+            return -1001, False
 
         if edge[0] == ':':
             try:
-                return self.internal_edgestarts_dict[edge] + position
+                return self.internal_edgestarts_dict[edge], True
             except KeyError:
                 # in case several internal links are being generalized for
                 # by a single element (for backwards compatibility)
                 edge_name = edge.rsplit('_', 1)[0]
-                return self.total_edgestarts_dict.get(edge_name, -1001)
+                return self.total_edgestarts_dict.get(edge_name, -1001), False
         else:
-            return self.total_edgestarts_dict[edge] + position
+            return self.total_edgestarts_dict[edge], True
 
     def edge_length(self, edge_id):
         """See parent class."""
@@ -811,10 +949,17 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         cfg = makexml('configuration',
                       'http://sumo.dlr.de/xsd/sumoConfiguration.xsd')
 
+        # additional files of the network template, e.g. E1 detectors, are
+        # loaded along with the traffic lights
+        add = [self.addfn]
+        if isinstance(net_params.template, dict):
+            template_add = net_params.template.get('add', [])
+            add += [template_add] if isinstance(template_add, str) else list(template_add)
+
         cfg.append(
             _inputs(
                 net=self.netfn,
-                add=self.addfn,
+                add=','.join(add),
                 rou=self.roufn,
                 gui=self.guifn))
         t = E('time')
@@ -849,60 +994,85 @@ class TraCIKernelNetwork(BaseKernelNetwork):
                     Element = list of edge/lane pairs preceding or following
                     the edge/lane pairs
         """
-        # import the .net.xml file containing all edge/type data
-        parser = etree.XMLParser(recover=True)
         net_path = os.path.join(self.cfg_path, self.netfn) \
             if net_params.template is None else self.netfn
-        tree = ElementTree.parse(net_path, parser=parser)
-        root = tree.getroot()
-
-        # Collect information on the available types (if any are available).
-        # This may be used when specifying some edge data.
-        types_data = dict()
-
-        for typ in root.findall('type'):
-            type_id = typ.attrib['id']
+        # the edges of a net file are read once, and then from a cache keyed
+        # by the content of the file
+        return read_cached('net', net_path, read_net)
+
+
+def read_net(net_path):
+    """Import the edges and connections of a sumo net file in a single pass.
+
+    The file is streamed, and every element is cleared once it is read, so
+    that the tree of the file is never held in memory.
+
+    Parameters
+    ----------
+    net_path : str
+        path to the .net.xml file
+
+    Returns
+    -------
+    net_data : dict <dict>
+        Key = name of the edge/junction
+        Element = lanes, speed, length
+    connection_data : dict < dict < list < (edge, pos) > > >
+        Key = "prev" or "next", indicating coming from or to this
+        edge/lane pair
+            Key = name of the edge
+                Key = lane index
+                Element = list of edge/lane pairs preceding or following
+                the edge/lane pairs
+    """
+    # Collect information on the available types (if any are available).
+    # This may be used when specifying some edge data.
+    types_data = dict()
+
+    net_data = dict()
+    next_conn_data = dict()  # forward looking connections
+    prev_conn_data = dict()  # backward looking connections
+
+    for _, elem in etree.iterparse(net_path, events=('end',), tag=['type', 'edge', 'connection'],
+                                   recover=True):
+        parent = elem.getparent()
+        if parent is None or parent.getparent() is not None:
+            # only the top level elements are read
+            continue
+
+        if elem.tag == 'type':
+            type_id = elem.attrib['id']
             types_data[type_id] = dict()
 
-            if 'speed' in typ.attrib:
-                types_data[type_id]['speed'] = float(typ.attrib['speed'])
+            if 'speed' in elem.attrib:
+                types_data[type_id]['speed'] = float(elem.attrib['speed'])
             else:
                 types_data[type_id]['speed'] = None
 
-            if 'numLanes' in typ.attrib:
-                types_data[type_id]['numLanes'] = int(typ.attrib['numLanes'])
+            if 'numLanes' in elem.attrib:
+                types_data[type_id]['numLanes'] = int(elem.attrib['numLanes'])
             else:
                 types_data[type_id]['numLanes'] = None
 
-        net_data = dict()
-        next_conn_data = dict()  # forward looking connections
-        prev_conn_data = dict()  # backward looking connections
-
-        # collect all information on the edges and junctions
-        for edge in root.findall('edge'):
-            edge_id = edge.attrib['id']
+        elif elem.tag == 'edge':
+            # collect all information on the edges and junctions
+            edge_id = elem.attrib['id']
 
             # create a new key for this edge
             net_data[edge_id] = dict()
-
-            # check for speed
-            if 'speed' in edge:
-                net_data[edge_id]['speed'] = float(edge.attrib['speed'])
-            else:
-                net_data[edge_id]['speed'] = None
+            net_data[edge_id]['speed'] = None
 
             # if the edge has a type parameters, check that type for a
             # speed and parameter if one was not already found
-            if 'type' in edge.attrib and edge.attrib['type'] in types_data:
-                if net_data[edge_id]['speed'] is None:
-                    net_data[edge_id]['speed'] = \
-                        float(types_data[edge.attrib['type']]['speed'])
+            if 'type' in elem.attrib and elem.attrib['type'] in types_data:
+                net_data[edge_id]['speed'] = \
+                    float(types_data[elem.attrib['type']]['speed'])
 
             # collect the length from the lane sub-element in the edge, the
             # number of lanes from the number of lane elements, and if needed,
             # also collect the speed value (assuming it is there)
             net_data[edge_id]['lanes'] = 0
-            for i, lane in enumerate(edge):
+            for i, lane in enumerate(elem):
                 net_data[edge_id]['lanes'] += 1
                 if i == 0:
                     net_data[edge_id]['length'] = float(lane.attrib['length'])
@@ -915,36 +1085,31 @@ class TraCIKernelNetwork(BaseKernelNetwork):
             if net_data[edge_id]['speed'] is None:
                 net_data[edge_id]['speed'] = 30
 
-        # collect connection data
-        for connection in root.findall('connection'):
-            from_edge = connection.attrib['from']
-            from_lane = int(connection.attrib['fromLane'])
+        else:
+            # collect connection data
+            from_edge = elem.attrib['from']
+            from_lane = int(elem.attrib['fromLane'])
 
             if from_edge[0] != ":":
                 # if the edge is not an internal link, then get the next
                 # edge/lane pair from the "via" element
-                via = connection.attrib['via'].rsplit('_', 1)
+                via = elem.attrib['via'].rsplit('_', 1)
                 to_edge = via[0]
                 to_lane = int(via[1])
             else:
-                to_edge = connection.attrib['to']
-                to_lane = int(connection.attrib['toLane'])
-
-            if from_edge not in next_conn_data:
-                next_conn_data[from_edge] = dict()
-
-            if from_lane not in next_conn_data[from_edge]:
-                next_conn_data[from_edge][from_lane] = list()
-
-            if to_edge not in prev_conn_data:
-                prev_conn_data[to_edge] = dict()
+                to_edge = elem.attrib['to']
+                to_lane = int(elem.attrib['toLane'])
 
-            if to_lane not in prev_conn_data[to_edge]:
-                prev_conn_data[to_edge][to_lane] = list()
+            next_conn_data.setdefault(from_edge, dict()).setdefault(
+                from_lane, list()).append((to_edge, to_lane))
+            prev_conn_data.setdefault(to_edge, dict()).setdefault(
+                to_lane, list()).append((from_edge, from_lane))
 
-            next_conn_data[from_edge][from_lane].append((to_edge, to_lane))
-            prev_conn_data[to_edge][to_lane].append((from_edge, from_lane))
+        # drop the element, and the elements read before it
+        elem.clear()
+        while elem.getprevious() is not None:
+            del parent[0]
 
-        connection_data = {'next': next_conn_data, 'prev': prev_conn_data}
+    connection_data = {'next': next_conn_data, 'prev': prev_conn_data}
 
-        return net_data, connection_data
+    return net_data, connection_data
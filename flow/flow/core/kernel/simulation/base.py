@@ -80,6 +80,63 @@ class KernelSimulation(object):
         """
         raise NotImplementedError
 
+    def get_trip_metrics(self):
+        """Return the metrics of the trips finished since the last reset.
+
+        Returns
+        -------
+        dict or None
+            metrics of the trips, e.g. their average travel time. None if the
+            simulator does not collect them
+        """
+        return None
+
+    def save_state(self, file_name):
+        """Save the current state of the simulation to a file.
+
+        Parameters
+        ----------
+        file_name : str
+            path to the file the state is written to
+        """
+        raise NotImplementedError
+
+    def load_state(self, file_name):
+        """Replace the current state of the simulation by a stored one.
+
+        Parameters
+        ----------
+        file_name : str
+            path to a file created by `save_state`
+        """
+        raise NotImplementedError
+
+    def get_snapshot(self):
+        """Return the state of the kernel that is not stored by the simulator.
+
+        This is stored along with the state of the simulation in the warm-up
+        snapshots, see flow.envs.Env.warmup.
+
+        Returns
+        -------
+        object
+            a picklable state, which can be passed to `restore_snapshot`
+        """
+        return None
+
+    def restore_snapshot(self, snapshot):
+        """Restore a state returned by `get_snapshot`.
+
+        This is called once the state of the simulation it was taken with is
+        loaded, and the kernel api is passed again.
+
+        Parameters
+        ----------
+        snapshot : object
+            state returned by `get_snapshot`
+        """
+        pass
+
     def close(self):
         """Close the current simulation instance."""
         raise NotImplementedError
@@ -0,0 +1,273 @@
+"""Script containing the streaming recorder of the emission data of vehicles."""
+
+import csv
+import queue
+import threading
+import numpy as np
+
+# name and type of all fields that can be recorded, in their default order
+EMISSION_FIELDS = [
+    ("x", float),
+    ("y", float),
+    ("speed", float),
+    ("headway", float),
+    ("leader_id", object),
+    ("target_accel_with_noise_with_failsafe", float),
+    ("target_accel_no_noise_no_failsafe", float),
+    ("target_accel_with_noise_no_failsafe", float),
+    ("target_accel_no_noise_with_failsafe", float),
+    ("realized_accel", float),
+    ("road_grade", float),
+    ("edge_id", object),
+    ("lane_number", int),
+    ("distance", float),
+    ("relative_position", float),
+    ("follower_id", object),
+    ("leader_rel_speed", float),
+]
+
+# file extension of every output format
+EMISSION_FORMATS = {"csv": "csv", "parquet": "parquet", "arrow": "arrow"}
+
+# (noise, failsafe) arguments of the accelerations of every accel field
+ACCEL_FIELDS = {
+    "target_accel_with_noise_with_failsafe": (True, True),
+    "target_accel_no_noise_no_failsafe": (False, False),
+    "target_accel_with_noise_no_failsafe": (True, False),
+    "target_accel_no_noise_with_failsafe": (False, True),
+}
+
+
+class EmissionRecorder(object):
+    """Record the emission data of vehicles at every step in bounded memory.
+
+    The data of every step is appended to preallocated, typed column chunks.
+    Full chunks are handed to a background thread, which appends them to the
+    output file, so that only a few chunks are held in memory at any time.
+    Rows are written in the order in which they were recorded, i.e. sorted by
+    time. If the same time is recorded several times in a row, e.g. when the
+    simulation is reset, only the last record of that time is kept.
+
+    Supported output formats are "csv", and "parquet" or "arrow" (Arrow IPC),
+    which require pyarrow.
+
+    Attributes
+    ----------
+    file_name : str
+        path to the output file
+    fields : list of str
+        recorded fields, in addition to the time and vehicle id
+    fmt : str
+        output format
+    """
+
+    def __init__(self, file_name, fields=None, fmt="csv", chunk_size=10000):
+        """Instantiate the recorder.
+
+        Parameters
+        ----------
+        file_name : str
+            path to the output file
+        fields : list of str, optional
+            fields to record, see EMISSION_FIELDS. Defaults to all of them
+        fmt : str, optional
+            output format, one of "csv", "parquet" or "arrow"
+        chunk_size : int, optional
+            number of rows held in memory before they are handed over to the
+            writing thread
+        """
+        types = dict(EMISSION_FIELDS)
+        if fields is None:
+            fields = [name for name, _ in EMISSION_FIELDS]
+        for name in fields:
+            if name not in types:
+                raise ValueError('Unknown emission field "{}", must be one of '
+                                 '{}.'.format(name, list(types)))
+        if fmt not in EMISSION_FORMATS:
+            raise ValueError('Unknown emission format "{}", must be one of '
+                             '{}.'.format(fmt, list(EMISSION_FORMATS)))
+
+        self.file_name = file_name
+        self.fields = list(fields)
+        self.fmt = fmt
+        self._types = [("time", float), ("id", object)] + [(name, types[name]) for name in self.fields]
+        self._chunk_size = chunk_size
+        self._chunk = None
+        self._size = 0
+        self._new_chunk()
+        # last record, which is replaced if the same time is recorded again
+        self._pending = None
+
+        # at most a few full chunks wait for the writing thread
+        self._queue = queue.Queue(maxsize=4)
+        self._error = None
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def record(self, time, vehicles):
+        """Record the data of all vehicles in the network.
+
+        Parameters
+        ----------
+        time : float
+            current simulation time
+        vehicles : flow.core.kernel.vehicle.KernelVehicle
+            vehicle kernel
+        """
+        self._raise_error()
+        if self._pending is not None and self._pending[0] != time:
+            self._append(*self._pending)
+        ids = list(vehicles.get_ids())
+        self._pending = (time, self._collect(vehicles, ids) if ids else {}, len(ids))
+
+    def flush(self):
+        """Hand the recorded rows over to the writing thread."""
+        if self._pending is not None:
+            self._append(*self._pending)
+            self._pending = None
+        if self._size > 0:
+            self._queue.put({name: self._chunk[name][:self._size] for name, _ in self._types})
+            self._new_chunk()
+
+    def close(self):
+        """Write all recorded rows and close the output file."""
+        if self._thread is None:
+            return
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._raise_error()
+
+    def _append(self, time, columns, num_vehicles):
+        """Append the rows of a record to the chunks."""
+        start = 0
+        while start < num_vehicles:
+            num_rows = min(num_vehicles - start, self._chunk_size - self._size)
+            for name, _ in self._types:
+                column = time if name == "time" else columns[name][start:start + num_rows]
+                self._chunk[name][self._size:self._size + num_rows] = column
+            self._size += num_rows
+            start += num_rows
+            if self._size == self._chunk_size:
+                self._queue.put({name: self._chunk[name] for name, _ in self._types})
+                self._new_chunk()
+
+    def _collect(self, vehicles, ids):
+        """Return the recorded fields of several vehicles, as numpy arrays."""
+        columns = {"id": np.array(ids, dtype=object)}
+        fields = set(self.fields)
+
+        if fields & {"x", "y"}:
+            positions = vehicles.get_2d_position(ids)
+            columns["x"] = np.array([position[0] for position in positions], dtype=float)
+            columns["y"] = np.array([position[1] for position in positions], dtype=float)
+        if fields & {"speed", "leader_rel_speed"}:
+            columns["speed"] = np.array(vehicles.get_speed(ids), dtype=float)
+        if fields & {"leader_id", "leader_rel_speed"}:
+            columns["leader_id"] = np.array(vehicles.get_leader(ids), dtype=object)
+        if "leader_rel_speed" in fields:
+            columns["leader_rel_speed"] = np.array(
+                vehicles.get_speed(list(columns["leader_id"])), dtype=float) - columns["speed"]
+        if "headway" in fields:
+            columns["headway"] = np.array(vehicles.get_headway(ids), dtype=float)
+        if "follower_id" in fields:
+            columns["follower_id"] = np.array(vehicles.get_follower(ids), dtype=object)
+        for name in fields & set(ACCEL_FIELDS):
+            noise, failsafe = ACCEL_FIELDS[name]
+            columns[name] = np.array(
+                [vehicles.get_accel(veh_id, noise=noise, failsafe=failsafe) for veh_id in ids], dtype=float)
+        if "realized_accel" in fields:
+            columns["realized_accel"] = np.array(
+                [vehicles.get_realized_accel(veh_id) for veh_id in ids], dtype=float)
+        if "road_grade" in fields:
+            columns["road_grade"] = np.array(
+                [vehicles.get_road_grade(veh_id) for veh_id in ids], dtype=float)
+        if "edge_id" in fields:
+            columns["edge_id"] = np.array(vehicles.get_edge(ids), dtype=object)
+        if "lane_number" in fields:
+            columns["lane_number"] = np.array(vehicles.get_lane(ids, error=-1001), dtype=int)
+        if "distance" in fields:
+            columns["distance"] = np.array(vehicles.get_distance(ids), dtype=float)
+        if "relative_position" in fields:
+            columns["relative_position"] = np.array(vehicles.get_position(ids), dtype=float)
+
+        return columns
+
+    def _new_chunk(self):
+        """Allocate the columns of a new chunk."""
+        self._chunk = {name: np.empty(self._chunk_size, dtype=dtype) for name, dtype in self._types}
+        self._size = 0
+
+    def _raise_error(self):
+        """Raise the error of the writing thread, if any."""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _write(self):
+        """Append the chunks handed over by the recorder to the output file."""
+        writer = None
+        try:
+            writer = self._open()
+            while True:
+                chunk = self._queue.get()
+                if chunk is None:
+                    break
+                writer.write(chunk)
+        except Exception as e:
+            self._error = e
+            # keep consuming chunks, so that the recorder never blocks
+            while self._queue.get() is not None:
+                pass
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def _open(self):
+        """Open a writer for the output file."""
+        if self.fmt == "csv":
+            return _CSVWriter(self.file_name, self._types)
+        return _ArrowWriter(self.file_name, self._types, self.fmt)
+
+
+class _CSVWriter(object):
+    """Append column chunks to a csv file."""
+
+    def __init__(self, file_name, types):
+        self._file = open(file_name, "w", newline="")
+        self._names = [name for name, _ in types]
+        self._writer = csv.writer(self._file, delimiter=',')
+        self._writer.writerow(self._names)
+
+    def write(self, chunk):
+        self._writer.writerows(zip(*[chunk[name].tolist() for name in self._names]))
+
+    def close(self):
+        self._file.close()
+
+
+class _ArrowWriter(object):
+    """Append column chunks to a parquet or Arrow IPC file."""
+
+    def __init__(self, file_name, types, fmt):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('pyarrow is needed to write "{}" emission files, '
+                              'install it or use the "csv" format.'.format(fmt))
+        self._pa = pa
+        pa_types = {float: pa.float64(), int: pa.int64(), object: pa.string()}
+        self._schema = pa.schema([(name, pa_types[dtype]) for name, dtype in types])
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(file_name, self._schema)
+        else:
+            self._writer = pa.ipc.new_file(file_name, self._schema)
+
+    def write(self, chunk):
+        arrays = [self._pa.array(chunk[field.name], type=field.type) for field in self._schema]
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
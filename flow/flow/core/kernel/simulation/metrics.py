@@ -0,0 +1,148 @@
+"""Script containing the online aggregation of the trip metrics of vehicles."""
+
+import numpy as np
+
+from flow.core.kernel.vehicle.store import VehicleStateStore
+
+# default bins of the travel time histogram, in seconds
+TRAVEL_TIME_BINS = np.arange(0, 3601, 60)
+
+
+class TripMetrics(object):
+    """Aggregate the metrics of the trips of vehicles during an episode.
+
+    The tripinfo-equivalent values of every vehicle, i.e. the time of its
+    departure, its fuel consumption, CO2 emission and driven distance, are
+    accumulated from the vehicle kernel at every step while it is in the
+    network. When the vehicle arrives, they are added to running sums and to a
+    histogram of travel times, and the vehicle is dropped, so that the memory
+    used does not grow with the number of trips. This provides the metrics of
+    evaluation/getResults.py without any tripinfo or emission output.
+
+    Fuel and CO2 are accumulated in the units of sumo, as in the fuel_abs and
+    CO2_abs attributes of the tripinfo output.
+
+    Attributes
+    ----------
+    travel_time_bins : numpy.ndarray
+        edges of the bins of the travel time histogram, in seconds. Longer
+        travel times are counted in the last bin
+    """
+
+    def __init__(self, travel_time_bins=None):
+        """Instantiate the collector.
+
+        Parameters
+        ----------
+        travel_time_bins : array_like, optional
+            edges of the bins of the travel time histogram, in seconds,
+            defaults to one minute bins up to an hour
+        """
+        self.travel_time_bins = np.asarray(
+            TRAVEL_TIME_BINS if travel_time_bins is None else travel_time_bins, dtype=float)
+        self._store = VehicleStateStore({"depart": float, "fuel": float, "co2": float, "distance": float})
+        self.reset(0)
+
+    def reset(self, time):
+        """Start a new episode.
+
+        Parameters
+        ----------
+        time : float
+            absolute simulation time, in seconds, which is the departure time
+            of the vehicles already in the network
+        """
+        self._store.clear()
+        self._start = time
+        self._time = time
+        self._num_steps = 0
+        self._sums = {"num_trips": 0, "travel_time": 0., "route_length": 0., "fuel": 0., "co2": 0.,
+                      "running_vehicles": 0.}
+        self._max_running = 0
+        self._histogram = np.zeros(max(len(self.travel_time_bins) - 1, 1), dtype=int)
+
+    def update(self, time, sim_step, vehicles):
+        """Accumulate the values of the vehicles after a simulation step.
+
+        Parameters
+        ----------
+        time : float
+            absolute simulation time, in seconds
+        sim_step : float
+            seconds per simulation step
+        vehicles : flow.core.kernel.vehicle.TraCIVehicle
+            vehicle kernel
+        """
+        store = self._store
+        self._time = time
+
+        # finalize the trips of the vehicles which arrived during the step
+        arrived_ids = [veh_id for veh_id in (vehicles.get_arrived_ids() or []) if veh_id in store]
+        if arrived_ids:
+            slots = store.slots(arrived_ids)
+            travel_time = time - store.array("depart")[slots]
+            self._sums["num_trips"] += len(arrived_ids)
+            self._sums["travel_time"] += travel_time.sum()
+            self._sums["route_length"] += store.array("distance")[slots].sum()
+            self._sums["fuel"] += store.array("fuel")[slots].sum()
+            self._sums["co2"] += store.array("co2")[slots].sum()
+            bins = np.clip(np.searchsorted(self.travel_time_bins, travel_time, side="right") - 1,
+                           0, len(self._histogram) - 1)
+            self._histogram += np.bincount(bins, minlength=len(self._histogram))
+            for veh_id in arrived_ids:
+                store.remove(veh_id)
+
+        # vehicles seen for the first time departed during the step
+        veh_ids = list(vehicles.get_ids())
+        for veh_id in veh_ids:
+            if veh_id not in store:
+                slot = store.add(veh_id)
+                store.array("depart")[slot] = time
+                store.array("fuel")[slot] = 0
+                store.array("co2")[slot] = 0
+                store.array("distance")[slot] = 0
+
+        if veh_ids:
+            slots = store.slots(veh_ids)
+            for name in ["fuel", "co2"]:
+                emission = np.array(vehicles.get_emission(veh_ids, name, error=0), dtype=float)
+                # sumo returns large negative values for teleporting vehicles
+                store.array(name)[slots] += np.maximum(emission, 0) * sim_step
+            distance = np.array(vehicles.get_distance(veh_ids, error=np.nan), dtype=float)
+            store.array("distance")[slots] = np.where(np.isnan(distance) | (distance < 0),
+                                                      store.array("distance")[slots], distance)
+
+        self._num_steps += 1
+        self._sums["running_vehicles"] += len(veh_ids)
+        self._max_running = max(self._max_running, len(veh_ids))
+
+    def get_metrics(self):
+        """Return the metrics of the current episode.
+
+        Returns
+        -------
+        dict
+            * num_trips: number of finished trips
+            * travel_time: average travel time of the finished trips, in s
+            * route_length: average route length of the finished trips, in m
+            * fuel: fuel consumption of the finished trips, in l/100km if sumo
+              reports fuel in ml, as computed by evaluation/getResults.py
+            * co2: CO2 emission of the finished trips per km, i.e. in g/km
+            * running_vehicles: average number of vehicles in the network
+            * max_running_vehicles: maximum number of vehicles in the network
+            * travel_time_histogram: number of finished trips in every bin of
+              travel_time_bins
+        """
+        sums = self._sums
+        num_trips = sums["num_trips"]
+        length = sums["route_length"]
+        return {
+            "num_trips": num_trips,
+            "travel_time": sums["travel_time"] / num_trips if num_trips else np.nan,
+            "route_length": length / num_trips if num_trips else np.nan,
+            "fuel": sums["fuel"] / (length / 100) if length else np.nan,
+            "co2": sums["co2"] / length if length else np.nan,
+            "running_vehicles": sums["running_vehicles"] / self._num_steps if self._num_steps else 0.,
+            "max_running_vehicles": self._max_running,
+            "travel_time_histogram": self._histogram.copy(),
+        }
@@ -0,0 +1,100 @@
+"""Script containing the recorder of the network-level time series of a rollout."""
+
+import os
+import numpy as np
+
+# speed below which a vehicle is counted as halting, in m/s, as in sumo
+HALTING_SPEED = 0.1
+
+# name and type of the recorded series, in their order in the files
+TIMESERIES_FIELDS = [
+    ("time", np.float64),
+    ("running", np.int32),
+    ("min_expected", np.int32),
+    ("mean_speed", np.float32),
+    ("halting", np.int32),
+]
+
+
+class TimeSeriesRecorder(object):
+    """Record network-level values of a rollout at every step.
+
+    At every step, the recorder stores the simulation time, the number of
+    vehicles running in the network, the number of vehicles sumo still expects
+    (running vehicles and vehicles waiting to depart, see
+    traci.simulation.getMinExpectedNumber), the mean speed of the running
+    vehicles and the number of halting vehicles. A few numbers are stored per
+    step, so that the series of whole rollouts are held in memory and saved
+    at once to a compressed numpy .npz archive, with one array per series.
+    See evaluation/merge_timeseries.py to align the series of several runs.
+
+    Attributes
+    ----------
+    file_name : str
+        path to the output file
+    """
+
+    def __init__(self, file_name):
+        """Instantiate the recorder.
+
+        Parameters
+        ----------
+        file_name : str
+            path to the output .npz file
+        """
+        self.file_name = file_name
+        self._rows = []
+
+    def __len__(self):
+        """Return the number of recorded steps."""
+        return len(self._rows)
+
+    def record(self, time, min_expected, vehicles):
+        """Record the values of a step.
+
+        Parameters
+        ----------
+        time : float
+            absolute simulation time, in seconds
+        min_expected : int
+            number of vehicles in the network or waiting to depart
+        vehicles : flow.core.kernel.vehicle.TraCIVehicle
+            vehicle kernel
+        """
+        veh_ids = vehicles.get_ids()
+        speed = np.array(vehicles.get_speed(veh_ids), dtype=float)
+        # sumo reports large negative speeds for teleporting vehicles
+        speed = speed[speed >= 0]
+        self._rows.append((
+            time, len(veh_ids), min_expected,
+            speed.mean() if len(speed) else np.nan,
+            np.count_nonzero(speed < HALTING_SPEED)))
+
+    def get_snapshot(self):
+        """Return the values recorded so far, see `restore_snapshot`."""
+        return list(self._rows)
+
+    def restore_snapshot(self, snapshot):
+        """Replace the recorded values by those returned by `get_snapshot`.
+
+        Parameters
+        ----------
+        snapshot : list of tuple
+            values of the recorded steps
+        """
+        self._rows = list(snapshot)
+
+    def save(self):
+        """Write the recorded series to the output file.
+
+        Nothing is written if no step was recorded.
+        """
+        if not self._rows:
+            return
+        columns = zip(*self._rows)
+        arrays = {name: np.array(values, dtype=dtype)
+                  for (name, dtype), values in zip(TIMESERIES_FIELDS, columns)}
+        tmp_name = "{}.{}.tmp".format(self.file_name, os.getpid())
+        with open(tmp_name, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_name, self.file_name)
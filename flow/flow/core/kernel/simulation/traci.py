@@ -1,18 +1,22 @@
 """Script containing the TraCI simulation kernel class."""
 
 from flow.core.kernel.simulation import KernelSimulation
+from flow.core.kernel.simulation.emission import EmissionRecorder, EMISSION_FORMATS
+from flow.core.kernel.simulation.metrics import TripMetrics
+from flow.core.kernel.simulation.timeseries import TimeSeriesRecorder
 from flow.core.util import ensure_dir
 import flow.config as config
 import traci.constants as tc
 import traci
+import sumolib
 import traceback
 import os
 import time
 import logging
 import subprocess
 import signal
-import csv
 import random
+from copy import deepcopy
 
 # Number of retries on restarting SUMO before giving up
 RETRIES_ON_ERROR = 10
@@ -26,7 +30,8 @@ class TraCISimulation(KernelSimulation):
     Attributes
     ----------
     sumo_proc : subprocess.Popen
-        contains the subprocess.Popen instance used to start traci
+        contains the subprocess.Popen instance used to start traci. None if
+        sumo runs within the python process through libsumo
     sim_step : float
         seconds per simulation step
     emission_path : str or None
@@ -34,20 +39,20 @@ class TraCISimulation(KernelSimulation):
         output is not generated if this value is not specified
     time : float
         used to internally keep track of the simulation time
-    stored_data : dict <str, dict <float, dict <str, Any>>>
-        a dict object used to store additional data if an emission file is
-        provided. The first key corresponds to the name of the vehicle, the
-        second corresponds to the time the sample was issued, and the final
-        keys represent the additional data stored at every given time for every
-        vehicle, and consists of the following keys:
-
-        * acceleration (no noise): the accelerations issued to the vehicle,
-          excluding noise
-        * acceleration (requested): the requested acceleration by the vehicle,
-          including noise
-        * acceleration (actual): the actual acceleration by the vehicle,
-          collected by computing the difference between the speeds of the
-          vehicle and dividing it by the sim_step term
+    emission_recorder : flow.core.kernel.simulation.emission.EmissionRecorder or None
+        records the additional data of vehicles at every step if an emission
+        path is provided, and streams it to the emission file of the current
+        rollout. None if no data is being recorded
+    trip_metrics : flow.core.kernel.simulation.metrics.TripMetrics or None
+        aggregates the metrics of the trips of the current rollout online, see
+        get_trip_metrics. None if the metrics are not collected
+    timeseries_path : str or None
+        path to the folder in which the time series of every rollout are
+        saved, see flow.core.kernel.simulation.timeseries.TimeSeriesRecorder.
+        No time series is recorded if this value is not specified
+    timeseries_recorder : flow.core.kernel.simulation.timeseries.TimeSeriesRecorder or None
+        records the time series of the current rollout, which are saved when
+        the simulation is reset or closed
     """
 
     def __init__(self, master_kernel):
@@ -65,7 +70,14 @@ class TraCISimulation(KernelSimulation):
         self.sim_step = None
         self.emission_path = None
         self.time = 0
-        self.stored_data = dict()
+        self.emission_fields = None
+        self.emission_format = "csv"
+        self.emission_recorder = None
+        self.trip_metrics = None
+        self.timeseries_path = None
+        self.timeseries_recorder = None
+        self._num_rollouts = 0
+        self._sumo_binary = None
 
         self.random_num = None
 
@@ -83,10 +95,12 @@ class TraCISimulation(KernelSimulation):
             tc.VAR_ARRIVED_VEHICLES_IDS,
             tc.VAR_TELEPORT_STARTING_VEHICLES_IDS,
             tc.VAR_TIME_STEP,
+            tc.VAR_TIME,
             tc.VAR_DELTA_T,
             tc.VAR_LOADED_VEHICLES_NUMBER,
             tc.VAR_DEPARTED_VEHICLES_NUMBER,
-            tc.VAR_ARRIVED_VEHICLES_NUMBER
+            tc.VAR_ARRIVED_VEHICLES_NUMBER,
+            tc.VAR_MIN_EXPECTED_VEHICLES
         ])
 
     def simulation_step(self):
@@ -100,59 +114,75 @@ class TraCISimulation(KernelSimulation):
         else:
             self.time += self.sim_step
 
+        sim_obs = self.kernel_api.simulation.getSubscriptionResults()
+        if self.trip_metrics is not None:
+            if reset:
+                self.trip_metrics.reset(sim_obs[tc.VAR_TIME])
+            self.trip_metrics.update(sim_obs[tc.VAR_TIME], self.sim_step, self.master_kernel.vehicle)
+
+        # every rollout is recorded in a new time series
+        if self.timeseries_path is not None:
+            if reset or self.timeseries_recorder is None:
+                self.save_timeseries()
+                self.timeseries_recorder = self._open_timeseries()
+            self.timeseries_recorder.record(
+                sim_obs[tc.VAR_TIME], sim_obs[tc.VAR_MIN_EXPECTED_VEHICLES], self.master_kernel.vehicle)
+
         # Collect the additional data to store in the emission file.
         if self.emission_path is not None:
-
-            kv = self.master_kernel.vehicle
-            for veh_id in self.master_kernel.vehicle.get_ids():
-                t = round(self.time, 2)
-
-                # some miscellaneous pre-processing
-                position = kv.get_2d_position(veh_id)
-
-                # Make sure dictionaries corresponding to the vehicle and
-                # time are available.
-                if veh_id not in self.stored_data.keys():
-                    self.stored_data[veh_id] = dict()
-                if t not in self.stored_data[veh_id].keys():
-                    self.stored_data[veh_id][t] = dict()
-
-                # Add the speed, position, and lane data.
-                self.stored_data[veh_id][t].update({
-                    "speed": kv.get_speed(veh_id),
-                    "lane_number": kv.get_lane(veh_id),
-                    "edge_id": kv.get_edge(veh_id),
-                    "relative_position": kv.get_position(veh_id),
-                    "x": position[0],
-                    "y": position[1],
-                    "headway": kv.get_headway(veh_id),
-                    "leader_id": kv.get_leader(veh_id),
-                    "follower_id": kv.get_follower(veh_id),
-                    "leader_rel_speed":
-                        kv.get_speed(kv.get_leader(veh_id))
-                        - kv.get_speed(veh_id),
-                    "target_accel_with_noise_with_failsafe":
-                        kv.get_accel(veh_id, noise=True, failsafe=True),
-                    "target_accel_no_noise_no_failsafe":
-                        kv.get_accel(veh_id, noise=False, failsafe=False),
-                    "target_accel_with_noise_no_failsafe":
-                        kv.get_accel(veh_id, noise=True, failsafe=False),
-                    "target_accel_no_noise_with_failsafe":
-                        kv.get_accel(veh_id, noise=False, failsafe=True),
-                    "realized_accel":
-                        kv.get_realized_accel(veh_id),
-                    "road_grade": kv.get_road_grade(veh_id),
-                    "distance": kv.get_distance(veh_id),
-                })
+            if self.emission_recorder is None:
+                self.emission_recorder = self._open_emission()
+            self.emission_recorder.record(round(self.time, 2), self.master_kernel.vehicle)
 
     def close(self):
         """See parent class."""
-        # Save the emission data to a csv.
-        if self.emission_path is not None:
-            self.save_emission()
+        # Save the remaining emission data and time series.
+        self.save_emission()
+        self.save_timeseries()
 
         self.kernel_api.close()
 
+    def get_trip_metrics(self):
+        """Return the metrics of the trips finished since the last reset.
+
+        See flow.core.kernel.simulation.metrics.TripMetrics.get_metrics for
+        the metrics, which are the metrics of evaluation/getResults.py
+        computed without any sumo output file. None if the metrics are not
+        collected, see the `trip_metrics` attribute of SumoParams.
+        """
+        if self.trip_metrics is None:
+            return None
+        return self.trip_metrics.get_metrics()
+
+    def get_snapshot(self):
+        """See parent class.
+
+        The trip metrics and time series recorded so far are stored.
+        """
+        return {
+            "trip_metrics": deepcopy(self.trip_metrics),
+            "timeseries": None if self.timeseries_recorder is None else self.timeseries_recorder.get_snapshot(),
+        }
+
+    def restore_snapshot(self, snapshot):
+        """See parent class."""
+        if self.trip_metrics is not None and snapshot["trip_metrics"] is not None:
+            self.trip_metrics = snapshot["trip_metrics"]
+        if self.timeseries_recorder is not None and snapshot["timeseries"] is not None:
+            self.timeseries_recorder.restore_snapshot(snapshot["timeseries"])
+
+    def save_state(self, file_name):
+        """See parent class."""
+        self.kernel_api.simulation.saveState(file_name)
+
+    def load_state(self, file_name):
+        """See parent class.
+
+        Note that sumo drops all subscriptions when a state is loaded, so the
+        kernel api needs to be passed to the kernels again afterwards.
+        """
+        self.kernel_api.simulation.loadState(file_name)
+
     def check_collision(self):
         """See parent class."""
         return self.kernel_api.simulation.getStartingTeleportNumber() != 0
@@ -168,15 +198,12 @@ class TraCISimulation(KernelSimulation):
         2. It also uses the configuration files created by the network class to
            initialize a sumo instance.
         3. Finally, It initializes a traci connection to interface with sumo
-           from Python and returns the connection.
+           from Python and returns the connection. If the "libsumo" backend is
+           requested and no gui is needed, sumo is instead started within the
+           python process and the libsumo module is returned, which offers the
+           same interface as a traci connection.
         """
-        # Save the simulation step size (for later use).
-        self.sim_step = sim_params.sim_step
-
-        # Update the emission path term.
-        self.emission_path = sim_params.emission_path
-        if self.emission_path is not None:
-            ensure_dir(self.emission_path)
+        self._set_params(sim_params)
 
         error = None
         for _ in range(RETRIES_ON_ERROR):
@@ -187,71 +214,30 @@ class TraCISimulation(KernelSimulation):
                 sumo_binary = "sumo-gui" if sim_params.render is True \
                     else "sumo"
 
+                # libsumo cannot run sumo-gui
+                use_libsumo = sim_params.backend == "libsumo" and \
+                    sim_params.render is not True
+
                 # command used to start sumo
-                sumo_call = [
-                    sumo_binary, "-c", network.cfg,
-                    "--remote-port", str(sim_params.port),
-                    "--num-clients", str(sim_params.num_clients),
-                    "--step-length", str(sim_params.sim_step),
-                    "--waiting-time-memory", str(15)
-                ]
-
-                if sim_params.emission_path is not None:
-                    ensure_dir(sim_params.emission_path)
-
-                    # avoid rewrite cuz of same file name, and limit the number of files to store
-                    emission_out = os.path.join(sim_params.emission_path, network.name + "-" + str(random_num) + "-emission.xml")
-                    # emission_out = os.path.join(sim_params.emission_path, "{0}-emission.xml".format(network.name))
-                    sumo_call.append("--emission-output")
-                    sumo_call.append(emission_out)
-
-                    trip_out = os.path.join(sim_params.emission_path, network.name + "-" + str(random_num) + "-tripinfo.xml")
-                    sumo_call.append("--tripinfo-output")
-                    sumo_call.append(trip_out)
-
-                    queue_out = os.path.join(sim_params.emission_path, network.name + "-" + str(random_num) + "-queue.xml")
-                    sumo_call.append("--queue-output")
-                    sumo_call.append(queue_out)
-                    self.random_num = random_num
-
-                # use a ballistic integration step (if request)
-                if sim_params.use_ballistic:
-                    sumo_call.append("--step-method.ballistic")
-
-                # ignore step logs (if requested)
-                if sim_params.no_step_log:
-                    sumo_call.append("--no-step-log")
-
-                # add the lateral resolution of the sublanes (if requested)
-                if sim_params.lateral_resolution is not None:
-                    sumo_call.append("--lateral-resolution")
-                    sumo_call.append(str(sim_params.lateral_resolution))
-
-                if sim_params.overtake_right:
-                    sumo_call.append("--lanechange.overtake-right")
-                    sumo_call.append("true")
-
-                # specify a simulation seed (if requested)
-                if sim_params.seed is not None:
-                    sumo_call.append("--seed")
-                    sumo_call.append(str(sim_params.seed))
-
-                if not sim_params.print_warnings:
-                    sumo_call.append("--no-warnings")
-                    sumo_call.append("true")
-
-                # set the time it takes for a gridlock teleport to occur
-                sumo_call.append("--time-to-teleport")
-                sumo_call.append(str(int(sim_params.teleport_time)))
-
-                # check collisions at intersections
-                sumo_call.append("--collision.check-junctions")
-                sumo_call.append("false")
-
-                sumo_call.append("--ignore-route-errors")
-                sumo_call.append("true")
-
-                logging.info(" Starting SUMO on port " + str(port))
+                sumo_call = [sumo_binary]
+
+                if not use_libsumo:
+                    # no port is reserved for the libsumo backend, which still
+                    # falls back to traci for rendering
+                    if sim_params.port is None:
+                        sim_params.port = sumolib.miscutils.getFreeSocketPort()
+                        port = sim_params.port
+                    sumo_call.append("--remote-port")
+                    sumo_call.append(str(sim_params.port))
+                    sumo_call.append("--num-clients")
+                    sumo_call.append(str(sim_params.num_clients))
+
+                sumo_call.extend(self._sumo_options(network, sim_params, random_num))
+
+                if use_libsumo:
+                    logging.info(" Starting SUMO through libsumo")
+                else:
+                    logging.info(" Starting SUMO on port " + str(port))
                 logging.debug(" Cfg file: " + str(network.cfg))
                 if sim_params.num_clients > 1:
                     logging.info(" Num clients are" +
@@ -259,99 +245,276 @@ class TraCISimulation(KernelSimulation):
                 logging.debug(" Emission file: " + str(self.emission_path))
                 logging.debug(" Step length: " + str(sim_params.sim_step))
 
+                if use_libsumo:
+                    # sumo runs within this process, so there is no socket to
+                    # wait for
+                    import libsumo
+                    libsumo.start(sumo_call)
+                    libsumo.simulationStep()
+                    self.sumo_proc = None
+                    self._sumo_binary = sumo_binary
+                    return libsumo
+
                 # Opening the I/O thread to SUMO
                 self.sumo_proc = subprocess.Popen(
                     sumo_call,
                     stdout=subprocess.DEVNULL
                 )
 
-                # wait a small period of time for the subprocess to activate
-                # before trying to connect with traci
-                if os.environ.get("TEST_FLAG", 0):
-                    time.sleep(0.1)
-                else:
-                    time.sleep(config.SUMO_SLEEP)
-
-                traci_connection = traci.connect(port, numRetries=100)
+                traci_connection = self._connect(port)
                 traci_connection.setOrder(0)
                 traci_connection.simulationStep()
 
+                self._sumo_binary = sumo_binary
                 return traci_connection
             except Exception as e:
                 print("Error during start: {}".format(traceback.format_exc()))
                 error = e
+                if not use_libsumo and self.sumo_proc is not None and self.sumo_proc.poll() is not None:
+                    # sumo exited, e.g. because another process took the port
+                    # in the meantime, so the next attempt uses a new port
+                    sim_params.port = sumolib.miscutils.getFreeSocketPort()
                 self.teardown_sumo()
         raise error
 
+    def can_reload(self, sim_params):
+        """Return whether the running sumo instance can load a new simulation.
+
+        This is the case if sumo is running with the same gui setting, and is
+        not shared with other clients.
+
+        Parameters
+        ----------
+        sim_params : flow.core.params.SumoParams
+            simulation-specific parameters of the next simulation
+        """
+        sumo_binary = "sumo-gui" if sim_params.render is True else "sumo"
+        return self.kernel_api is not None and self._sumo_binary == sumo_binary \
+            and sim_params.num_clients == 1
+
+    def reload_simulation(self, network, sim_params, random_num):
+        """Load a new simulation in the running sumo instance.
+
+        This replaces start_simulation between rollouts when sumo is kept
+        alive, see the `reload_instance` attribute of SumoParams: the
+        configuration files created by the network class are loaded with
+        traci.load, with the options of start_simulation, e.g. a new seed,
+        instead of starting a new sumo process and connecting to it. Like
+        saved states, the subscriptions are lost, so the kernel api needs to
+        be passed to the kernels again afterwards.
+
+        Returns
+        -------
+        traci.connection.Connection or module
+            the kernel api, i.e. the same connection or the libsumo module
+        """
+        # the outputs of the previous simulation are completed by sumo
+        self.save_emission()
+        self._set_params(sim_params)
+        logging.info(" Reloading SUMO")
+        self.kernel_api.load(self._sumo_options(network, sim_params, random_num))
+        self.kernel_api.simulationStep()
+        return self.kernel_api
+
+    def _set_params(self, sim_params):
+        """Store the simulation parameters used by the kernel."""
+        # Save the simulation step size (for later use).
+        self.sim_step = sim_params.sim_step
+
+        # Update the emission path term.
+        self.emission_path = sim_params.emission_path
+        self.emission_fields = getattr(sim_params, "emission_fields", None)
+        self.emission_format = getattr(sim_params, "emission_format", "csv")
+        self.trip_metrics = TripMetrics() if getattr(sim_params, "trip_metrics", False) else None
+        if self.emission_path is not None:
+            ensure_dir(self.emission_path)
+        self.timeseries_path = getattr(sim_params, "timeseries_path", None)
+        if self.timeseries_path is not None:
+            ensure_dir(self.timeseries_path)
+
+    def _sumo_options(self, network, sim_params, random_num):
+        """Return the command line options of a sumo simulation.
+
+        These are the options of the configuration files created by the
+        network class and of the simulation parameters, without the options
+        of the connection to sumo.
+
+        Parameters
+        ----------
+        network : flow.core.kernel.network.TraCIKernelNetwork
+            network kernel, which created the configuration files
+        sim_params : flow.core.params.SumoParams
+            simulation-specific parameters
+        random_num : int
+            number appended to the names of the output files, to avoid
+            overwriting the outputs of other rollouts
+
+        Returns
+        -------
+        list of str
+            the options
+        """
+        sumo_call = [
+            "-c", network.cfg,
+            "--step-length", str(sim_params.sim_step),
+            "--waiting-time-memory", str(15)
+        ]
+
+        if sim_params.emission_path is not None:
+            ensure_dir(sim_params.emission_path)
+
+            # avoid rewrite cuz of same file name, and limit the number of files to store
+            emission_out = os.path.join(
+                sim_params.emission_path, network.name + "-" + str(random_num) + "-emission.xml")
+            # emission_out = os.path.join(sim_params.emission_path, "{0}-emission.xml".format(network.name))
+            sumo_call.append("--emission-output")
+            sumo_call.append(emission_out)
+
+            trip_out = os.path.join(sim_params.emission_path, network.name + "-" + str(random_num) + "-tripinfo.xml")
+            sumo_call.append("--tripinfo-output")
+            sumo_call.append(trip_out)
+
+            queue_out = os.path.join(sim_params.emission_path, network.name + "-" + str(random_num) + "-queue.xml")
+            sumo_call.append("--queue-output")
+            sumo_call.append(queue_out)
+            self.random_num = random_num
+
+        # use a ballistic integration step (if request)
+        if sim_params.use_ballistic:
+            sumo_call.append("--step-method.ballistic")
+
+        # ignore step logs (if requested)
+        if sim_params.no_step_log:
+            sumo_call.append("--no-step-log")
+
+        # add the lateral resolution of the sublanes (if requested)
+        if sim_params.lateral_resolution is not None:
+            sumo_call.append("--lateral-resolution")
+            sumo_call.append(str(sim_params.lateral_resolution))
+
+        if sim_params.overtake_right:
+            sumo_call.append("--lanechange.overtake-right")
+            sumo_call.append("true")
+
+        # specify a simulation seed (if requested)
+        if sim_params.seed is not None:
+            sumo_call.append("--seed")
+            sumo_call.append(str(sim_params.seed))
+
+        # store the random number generators and the exact vehicle
+        # states in saved states (if requested)
+        if sim_params.warmup_snapshot:
+            sumo_call.append("--save-state.rng")
+            sumo_call.append("true")
+            sumo_call.append("--save-state.precision")
+            sumo_call.append(str(6))
+
+        if not sim_params.print_warnings:
+            sumo_call.append("--no-warnings")
+            sumo_call.append("true")
+
+        # set the time it takes for a gridlock teleport to occur
+        sumo_call.append("--time-to-teleport")
+        sumo_call.append(str(int(sim_params.teleport_time)))
+
+        # check collisions at intersections
+        sumo_call.append("--collision.check-junctions")
+        sumo_call.append("false")
+
+        sumo_call.append("--ignore-route-errors")
+        sumo_call.append("true")
+
+        return sumo_call
+
+    def _connect(self, port):
+        """Connect to the sumo subprocess as soon as it accepts connections.
+
+        The connection is attempted at short, increasing intervals instead of
+        after a fixed delay, so that it succeeds as soon as sumo listens on
+        its port. Starting sumo fails immediately if the subprocess exits,
+        and after config.SUMO_START_TIMEOUT seconds otherwise.
+
+        Parameters
+        ----------
+        port : int
+            port sumo listens on
+
+        Returns
+        -------
+        traci.connection.Connection
+            the connection to sumo
+        """
+        deadline = time.time() + config.SUMO_START_TIMEOUT
+        delay = 0.001
+        while True:
+            try:
+                # a single attempt, which raises a TraCIException if the
+                # subprocess has exited
+                return traci.connect(port, numRetries=0, proc=self.sumo_proc)
+            except traci.exceptions.FatalTraCIError:
+                if time.time() > deadline:
+                    raise
+            time.sleep(delay)
+            delay = min(2 * delay, 0.05)
+
     def teardown_sumo(self):
         """Kill the sumo subprocess instance."""
+        if self.sumo_proc is None:
+            # sumo runs through libsumo, and is stopped when closed
+            return
         try:
             os.killpg(self.sumo_proc.pid, signal.SIGTERM)
         except Exception as e:
             print("Error during teardown: {}".format(e))
 
     def save_emission(self, run_id=0):
-        """Save any collected emission data to a csv file.
+        """Save any collected emission data to the emission file.
 
-        If not data was collected, nothing happens. Moreover, any internally
-        stored data by this class is clear whenever data is stored.
+        The data is streamed to the file while it is collected, so this only
+        writes the remaining data and closes the file. If no data was
+        collected, nothing happens. Data collected afterwards is stored in a
+        new file.
 
         Parameters
         ----------
         run_id : int
-            the rollout number, appended to the name of the emission file. Used
-            to store emission files from multiple rollouts run sequentially.
+            the rollout number. Unused, the emission file is named after the
+            random number of the network, or a random number, when it is
+            opened.
         """
-        # If there is no stored data, ignore this operation. This is to ensure
-        # that data isn't deleted if the operation is called twice.
-        if len(self.stored_data) == 0:
+        if self.emission_recorder is None:
             return
+        self.emission_recorder.close()
+        self.emission_recorder = None
 
+    def save_timeseries(self):
+        """Save the time series of the current rollout, if any is recorded.
+
+        Data recorded afterwards is stored in a new file.
+        """
+        if self.timeseries_recorder is None:
+            return
+        self.timeseries_recorder.save()
+        self.timeseries_recorder = None
+
+    def _open_timeseries(self):
+        """Return a recorder of the time series of a new rollout."""
+        self._num_rollouts += 1
+        name = "{}-{}-{}_timeseries.npz".format(
+            self.master_kernel.network.network.name,
+            self.random_num or os.getpid(), self._num_rollouts)
+        return TimeSeriesRecorder(os.path.join(self.timeseries_path, name))
+
+    def _open_emission(self):
+        """Return a recorder streaming data to a new emission file."""
         if self.random_num:
             run_id = self.random_num
         else:
             run_id = random.randint(1, 10)  # avoid rewrite
-        name = "{}-{}_emission.csv".format(
-            self.master_kernel.network.network.name, run_id)
-
-        # The name of all stored data-points (excluding id and time)
-        stored_ids = [
-            "x",
-            "y",
-            "speed",
-            "headway",
-            "leader_id",
-            "target_accel_with_noise_with_failsafe",
-            "target_accel_no_noise_no_failsafe",
-            "target_accel_with_noise_no_failsafe",
-            "target_accel_no_noise_with_failsafe",
-            "realized_accel",
-            "road_grade",
-            "edge_id",
-            "lane_number",
-            "distance",
-            "relative_position",
-            "follower_id",
-            "leader_rel_speed",
-        ]
-
-        # Update the stored data to push to the csv file.
-        final_data = {"time": [], "id": []}
-        final_data.update({key: [] for key in stored_ids})
-
-        for veh_id in self.stored_data.keys():
-            for t in self.stored_data[veh_id].keys():
-                final_data['time'].append(t)
-                final_data['id'].append(veh_id)
-                for key in stored_ids:
-                    final_data[key].append(self.stored_data[veh_id][t][key])
-
-        with open(os.path.join(self.emission_path, name), "w") as f:
-            print(os.path.join(self.emission_path, name), self.emission_path)
-            writer = csv.writer(f, delimiter=',')
-            writer.writerow(final_data.keys())
-            writer.writerows(zip(*final_data.values()))
-
-        # Clear all memory from the stored data. This is useful if this
-        # function is called in between resets.
-        self.stored_data.clear()
+        name = "{}-{}_emission.{}".format(
+            self.master_kernel.network.network.name, run_id,
+            EMISSION_FORMATS.get(self.emission_format, self.emission_format))
+        return EmissionRecorder(
+            os.path.join(self.emission_path, name),
+            fields=self.emission_fields,
+            fmt=self.emission_format)
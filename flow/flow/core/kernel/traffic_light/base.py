@@ -64,6 +64,32 @@ class KernelTrafficLight(object):
         """
         raise NotImplementedError
 
+    def get_snapshot(self):
+        """Return the state of the kernel that is not stored by the simulator.
+
+        This is stored along with the state of the simulation in the warm-up
+        snapshots, see flow.envs.Env.warmup.
+
+        Returns
+        -------
+        object
+            a picklable state, which can be passed to `restore_snapshot`
+        """
+        return None
+
+    def restore_snapshot(self, snapshot):
+        """Restore a state returned by `get_snapshot`.
+
+        This is called once the state of the simulation it was taken with is
+        loaded, and the kernel api is passed again.
+
+        Parameters
+        ----------
+        snapshot : object
+            state returned by `get_snapshot`
+        """
+        pass
+
     def get_ids(self):
         """Return the names of all nodes with traffic lights."""
         raise NotImplementedError
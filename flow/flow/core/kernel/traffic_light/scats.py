@@ -0,0 +1,251 @@
+"""Script containing the SCATS traffic light controller."""
+
+import numpy as np
+import traci.constants as tc
+
+from flow.utils.scats import SCATSPlans, phase_degree_of_saturation, read_phases
+
+
+class SCATSController(object):
+    """SCATS control of some of the traffic lights in the network.
+
+    The controller is stepped by the traffic light kernel after every
+    simulation step (see TraCITrafficLight.add_controller). It accumulates the
+    occupancy of the incoming lanes of every traffic light during each phase,
+    computes the degree of saturation (DS) of the phase when it ends, and at
+    the end of every cycle switches every traffic light to the program of
+    minimum DS, see flow.utils.scats.SCATSPlans. The candidate programs are
+    the programs loaded in sumo for the traffic light, e.g. through the
+    network, and the programs read from `plan_files`.
+
+    As in the standalone script SCATS/Imple_SCATS.py, the occupancy of every
+    incoming lane is measured by the E1 detector (induction loop) placed on
+    it, e.g. those of scenarios/UAV/SCATS/e1.add.xml, loaded with the "add"
+    files of the network template. Lanes without a detector are an error,
+    unless `lane_occupancy` is set, in which case the occupancy of the whole
+    lane is read from the lane subscriptions of the network kernel instead.
+    The occupancy of a lane is usually lower than that of a detector close to
+    the stop line, so the selected plans differ from those of the script.
+
+    Attributes
+    ----------
+    tl_ids : list of str
+        ids of the controlled traffic lights
+    plans : flow.utils.scats.SCATSPlans
+        candidate programs of the traffic lights
+    ds : numpy.ndarray
+        DS of every phase of the current cycle of every traffic light
+    programs : numpy.ndarray
+        column of the current program of every traffic light in `plans`
+    """
+
+    def __init__(self, tl_ids, initial_program=None, program_ids=None, plan_files=None, lane_occupancy=False):
+        """Instantiate the controller.
+
+        Parameters
+        ----------
+        tl_ids : list of str
+            ids of the controlled traffic lights
+        initial_program : str, optional
+            program set to all traffic lights when the simulation starts,
+            defaults to the program defined in the network
+        program_ids : list of str, optional
+            candidate programs, defaults to all programs of every traffic
+            light
+        plan_files : list of str, optional
+            sumo files with tlLogic elements, e.g. SCATS/predefined_plans.xml,
+            whose programs are loaded in sumo for the traffic lights
+        lane_occupancy : bool, optional
+            whether the occupancy of the incoming lanes without an E1 detector
+            is read from the lanes themselves. Otherwise, such lanes raise a
+            ValueError when the controller is initialized
+        """
+        self.tl_ids = list(tl_ids)
+        self.initial_program = initial_program
+        self.program_ids = None if program_ids is None else list(program_ids)
+        self.plan_files = [] if plan_files is None else list(plan_files)
+        self.lane_occupancy = lane_occupancy
+
+        self.plans = None
+        self.ds = None
+        self.programs = None
+        self._master_kernel = None
+        self._lanes = []
+        self._lane_tl = None
+        self._detectors = []
+        self._detector_index = None
+        self._lane_index = None
+        self._occupied_time = None
+        self._phase_count = None
+        self._last_switch = None
+
+    def initialize(self, master_kernel):
+        """Load the static data of the traffic lights and reset the controller.
+
+        This is called by the traffic light kernel whenever a kernel api is
+        passed, i.e. whenever sumo is started.
+
+        Parameters
+        ----------
+        master_kernel : flow.core.kernel.Kernel
+            the higher level kernel
+        """
+        self._master_kernel = master_kernel
+        kernel_api = master_kernel.kernel_api
+
+        # load the programs of the plan files, without switching to them
+        tl_api = kernel_api.trafficlight
+        for tl_id, programs in read_phases(self.plan_files, self.tl_ids).items():
+            current = tl_api.getProgram(tl_id)
+            for program_id, phases in programs.items():
+                tl_api.setProgramLogic(tl_id, tl_api.Logic(program_id, 0, 0, [
+                    tl_api.Phase(float(phase["duration"]), phase["state"],
+                                 float(phase.get("minDur", phase["duration"])),
+                                 float(phase.get("maxDur", phase["duration"])))
+                    for phase in phases]))
+            tl_api.setProgram(tl_id, current)
+
+        logics = {}
+        self._lanes = []
+        lane_tl = []
+        for row, tl_id in enumerate(self.tl_ids):
+            logics[tl_id] = [logic for logic in kernel_api.trafficlight.getAllProgramLogics(tl_id)
+                             if self.program_ids is None or logic.programID in self.program_ids]
+            # incoming lanes, which are listed once per controlled link
+            lanes = list(dict.fromkeys(kernel_api.trafficlight.getControlledLanes(tl_id)))
+            self._lanes.extend(lanes)
+            lane_tl.extend([row] * len(lanes))
+        self.plans = SCATSPlans.from_logics(logics)
+        self._lane_tl = np.array(lane_tl, dtype=int)
+
+        # the occupancy of the incoming lanes is measured by their E1 detector
+        detectors = {kernel_api.inductionloop.getLaneID(e1): e1 for e1 in kernel_api.inductionloop.getIDList()}
+        missing = [lane for lane in self._lanes if lane not in detectors]
+        if missing and not self.lane_occupancy:
+            raise ValueError('Incoming lanes {} of the SCATS traffic lights have no E1 detector. Load detectors with '
+                             'the "add" files of the network template, or set lane_occupancy.'.format(missing))
+        self._detector_index = np.array([i for i, lane in enumerate(self._lanes) if lane in detectors], dtype=int)
+        self._lane_index = np.array([i for i, lane in enumerate(self._lanes) if lane not in detectors], dtype=int)
+        self._detectors = [detectors[self._lanes[i]] for i in self._detector_index]
+        for e1 in self._detectors:
+            kernel_api.inductionloop.subscribe(e1, [tc.LAST_STEP_OCCUPANCY])
+        if missing:
+            master_kernel.network.subscribe_lanes(missing)
+        self.reset()
+
+    def reset(self):
+        """Start a new cycle for every traffic light, in its initial program."""
+        kernel_api = self._master_kernel.kernel_api
+        self.programs = np.zeros(len(self.tl_ids), dtype=int)
+        for row, tl_id in enumerate(self.tl_ids):
+            if self.initial_program is not None:
+                kernel_api.trafficlight.setProgram(tl_id, self.initial_program)
+            self.programs[row] = self.plans.index(tl_id, kernel_api.trafficlight.getProgram(tl_id))[1]
+        self.ds = np.zeros((len(self.tl_ids), self.plans.max_phases))
+        self._occupied_time = np.zeros(len(self._lanes))
+        # number of the current phase in the cycle, 0 during the partial phase
+        # before the first switch, which is not measured
+        self._phase_count = np.zeros(len(self.tl_ids), dtype=int)
+        self._last_switch = np.full(len(self.tl_ids), -np.inf)
+
+    def update(self, time):
+        """Update the controller after a simulation step.
+
+        Parameters
+        ----------
+        time : float
+            absolute simulation time, in seconds
+        """
+        k = self._master_kernel
+        sim_step = k.simulation.sim_step
+
+        # times are compared within half a step, since they may be large
+        tol = sim_step / 2
+
+        # the first step of a phase starts a new measure
+        new_phase = np.abs(self._last_switch + sim_step - time) < tol
+        self._phase_count[new_phase] += 1
+        self._occupied_time[new_phase[self._lane_tl]] = 0
+        self._occupied_time += self._occupancy() / 100 * sim_step
+
+        cycle_end = []
+        for row, tl_id in enumerate(self.tl_ids):
+            if abs(k.traffic_light.get_next_switch(tl_id) - time) >= tol:
+                continue
+            self._last_switch[row] = time
+            count = self._phase_count[row]
+            if count == 0:
+                continue
+            occupied_time = self._occupied_time[self._lane_tl == row]
+            self.ds[row, count - 1] = phase_degree_of_saturation(
+                occupied_time if len(occupied_time) else [0], k.traffic_light.get_phase_duration(tl_id))
+            if count == self.plans.num_phases[row, self.programs[row]]:
+                self._phase_count[row] = 0
+                cycle_end.append(row)
+
+        if cycle_end:
+            # the plans of all traffic lights ending a cycle are selected at once
+            programs = self.plans.select(self.ds[cycle_end], self.programs[cycle_end], cycle_end)
+            for row, program in zip(cycle_end, programs):
+                if program != self.programs[row]:
+                    k.traffic_light.set_program(self.tl_ids[row], self.plans.program_ids[row][program])
+                self.programs[row] = program
+
+    def get_snapshot(self):
+        """Return the state of the controller, see `restore_snapshot`.
+
+        Returns
+        -------
+        dict
+            the measures of the current cycles, the selected programs, and the
+            program, phase and remaining time of the phase of every traffic
+            light in the simulation
+        """
+        tl_api = self._master_kernel.kernel_api.trafficlight
+        time = self._master_kernel.kernel_api.simulation.getTime()
+        return {
+            "programs": self.programs.copy(),
+            "ds": self.ds.copy(),
+            "occupied_time": self._occupied_time.copy(),
+            "phase_count": self._phase_count.copy(),
+            "last_switch": self._last_switch.copy(),
+            "signals": [(tl_api.getProgram(tl_id), tl_api.getPhase(tl_id), tl_api.getNextSwitch(tl_id) - time)
+                        for tl_id in self.tl_ids],
+        }
+
+    def restore_snapshot(self, snapshot):
+        """Restore a state returned by `get_snapshot`.
+
+        This is called once the state of the simulation it was taken with is
+        loaded, after the controller is initialized again, which starts the
+        traffic lights in their initial program. The program, phase and
+        remaining time of the phase of every traffic light are therefore set
+        again in the simulation.
+
+        Parameters
+        ----------
+        snapshot : dict
+            state returned by `get_snapshot`
+        """
+        tl_api = self._master_kernel.kernel_api.trafficlight
+        self.programs = snapshot["programs"].copy()
+        self.ds = snapshot["ds"].copy()
+        self._occupied_time = snapshot["occupied_time"].copy()
+        self._phase_count = snapshot["phase_count"].copy()
+        self._last_switch = snapshot["last_switch"].copy()
+        for tl_id, (program_id, phase, remaining) in zip(self.tl_ids, snapshot["signals"]):
+            tl_api.setProgram(tl_id, program_id)
+            tl_api.setPhase(tl_id, phase)
+            tl_api.setPhaseDuration(tl_id, remaining)
+
+    def _occupancy(self):
+        """Return the occupancy of the incoming lanes at the last step, in %."""
+        occupancy = np.zeros(len(self._lanes))
+        if self._detectors:
+            results = self._master_kernel.kernel_api.inductionloop.getAllSubscriptionResults()
+            occupancy[self._detector_index] = [
+                results.get(e1, {}).get(tc.LAST_STEP_OCCUPANCY, 0) for e1 in self._detectors]
+        if len(self._lane_index):
+            occupancy[self._lane_index] = self._master_kernel.network.get_lane_occupancy(
+                [self._lanes[i] for i in self._lane_index], error=0)
+        return occupancy
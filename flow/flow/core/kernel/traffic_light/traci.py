@@ -30,6 +30,9 @@ class TraCITrafficLight(KernelTrafficLight):
         # number of traffic light nodes
         self.num_traffic_lights = 0
 
+        # controllers stepped with the simulation, e.g. SCATSController
+        self.__controllers = []
+
     def pass_api(self, kernel_api):
         """See parent class.
 
@@ -44,18 +47,80 @@ class TraCITrafficLight(KernelTrafficLight):
         self.num_traffic_lights = len(self.__ids)
 
         # subscribe the traffic light signal data
+        self._subscribe()
+        self.__tls = {}
+        for controller in self.__controllers:
+            controller.initialize(self.master_kernel)
+
+    def _subscribe(self):
+        """Subscribe the data of all traffic lights.
+
+        The timing of the phases is also subscribed for the traffic lights
+        that are run by a controller.
+        """
+        controlled = set(tl_id for controller in self.__controllers
+                         for tl_id in controller.tl_ids)
         for node_id in self.__ids:
-            self.kernel_api.trafficlight.subscribe(
-                node_id, [tc.TL_RED_YELLOW_GREEN_STATE])
+            variables = [tc.TL_RED_YELLOW_GREEN_STATE]
+            if node_id in controlled:
+                variables += [tc.TL_NEXT_SWITCH, tc.TL_PHASE_DURATION]
+            self.kernel_api.trafficlight.subscribe(node_id, variables)
 
     def update(self, reset):
-        """See parent class."""
+        """See parent class.
+
+        The controllers are also stepped here.
+        """
         tls_obs = {}
         for tl_id in self.__ids:
             tls_obs[tl_id] = \
                 self.kernel_api.trafficlight.getSubscriptionResults(tl_id)
         self.__tls = tls_obs.copy()
 
+        if self.__controllers:
+            time = self.kernel_api.simulation.getSubscriptionResults()[
+                tc.VAR_TIME]
+            for controller in self.__controllers:
+                if reset:
+                    controller.reset()
+                else:
+                    controller.update(time)
+
+    def add_controller(self, controller):
+        """Let a controller run some of the traffic lights.
+
+        The controller is initialized whenever sumo is started, and updated
+        after every simulation step, after the network kernel. See
+        flow.core.kernel.traffic_light.scats.SCATSController.
+
+        Parameters
+        ----------
+        controller : object
+            controller with `tl_ids` attribute, and `initialize(master_kernel)`,
+            `reset()`, `update(time)`, `get_snapshot()` and
+            `restore_snapshot(snapshot)` methods
+        """
+        self.__controllers.append(controller)
+        if self.kernel_api is not None:
+            self._subscribe()
+            controller.initialize(self.master_kernel)
+
+    def get_snapshot(self):
+        """See parent class.
+
+        The states of the controllers are stored.
+        """
+        return [controller.get_snapshot() for controller in self.__controllers]
+
+    def restore_snapshot(self, snapshot):
+        """See parent class."""
+        for controller, controller_snapshot in zip(self.__controllers, snapshot):
+            controller.restore_snapshot(controller_snapshot)
+
+    def get_controllers(self):
+        """Return the controllers running some of the traffic lights."""
+        return list(self.__controllers)
+
     def get_ids(self):
         """See parent class."""
         return self.__ids
@@ -74,6 +139,24 @@ class TraCITrafficLight(KernelTrafficLight):
     def set_state_specific(self, node_id, index):
         self.kernel_api.trafficlight.setPhase(tlsID=node_id, index=index)
 
+    def set_program(self, node_id, program_id):
+        """Switch a traffic light to one of its programs."""
+        self.kernel_api.trafficlight.setProgram(node_id, program_id)
+
     def get_state(self, node_id):
         """See parent class."""
         return self.__tls[node_id][tc.TL_RED_YELLOW_GREEN_STATE]
+
+    def get_next_switch(self, node_id):
+        """Return the absolute time of the next phase switch of a traffic light.
+
+        Only available for the traffic lights run by a controller.
+        """
+        return self.__tls[node_id][tc.TL_NEXT_SWITCH]
+
+    def get_phase_duration(self, node_id):
+        """Return the duration of the current phase of a traffic light.
+
+        Only available for the traffic lights run by a controller.
+        """
+        return self.__tls[node_id][tc.TL_PHASE_DURATION]
@@ -825,6 +825,8 @@ class AimsunKernelVehicle(KernelVehicle):
 
     def get_x_by_id(self, veh_id):
         """See parent class."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_x_by_id(veh) for veh in veh_id]
         return self.master_kernel.network.get_x(self.get_edge(veh_id),
                                                 self.get_position(veh_id))
 
@@ -109,6 +109,40 @@ class KernelVehicle(object, metaclass=ABCMeta):
         """Reset any additional state that needs to be reset."""
         pass
 
+    def synchronize(self):
+        """Match the vehicles in this class with those in the simulation.
+
+        This is needed whenever the state of the simulation is replaced, e.g.
+        when a saved simulation state is loaded.
+        """
+        pass
+
+    def get_snapshot(self):
+        """Return the state of the kernel that is not stored by the simulator.
+
+        This is stored along with the state of the simulation in the warm-up
+        snapshots, see flow.envs.Env.warmup.
+
+        Returns
+        -------
+        object
+            a picklable state, which can be passed to `restore_snapshot`
+        """
+        return None
+
+    def restore_snapshot(self, snapshot):
+        """Restore a state returned by `get_snapshot`.
+
+        This is called once the state of the simulation it was taken with is
+        loaded, and the kernel api is passed again.
+
+        Parameters
+        ----------
+        snapshot : object
+            state returned by `get_snapshot`
+        """
+        pass
+
     @abstractmethod
     def remove(self, veh_id):
         """Remove a vehicle.
@@ -720,12 +754,12 @@ class KernelVehicle(object, metaclass=ABCMeta):
 
         Parameters
         ----------
-        veh_id : str
-            vehicle identifier
+        veh_id : str or list of str
+            vehicle id, or list of vehicle ids
 
         Returns
         -------
-        float
+        float or list of float
         """
         pass
 
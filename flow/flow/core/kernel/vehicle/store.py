@@ -0,0 +1,195 @@
+"""Script containing a structure-of-arrays store for the state of vehicles."""
+
+import numpy as np
+
+
+class VehicleStateStore(object):
+    """Store the state of vehicles with one numpy array per attribute.
+
+    Every vehicle is assigned a slot, i.e. a row shared by all arrays, when it
+    is added to the store. The slots of removed vehicles are kept in a free
+    list and reused by the next vehicles to be added, and the arrays double in
+    size when no slot is free. The state of many vehicles can therefore be
+    read and written with fancy indexing on the slots of these vehicles.
+
+    Attributes are either floats, in which case unset values are NaN, or
+    arbitrary objects, in which case unset values are None. The rows of newly
+    added vehicles are unset.
+
+    Attributes
+    ----------
+    fields : dict <str, type>
+        data type of every attribute, either float or object
+    """
+
+    def __init__(self, fields, capacity=64):
+        """Instantiate the store.
+
+        Parameters
+        ----------
+        fields : dict <str, type>
+            data type of every attribute, either float or object
+        capacity : int, optional
+            number of slots to allocate initially
+        """
+        for name, dtype in fields.items():
+            if dtype not in [float, object]:
+                raise ValueError('Attribute "{}" must be of type float or '
+                                 'object, got {}.'.format(name, dtype))
+        self.fields = dict(fields)
+        self._capacity = 0
+        self._arrays = {name: np.empty(0, dtype=dtype) for name, dtype in self.fields.items()}
+        self._slots = {}
+        self._free = []
+        self._grow(capacity)
+
+    def __contains__(self, veh_id):
+        """Return whether the vehicle is in the store."""
+        return veh_id in self._slots
+
+    def __len__(self):
+        """Return the number of vehicles in the store."""
+        return len(self._slots)
+
+    def __iter__(self):
+        """Iterate over the ids of the vehicles in the store."""
+        return iter(self._slots)
+
+    def add(self, veh_id):
+        """Assign a slot to a vehicle, with all of its attributes unset.
+
+        Parameters
+        ----------
+        veh_id : str
+            name of the vehicle
+
+        Returns
+        -------
+        int
+            slot of the vehicle. Vehicles that are already in the store keep
+            their slot and state
+        """
+        if veh_id in self._slots:
+            return self._slots[veh_id]
+        if not self._free:
+            self._grow(max(2 * self._capacity, 1))
+        slot = self._free.pop()
+        for name, array in self._arrays.items():
+            array[slot] = np.nan if self.fields[name] is float else None
+        self._slots[veh_id] = slot
+        return slot
+
+    def remove(self, veh_id):
+        """Free the slot of a vehicle, if it is in the store."""
+        slot = self._slots.pop(veh_id, None)
+        if slot is not None:
+            self._free.append(slot)
+
+    def clear(self):
+        """Remove all vehicles from the store."""
+        self._slots.clear()
+        self._free = list(range(self._capacity - 1, -1, -1))
+
+    def slots(self, veh_ids):
+        """Return the slots of several vehicles.
+
+        Parameters
+        ----------
+        veh_ids : list of str
+            names of the vehicles
+
+        Returns
+        -------
+        numpy.ndarray
+            slot of every vehicle, -1 for vehicles that are not in the store
+        """
+        return np.fromiter((self._slots.get(veh_id, -1) for veh_id in veh_ids), dtype=int, count=len(veh_ids))
+
+    def array(self, name):
+        """Return the array of an attribute, indexed by slot.
+
+        The array is replaced whenever the store grows, so it should not be
+        kept after vehicles are added.
+        """
+        return self._arrays[name]
+
+    def get(self, name, veh_id, error):
+        """Return the value of an attribute for one or several vehicles.
+
+        Parameters
+        ----------
+        name : str
+            name of the attribute
+        veh_id : str or list of str
+            name(s) of the vehicle(s)
+        error : any
+            value returned for vehicles that are not in the store, or whose
+            attribute is unset
+
+        Returns
+        -------
+        any or list
+            value(s) of the attribute
+        """
+        array = self._arrays[name]
+        if isinstance(veh_id, (list, np.ndarray)):
+            slots = self.slots(veh_id)
+            values = array[slots]
+            missing = (slots < 0) | self._unset(name, values)
+            values = values.tolist()
+            for i in np.flatnonzero(missing):
+                values[i] = error
+            return values
+
+        slot = self._slots.get(veh_id)
+        if slot is None:
+            return error
+        value = array[slot]
+        if self.fields[name] is float:
+            return error if np.isnan(value) else value.item()
+        return error if value is None else value
+
+    def set(self, name, veh_id, value):
+        """Set the value of an attribute for one or several vehicles.
+
+        Parameters
+        ----------
+        name : str
+            name of the attribute
+        veh_id : str or list of str
+            name(s) of the vehicle(s), which must be in the store
+        value : any or list
+            value(s) of the attribute
+        """
+        if isinstance(veh_id, (list, np.ndarray)):
+            self._arrays[name][self.slots(veh_id)] = value
+        else:
+            self._arrays[name][self._slots[veh_id]] = value
+
+    def swap(self, name, other):
+        """Swap the arrays of two attributes of the same type.
+
+        This is used to keep the value of an attribute at the previous step
+        without copying it.
+        """
+        if self.fields[name] is not self.fields[other]:
+            raise ValueError('Attributes "{}" and "{}" are of different types.'.format(name, other))
+        self._arrays[name], self._arrays[other] = self._arrays[other], self._arrays[name]
+
+    def _unset(self, name, values):
+        """Return a mask of the unset elements of an array of values."""
+        if self.fields[name] is float:
+            return np.isnan(values)
+        return np.equal(values, None)
+
+    def _grow(self, capacity):
+        """Increase the number of slots of the arrays."""
+        extra = capacity - self._capacity
+        if extra <= 0:
+            return
+        for name, dtype in self.fields.items():
+            fill = np.full(extra, np.nan if dtype is float else None, dtype=dtype)
+            self._arrays[name] = np.concatenate([self._arrays[name], fill])
+        # slots are handed out in increasing order
+        self._free = list(range(capacity - 1, self._capacity - 1, -1)) + self._free
+        self._capacity = capacity
@@ -1,9 +1,9 @@
 """Script containing the TraCI vehicle kernel class."""
-import traceback
 
 import traci.exceptions
 
 from flow.core.kernel.vehicle import KernelVehicle
+from flow.core.kernel.vehicle.store import VehicleStateStore
 import traci.constants as tc
 from traci.exceptions import FatalTraCIError, TraCIException
 import numpy as np
@@ -12,8 +12,6 @@ import warnings
 from flow.controllers.car_following_models import SimCarFollowingController
 from flow.controllers.rlcontroller import RLController
 from flow.controllers.lane_change_controllers import SimLaneChangeController
-from bisect import bisect_left
-import itertools
 from copy import deepcopy
 
 # colors for vehicles
@@ -27,6 +25,43 @@ rdelta = 255 / STEPS
 color_bins = [[int(255 - rdelta * i), int(rdelta * i), 0] for i in
               range(STEPS + 1)]
 
+# attributes of the vehicle state store, the subscription variables they are
+# read from, and their types
+STORED_VARIABLES = [
+    ("edge", tc.VAR_ROAD_ID, object),
+    ("lane", tc.VAR_LANE_INDEX, object),
+    ("position", tc.VAR_LANEPOSITION, float),
+    ("speed", tc.VAR_SPEED, float),
+    ("default_speed", tc.VAR_SPEED_WITHOUT_TRACI, float),
+    ("waiting_time", tc.VAR_WAITING_TIME, float),
+    ("accumulated_waiting_time", tc.VAR_ACCUMULATED_WAITING_TIME, float),
+    ("fuel_consumption", tc.VAR_FUELCONSUMPTION, float),
+    ("co2_emission", tc.VAR_CO2EMISSION, float),
+    ("distance", tc.VAR_DISTANCE, float),
+    ("route", tc.VAR_EDGES, object),
+    ("angle", tc.VAR_ANGLE, float),
+]
+
+# attributes of the vehicle state store that are computed by flow
+COMPUTED_VARIABLES = {
+    "previous_speed": float,
+    "previous_lane": object,
+    "x": float,  # 2D position, read from tc.VAR_POSITION
+    "y": float,
+    "min_gap": float,
+    "leader": object,
+    "follower": object,
+    "headway": float,
+    "follower_headway": float,
+}
+
+# stored attributes of the emissions that can be read with get_emission
+EMISSIONS = {"fuel": "fuel_consumption", "co2": "co2_emission"}
+
+# leader or follower of vehicles that have none, as None marks unset
+# attributes in the state store
+NO_VEHICLE = object()
+
 
 class TraCIVehicle(KernelVehicle):
     """Flow kernel for the TraCI API.
@@ -51,9 +86,15 @@ class TraCIVehicle(KernelVehicle):
         # Ordered dictionary used to keep neural net inputs in order
         self.__vehicles = collections.OrderedDict()
 
-        # create a sumo_observations variable that will carry all information
-        # on the state of the vehicles for a given time step
-        self.__sumo_obs = {}
+        # state of the vehicles at the current time step, stored as one array
+        # per attribute and filled from the sumo subscription results
+        fields = {name: dtype for name, _, dtype in STORED_VARIABLES}
+        fields.update(COMPUTED_VARIABLES)
+        self.__store = VehicleStateStore(fields)
+
+        # time step and step length of the last simulation step
+        self._timestep = None
+        self._timedelta = None
 
         # total number of vehicles in the network
         self.num_vehicles = 0
@@ -71,6 +112,11 @@ class TraCIVehicle(KernelVehicle):
         # list of vehicle ids located in each edge in the network
         self._ids_by_edge = dict()
 
+        # whether the lane leaders data and the ids by edge need to be
+        # recomputed, and the lane lookup tables of the network
+        self._multi_lane_outdated = False
+        self._lane_tables_cache = None
+
         # number of vehicles that entered the network for every time-step
         self._num_departed = []
         self._departed_ids = 0
@@ -87,8 +133,8 @@ class TraCIVehicle(KernelVehicle):
         except AttributeError:
             self._force_color_update = False
 
-        # old speeds used to compute accelerations
-        self.previous_speeds = {}
+        # the CO2 emission is only subscribed to for the trip metrics
+        self._subscribe_co2 = getattr(sim_params, "trip_metrics", False)
 
     def initialize(self, vehicles):
         """Initialize vehicle state information.
@@ -104,6 +150,7 @@ class TraCIVehicle(KernelVehicle):
         """
         self.type_parameters = vehicles.type_parameters
         self.minGap = vehicles.minGap
+        self._lane_tables_cache = None
         self.num_vehicles = 0
         self.num_rl_vehicles = 0
         self.num_not_departed = 0
@@ -136,32 +183,24 @@ class TraCIVehicle(KernelVehicle):
             specifies whether the simulator was reset in the last simulation
             step
         """
-        # copy over the previous speeds
-
-        vehicle_obs = {}
-        for veh_id in self.__ids:
-            self.previous_speeds[veh_id] = self.get_speed(veh_id)
-            vehicle_obs[veh_id] = \
-                self.kernel_api.vehicle.getSubscriptionResults(veh_id)
+        # the subscription results of all vehicles are collected at once
+        vehicle_obs = self.kernel_api.vehicle.getAllSubscriptionResults()
         sim_obs = self.kernel_api.simulation.getSubscriptionResults()
 
         arrived_rl_ids = []
+        rl_ids = set(self.__rl_ids)
         # remove exiting vehicles from the vehicles class
         for veh_id in sim_obs[tc.VAR_ARRIVED_VEHICLES_IDS]:
-            if veh_id in self.get_rl_ids():
+            if veh_id in rl_ids:
                 arrived_rl_ids.append(veh_id)
-            if veh_id in sim_obs[tc.VAR_TELEPORT_STARTING_VEHICLES_IDS]:
-                # this is meant to resolve the KeyError bug when there are collisions
-                vehicle_obs[veh_id] = self.__sumo_obs[veh_id]
             self.remove(veh_id)
-            # remove exiting vehicles from the vehicle subscription if they haven't been removed already
-            if veh_id in vehicle_obs.keys() and vehicle_obs[veh_id] is None:
-                vehicle_obs.pop(veh_id, None)
         self._arrived_rl_ids.append(arrived_rl_ids)
 
         # add entering vehicles into the vehicles class
+        ids = set(self.__ids)
+        departed_obs = {}
         for veh_id in sim_obs[tc.VAR_DEPARTED_VEHICLES_IDS]:
-            if veh_id in self.get_ids() and vehicle_obs[veh_id] is not None:
+            if veh_id in ids and vehicle_obs.get(veh_id, {}) is not None:
                 # this occurs when a vehicle is actively being removed and
                 # placed again in the network to ensure a constant number of
                 # total vehicles (e.g. TrafficLightGridEnv). In this case, the vehicle
@@ -170,9 +209,13 @@ class TraCIVehicle(KernelVehicle):
                 pass
             else:
                 veh_type = self.kernel_api.vehicle.getTypeID(veh_id)
-                obs = self._add_departed(veh_id, veh_type)
-                # add the subscription information of the new vehicle
-                vehicle_obs[veh_id] = obs
+                departed_obs[veh_id] = self._add_departed(veh_id, veh_type)
+
+        # update the state store, keeping the speeds and lanes of the previous
+        # step
+        self.__store.swap("speed", "previous_speed")
+        self.__store.swap("lane", "previous_lane")
+        obs = self._store_results(vehicle_obs, departed_obs)
 
         if reset:
             self.time_counter = 0
@@ -202,9 +245,11 @@ class TraCIVehicle(KernelVehicle):
         else:
             self.time_counter += 1
             # update the "last_lc" variable
-            for veh_id in self.__rl_ids:
-                prev_lane = self.get_lane(veh_id)
-                if vehicle_obs[veh_id][tc.VAR_LANE_INDEX] != prev_lane:
+            lanes = self.__store.get("lane", self.__rl_ids, "")
+            prev_lanes = self.__store.get("previous_lane", self.__rl_ids, None)
+            for veh_id, lane, prev_lane in zip(self.__rl_ids, lanes, prev_lanes):
+                # vehicles that just departed have not changed lanes yet
+                if prev_lane is not None and lane != prev_lane:
                     self.__vehicles[veh_id]["last_lc"] = self.time_counter
 
             # updated the list of departed and arrived vehicles
@@ -217,45 +262,14 @@ class TraCIVehicle(KernelVehicle):
             self.num_not_departed += sim_obs[tc.VAR_LOADED_VEHICLES_NUMBER] - \
                 sim_obs[tc.VAR_DEPARTED_VEHICLES_NUMBER]
 
+        self._timestep = sim_obs[tc.VAR_TIME_STEP]
+        self._timedelta = sim_obs[tc.VAR_DELTA_T]
+
         # update the "headway", "leader", and "follower" variables
-        for veh_id in self.__ids:
-            try:
-                _position = vehicle_obs.get(veh_id, {}).get(
-                    tc.VAR_POSITION, -1001)
-                _angle = vehicle_obs.get(veh_id, {}).get(tc.VAR_ANGLE, -1001)
-                _time_step = sim_obs[tc.VAR_TIME_STEP]
-                _time_delta = sim_obs[tc.VAR_DELTA_T]
-                self.__vehicles[veh_id]["orientation"] = \
-                    list(_position) + [_angle]
-                self.__vehicles[veh_id]["timestep"] = _time_step
-                self.__vehicles[veh_id]["timedelta"] = _time_delta
-            except TypeError:
-                print(traceback.format_exc())
-            headway = vehicle_obs.get(veh_id, {}).get(tc.VAR_LEADER, None)
-            # check for a collided vehicle or a vehicle with no leader
-            if headway is None:
-                self.__vehicles[veh_id]["leader"] = None
-                self.__vehicles[veh_id]["follower"] = None
-                self.__vehicles[veh_id]["headway"] = 1e+3
-                self.__vehicles[veh_id]["follower_headway"] = 1e+3
-            else:
-                min_gap = self.minGap[self.get_type(veh_id)]
-                self.__vehicles[veh_id]["headway"] = headway[1] + min_gap
-                self.__vehicles[veh_id]["leader"] = headway[0]
-                if headway[0] in self.__vehicles:
-                    leader = self.__vehicles[headway[0]]
-                    # if veh_id is closer to leader than another follower
-                    # (in case followers are in different converging edges)
-                    if ("follower_headway" not in leader or
-                            headway[1] + min_gap < leader["follower_headway"]):
-                        leader["follower"] = veh_id
-                        leader["follower_headway"] = headway[1] + min_gap
-
-        # update the sumo observations variable
-        self.__sumo_obs = vehicle_obs.copy()
-
-        # update the lane leaders data for each vehicle
-        self._multi_lane_headways()
+        self._update_leaders(obs)
+
+        # the lane leaders data for each vehicle is computed when requested
+        self._multi_lane_outdated = True
 
         # make sure the rl vehicle list is still sorted
         self.__rl_ids.sort()
@@ -325,7 +339,7 @@ class TraCIVehicle(KernelVehicle):
                     self.__controlled_lc_ids.append(veh_id)
 
         # subscribe the new vehicle
-        self.kernel_api.vehicle.subscribe(veh_id, [
+        variables = [
             tc.VAR_LANE_INDEX, tc.VAR_LANEPOSITION,
             tc.VAR_ROAD_ID,
             tc.VAR_SPEED,
@@ -337,7 +351,10 @@ class TraCIVehicle(KernelVehicle):
             tc.VAR_SPEED_WITHOUT_TRACI,
             tc.VAR_FUELCONSUMPTION,
             tc.VAR_DISTANCE
-        ])
+        ]
+        if self._subscribe_co2:
+            variables.append(tc.VAR_CO2EMISSION)
+        self.kernel_api.vehicle.subscribe(veh_id, variables)
         self.kernel_api.vehicle.subscribeLeader(veh_id, 2000)
 
         # some constant vehicle parameters to the vehicles class
@@ -361,22 +378,10 @@ class TraCIVehicle(KernelVehicle):
             "lane_change_params"].lane_change_mode
         self.kernel_api.vehicle.setLaneChangeMode(veh_id, lc_mode)
 
-        # get initial state info
-        self.__sumo_obs[veh_id] = dict()
-        self.__sumo_obs[veh_id][tc.VAR_ROAD_ID] = \
-            self.kernel_api.vehicle.getRoadID(veh_id)
-        self.__sumo_obs[veh_id][tc.VAR_LANEPOSITION] = \
-            self.kernel_api.vehicle.getLanePosition(veh_id)
-        self.__sumo_obs[veh_id][tc.VAR_LANE_INDEX] = \
-            self.kernel_api.vehicle.getLaneIndex(veh_id)
-        self.__sumo_obs[veh_id][tc.VAR_SPEED] = \
-            self.kernel_api.vehicle.getSpeed(veh_id)
-        self.__sumo_obs[veh_id][tc.VAR_FUELCONSUMPTION] = \
-            self.kernel_api.vehicle.getFuelConsumption(veh_id)
-        self.__sumo_obs[veh_id][tc.VAR_WAITING_TIME] = \
-            self.kernel_api.vehicle.getWaitingTime(veh_id)
-        self.__sumo_obs[veh_id][tc.VAR_ACCUMULATED_WAITING_TIME] = \
-            self.kernel_api.vehicle.getAccumulatedWaitingTime(veh_id)
+        # add the vehicle to the state store, whose row is filled with the
+        # subscription results
+        slot = self.__store.add(veh_id)
+        self.__store.array("min_gap")[slot] = self.minGap[veh_type]
 
         # make sure that the order of rl_ids is kept sorted
         self.__rl_ids.sort()
@@ -389,7 +394,160 @@ class TraCIVehicle(KernelVehicle):
 
     def reset(self):
         """See parent class."""
-        self.previous_speeds = {}
+        self.__store.array("previous_speed")[:] = np.nan
+        self.__store.array("previous_lane")[:] = None
+
+    def _store_results(self, vehicle_obs, departed_obs=None):
+        """Write the subscription results of all vehicles to the state store.
+
+        Parameters
+        ----------
+        vehicle_obs : dict <str, dict>
+            subscription results of the vehicles, as returned by sumo
+        departed_obs : dict <str, dict>, optional
+            subscription results of the vehicles that were subscribed to
+            during this step, which take precedence over `vehicle_obs`
+
+        Returns
+        -------
+        list of dict
+            subscription results of every vehicle, in the order of `get_ids`
+        """
+        store = self.__store
+        veh_ids = self.__ids
+        if departed_obs:
+            obs = [departed_obs.get(veh_id) or vehicle_obs.get(veh_id) or {} for veh_id in veh_ids]
+        else:
+            obs = [vehicle_obs.get(veh_id) or {} for veh_id in veh_ids]
+        slots = store.slots(veh_ids)
+        count = len(obs)
+
+        for name, var, dtype in STORED_VARIABLES:
+            if dtype is float:
+                values = np.fromiter((o.get(var, np.nan) for o in obs), dtype=float, count=count)
+            else:
+                # filled one element at a time, as numpy would unpack routes
+                values = np.empty(count, dtype=object)
+                for i, o in enumerate(obs):
+                    values[i] = o.get(var)
+            store.array(name)[slots] = values
+
+        positions = [o.get(tc.VAR_POSITION) or (np.nan, np.nan) for o in obs]
+        store.array("x")[slots] = np.fromiter((p[0] for p in positions), dtype=float, count=count)
+        store.array("y")[slots] = np.fromiter((p[1] for p in positions), dtype=float, count=count)
+
+        return obs
+
+    def _update_leaders(self, obs):
+        """Update the leader, follower and headway of all vehicles.
+
+        Vehicles without a leader get a headway of 1000 m, and lose their
+        follower. Every other vehicle becomes the follower of its leader, unless
+        the leader already has a closer follower, e.g. on a converging edge.
+        Followers are kept between steps, and ties go to the first vehicle in
+        the order of `get_ids`.
+
+        Parameters
+        ----------
+        obs : list of dict
+            subscription results of every vehicle, in the order of `get_ids`
+        """
+        store = self.__store
+        veh_ids = self.__ids
+        slots = store.slots(veh_ids)
+        count = len(obs)
+
+        leaders = [o.get(tc.VAR_LEADER) for o in obs]
+        has_leader = np.fromiter((lead is not None for lead in leaders), dtype=bool, count=count)
+        gaps = np.fromiter((lead[1] if lead is not None else np.nan for lead in leaders), dtype=float, count=count)
+        headways = np.where(has_leader, gaps + store.array("min_gap")[slots], 1e+3)
+        store.array("headway")[slots] = headways
+        leader_ids = np.empty(count, dtype=object)
+        for i, lead in enumerate(leaders):
+            leader_ids[i] = lead[0] if lead is not None else NO_VEHICLE
+        store.array("leader")[slots] = leader_ids
+
+        # vehicles without a leader (e.g. collided vehicles) lose their
+        # follower
+        store.array("follower")[slots[~has_leader]] = NO_VEHICLE
+        store.array("follower_headway")[slots[~has_leader]] = 1e+3
+
+        # index of the leader of every vehicle in veh_ids
+        index = dict(zip(veh_ids, range(count)))
+        lead_index = np.fromiter(
+            (index.get(lead[0], -1) if lead is not None else -1 for lead in leaders), dtype=int, count=count)
+        # a vehicle without a leader only gets the followers that come after
+        # it in veh_ids, as its follower is reset when it is reached
+        candidates = np.flatnonzero(lead_index >= 0)
+        candidates = candidates[has_leader[lead_index[candidates]] | (candidates > lead_index[candidates])]
+        if len(candidates) == 0:
+            return
+
+        # closest candidate of every leader, the first one in case of ties
+        lead_index = lead_index[candidates]
+        order = np.lexsort((candidates, headways[candidates], lead_index))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = lead_index[order][1:] != lead_index[order][:-1]
+        best = candidates[order[first]]
+        lead_slots = slots[lead_index[order[first]]]
+
+        # the candidates replace the current followers if they are closer
+        current = store.array("follower_headway")[lead_slots]
+        closer = np.isnan(current) | (headways[best] < current)
+        follower_ids = np.empty(np.count_nonzero(closer), dtype=object)
+        follower_ids[:] = [veh_ids[i] for i in best[closer]]
+        store.array("follower")[lead_slots[closer]] = follower_ids
+        store.array("follower_headway")[lead_slots[closer]] = headways[best[closer]]
+
+    def synchronize(self):
+        """See parent class.
+
+        Vehicles that are no longer in the network are removed from this
+        class, and all other vehicles are (re-)added and subscribed to, as sumo
+        drops its subscriptions when a state is loaded.
+        """
+        sumo_ids = self.kernel_api.vehicle.getIDList()
+
+        for veh_id in set(self.__ids) - set(sumo_ids):
+            self.remove(veh_id)
+
+        departed_obs = {}
+        for veh_id in sumo_ids:
+            veh_type = self.kernel_api.vehicle.getTypeID(veh_id)
+            departed_obs[veh_id] = self._add_departed(veh_id, veh_type)
+
+        self.num_vehicles = len(self.__ids)
+        self._store_results({}, departed_obs)
+
+    def get_snapshot(self):
+        """See parent class.
+
+        The counts of departed and arrived vehicles and the time of the last
+        lane change of the rl vehicles are stored.
+        """
+        return {
+            "time_counter": self.time_counter,
+            "num_not_departed": self.num_not_departed,
+            "num_departed": list(self._num_departed),
+            "num_arrived": list(self._num_arrived),
+            "departed_ids": self._departed_ids,
+            "arrived_ids": self._arrived_ids,
+            "arrived_rl_ids": deepcopy(self._arrived_rl_ids),
+            "last_lc": {veh_id: self.__vehicles[veh_id]["last_lc"] for veh_id in self.__rl_ids},
+        }
+
+    def restore_snapshot(self, snapshot):
+        """See parent class."""
+        self.time_counter = snapshot["time_counter"]
+        self.num_not_departed = snapshot["num_not_departed"]
+        self._num_departed = list(snapshot["num_departed"])
+        self._num_arrived = list(snapshot["num_arrived"])
+        self._departed_ids = snapshot["departed_ids"]
+        self._arrived_ids = snapshot["arrived_ids"]
+        self._arrived_rl_ids = deepcopy(snapshot["arrived_rl_ids"])
+        for veh_id, last_lc in snapshot["last_lc"].items():
+            if veh_id in self.__vehicles:
+                self.__vehicles[veh_id]["last_lc"] = last_lc
 
     def remove(self, veh_id):
         """See parent class."""
@@ -405,8 +563,7 @@ class TraCIVehicle(KernelVehicle):
         if veh_id in self.__vehicles:
             del self.__vehicles[veh_id]
 
-        if veh_id in self.__sumo_obs:
-            del self.__sumo_obs[veh_id]
+        self.__store.remove(veh_id)
 
         # remove it from all other id lists (if it is there)
         if veh_id in self.__human_ids:
@@ -426,31 +583,31 @@ class TraCIVehicle(KernelVehicle):
 
     def test_set_speed(self, veh_id, speed):
         """Set the speed of the specified vehicle."""
-        self.__sumo_obs[veh_id][tc.VAR_SPEED] = speed
+        self.__store.set("speed", veh_id, speed)
 
     def test_set_edge(self, veh_id, edge):
         """Set the speed of the specified vehicle."""
-        self.__sumo_obs[veh_id][tc.VAR_ROAD_ID] = edge
+        self.__store.set("edge", veh_id, edge)
 
     def set_follower(self, veh_id, follower):
         """Set the follower of the specified vehicle."""
-        self.__vehicles[veh_id]["follower"] = follower
+        self.__store.set("follower", veh_id, NO_VEHICLE if follower is None else follower)
 
     def set_headway(self, veh_id, headway):
         """Set the headway of the specified vehicle."""
-        self.__vehicles[veh_id]["headway"] = headway
+        self.__store.set("headway", veh_id, headway)
 
     def get_orientation(self, veh_id):
         """See parent class."""
-        return self.__vehicles[veh_id]["orientation"]
+        return list(self.get_2d_position(veh_id)) + [self.__store.get("angle", veh_id, -1001)]
 
     def get_timestep(self, veh_id):
         """See parent class."""
-        return self.__vehicles[veh_id]["timestep"]
+        return self._timestep
 
     def get_timedelta(self, veh_id):
         """See parent class."""
-        return self.__vehicles[veh_id]["timedelta"]
+        return self._timedelta
 
     def get_type(self, veh_id):
         """Return the type of the vehicle of veh_id."""
@@ -496,6 +653,7 @@ class TraCIVehicle(KernelVehicle):
 
     def get_ids_by_edge(self, edges):
         """See parent class."""
+        self._update_multi_lane_data()
         if isinstance(edges, (list, np.ndarray)):
             return sum([self.get_ids_by_edge(edge) for edge in edges], [])
         return self._ids_by_edge.get(edges, []) or []
@@ -547,53 +705,59 @@ class TraCIVehicle(KernelVehicle):
         """Return fuel consumption in gallons/s."""
         ml_to_gallons = 0.000264172
         if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_fuel_consumption(vehID, error) for vehID in veh_id]
-        return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_FUELCONSUMPTION, error) * ml_to_gallons
+            return [fuel * ml_to_gallons for fuel in self.__store.get("fuel_consumption", veh_id, error)]
+        return self.__store.get("fuel_consumption", veh_id, error) * ml_to_gallons
+
+    def get_emission(self, veh_id, emission, error=-1001):
+        """Return an emission rate of the specified vehicles, in sumo units.
+
+        Parameters
+        ----------
+        veh_id : str or list of str
+            vehicle id, or list of vehicle ids
+        emission : str
+            "fuel" for the fuel consumption, or "co2" for the CO2 emission, in
+            mg/s. The CO2 emission is only available if the trip metrics are
+            collected, see the `trip_metrics` attribute of SumoParams, and is
+            `error` otherwise
+        error : any, optional
+            value that is returned if the vehicle is not found
+
+        Returns
+        -------
+        float or list of float
+        """
+        return self.__store.get(EMISSIONS[emission], veh_id, error)
 
     def get_previous_speed(self, veh_id, error=-1001):
         """See parent class."""
-        if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_previous_speed(vehID, error) for vehID in veh_id]
-        return self.previous_speeds.get(veh_id, 0)
+        return self.__store.get("previous_speed", veh_id, 0)
 
     def get_speed(self, veh_id, error=-1001):
         """See parent class."""
-        if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_speed(vehID, error) for vehID in veh_id]
-        return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_SPEED, error)
+        return self.__store.get("speed", veh_id, error)
 
     def get_default_speed(self, veh_id, error=-1001):
         """See parent class."""
-        if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_default_speed(vehID, error) for vehID in veh_id]
-        return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_SPEED_WITHOUT_TRACI,
-                                                   error)
+        return self.__store.get("default_speed", veh_id, error)
 
     def get_position(self, veh_id, error=-1001):
         """See parent class."""
-        if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_position(vehID, error) for vehID in veh_id]
-        return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_LANEPOSITION, error)
+        return self.__store.get("position", veh_id, error)
 
     def get_edge(self, veh_id, error=""):
         """See parent class."""
-        if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_edge(vehID, error) for vehID in veh_id]
-        return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_ROAD_ID, error)
+        return self.__store.get("edge", veh_id, error)
 
     def get_lane(self, veh_id, error=""):
         """See parent class."""
-        if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_lane(vehID, error) for vehID in veh_id]
-        return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_LANE_INDEX, error)
+        return self.__store.get("lane", veh_id, error)
 
     def get_route(self, veh_id, error=None):
         """See parent class."""
         if error is None:
             error = list()
-        if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_route(vehID, error) for vehID in veh_id]
-        return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_EDGES, error)
+        return self.__store.get("route", veh_id, error)
 
     def get_length(self, veh_id, error=-1001):
         """See parent class."""
@@ -603,21 +767,27 @@ class TraCIVehicle(KernelVehicle):
 
     def get_leader(self, veh_id, error=""):
         """See parent class."""
-        if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_leader(vehID, error) for vehID in veh_id]
-        return self.__vehicles.get(veh_id, {}).get("leader", error)
+        return self._get_neighbor("leader", veh_id, error)
 
     def get_follower(self, veh_id, error=""):
         """See parent class."""
-        if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_follower(vehID, error) for vehID in veh_id]
-        return self.__vehicles.get(veh_id, {}).get("follower", error)
+        return self._get_neighbor("follower", veh_id, error)
 
     def get_headway(self, veh_id, error=-1001):
         """See parent class."""
+        return self.__store.get("headway", veh_id, error)
+
+    def _get_neighbor(self, name, veh_id, error):
+        """Return the leader or follower of one or several vehicles.
+
+        The neighbor is None for vehicles that have none, and `error` for
+        vehicles whose neighbor was never set.
+        """
         if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_headway(vehID, error) for vehID in veh_id]
-        return self.__vehicles.get(veh_id, {}).get("headway", error)
+            return [None if neighbor is NO_VEHICLE else neighbor
+                    for neighbor in self.__store.get(name, veh_id, error)]
+        neighbor = self.__store.get(name, veh_id, error)
+        return None if neighbor is NO_VEHICLE else neighbor
 
     def get_last_lc(self, veh_id, error=-1001):
         """See parent class."""
@@ -629,7 +799,7 @@ class TraCIVehicle(KernelVehicle):
                           ' {}.'.format(veh_id, error))
             return error
         else:
-            return self.__vehicles.get(veh_id, {}).get("headway", error)
+            return self.__store.get("headway", veh_id, error)
 
     def get_acc_controller(self, veh_id, error=None):
         """See parent class."""
@@ -660,6 +830,7 @@ class TraCIVehicle(KernelVehicle):
 
     def get_lane_headways(self, veh_id, error=None):
         """See parent class."""
+        self._update_multi_lane_data()
         if error is None:
             error = list()
         if isinstance(veh_id, (list, np.ndarray)):
@@ -684,6 +855,7 @@ class TraCIVehicle(KernelVehicle):
 
     def get_lane_leaders(self, veh_id, error=None):
         """See parent class."""
+        self._update_multi_lane_data()
         if error is None:
             error = list()
         if isinstance(veh_id, (list, np.ndarray)):
@@ -696,6 +868,7 @@ class TraCIVehicle(KernelVehicle):
 
     def get_lane_tailways(self, veh_id, error=None):
         """See parent class."""
+        self._update_multi_lane_data()
         if error is None:
             error = list()
         if isinstance(veh_id, (list, np.ndarray)):
@@ -708,6 +881,7 @@ class TraCIVehicle(KernelVehicle):
 
     def get_lane_followers(self, veh_id, error=None):
         """See parent class."""
+        self._update_multi_lane_data()
         if error is None:
             error = list()
         if isinstance(veh_id, (list, np.ndarray)):
@@ -720,39 +894,30 @@ class TraCIVehicle(KernelVehicle):
         This includes the lane leaders/followers/headways/tailways/
         leader velocity/follower velocity for all
         vehicles in the network.
+
+        All vehicles are sorted once by edge, lane and position, so that the
+        vehicles of every lane form a contiguous block of the sorted vehicles.
+        Lane leaders and followers are then found by binary search within the
+        block of each lane, or in the first non-empty block along the next or
+        previous edges of the lane.
         """
-        edge_list = self.master_kernel.network.get_edge_list()
-        junction_list = self.master_kernel.network.get_junction_list()
-        tot_list = edge_list + junction_list
-        num_edges = (len(self.master_kernel.network.get_edge_list()) + len(
-            self.master_kernel.network.get_junction_list()))
-
-        # maximum number of lanes in the network
-        max_lanes = max([self.master_kernel.network.num_lanes(edge_id)
-                         for edge_id in tot_list])
-
-        # Key = edge id
-        # Element = list, with the ith element containing tuples with the name
-        #           and position of all vehicles in lane i
-        edge_dict = dict.fromkeys(tot_list)
-
-        # add the vehicles to the edge_dict element
-        for veh_id in self.get_ids():
-            edge = self.get_edge(veh_id)
-            lane = self.get_lane(veh_id)
-            pos = self.get_position(veh_id)
-            if edge:
-                if edge_dict[edge] is None:
-                    edge_dict[edge] = [[] for _ in range(max_lanes)]
-                edge_dict[edge][lane].append((veh_id, pos))
-
-        # sort all lanes in each edge by position
-        for edge in tot_list:
-            if edge_dict[edge] is None:
-                del edge_dict[edge]
-            else:
-                for lane in range(max_lanes):
-                    edge_dict[edge][lane].sort(key=lambda x: x[1])
+        tables = self._lane_tables()
+        codes = tables["codes"]
+        max_lanes = tables["max_lanes"]
+
+        # vehicles without an edge (e.g. teleporting ones) are not placed
+        ids = self.__ids
+        edges = self.get_edge(ids)
+        placed = [i for i, edge in enumerate(edges) if edge]
+        keys = np.array([codes[edges[i]] for i in placed], dtype=int) * max_lanes \
+            + np.array(self.get_lane([ids[i] for i in placed]), dtype=int)
+        positions = np.array(self.get_position([ids[i] for i in placed]), dtype=float)
+
+        # sort by lane and position, with ties kept in the order of the ids
+        order = np.lexsort((positions, keys))
+        vehicles = (keys[order],
+                    positions[order],
+                    np.array([ids[placed[i]] for i in order], dtype=object))
 
         for veh_id in self.get_rl_ids():
             # collect the lane leaders, followers, headways, and tailways for
@@ -760,8 +925,7 @@ class TraCIVehicle(KernelVehicle):
             edge = self.get_edge(veh_id)
             if edge:
                 headways, tailways, leaders, followers = \
-                    self._multi_lane_headways_util(veh_id, edge_dict,
-                                                   num_edges)
+                    self._multi_lane_headways_util(veh_id, vehicles)
 
                 # add the above values to the vehicles class
                 self.set_lane_headways(veh_id, headways)
@@ -769,28 +933,115 @@ class TraCIVehicle(KernelVehicle):
                 self.set_lane_leaders(veh_id, leaders)
                 self.set_lane_followers(veh_id, followers)
 
-        self._ids_by_edge = dict().fromkeys(edge_list)
+        # vehicles of every edge, sorted by lane and position
+        self._ids_by_edge = dict().fromkeys(self.master_kernel.network.get_edge_list())
+        sorted_keys, _, sorted_ids = vehicles
+        edge_codes = sorted_keys // max_lanes
+        bounds = np.concatenate(
+            [[0], np.flatnonzero(np.diff(edge_codes)) + 1, [len(edge_codes)]])
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            if stop > start:
+                edge = tables["edges"][edge_codes[start]]
+                self._ids_by_edge[edge] = sorted_ids[start:stop].tolist()
+
+    def _update_multi_lane_data(self):
+        """Compute the multi-lane data, if it is outdated.
+
+        The multi-lane data is only computed when it is requested after an
+        update, so that environments that do not use it do not pay for it.
+        """
+        if self._multi_lane_outdated:
+            self._multi_lane_outdated = False
+            self._multi_lane_headways()
+
+    def _lane_tables(self):
+        """Return the lane lookup tables of the network.
+
+        Returns
+        -------
+        dict
+            * "edges": names of all edges and junctions
+            * "codes": index of every edge and junction in "edges"
+            * "max_lanes": maximum number of lanes in the network
+            * "chains": cache of the lanes along the next or previous edges of
+              a lane, see `_edge_chain`
+        """
+        if self._lane_tables_cache is None:
+            network = self.master_kernel.network
+            edges = network.get_edge_list() + network.get_junction_list()
+            self._lane_tables_cache = {
+                "edges": edges,
+                "codes": {edge: i for i, edge in enumerate(edges)},
+                "max_lanes": max([network.num_lanes(edge) for edge in edges]),
+                "chains": {},
+            }
+        return self._lane_tables_cache
+
+    def _edge_chain(self, edge, lane, forward):
+        """Return the lanes along the next or previous edges of a lane.
+
+        Only the first next or previous edge/lane pair is followed, for at
+        most as many steps as there are edges and junctions in the network.
+
+        Parameters
+        ----------
+        edge : str
+            name of the edge
+        lane : int
+            lane index
+        forward : bool
+            whether to follow the next edges, or the previous edges otherwise
 
-        for edge_id in edge_dict:
-            edges = list(itertools.chain.from_iterable(edge_dict[edge_id]))
-            # check for edges with no vehicles
-            if len(edges) > 0:
-                edges, _ = zip(*edges)
-                self._ids_by_edge[edge_id] = list(edges)
+        Returns
+        -------
+        list of (int or None, float)
+            sorting key of every lane along the chain, None if the lane cannot
+            hold vehicles, and the distance to add to positions on the lane to
+            express them relative to the start of the initial edge
+        """
+        tables = self._lane_tables()
+        chains = tables["chains"]
+        if (edge, lane, forward) in chains:
+            return chains[edge, lane, forward]
+
+        network = self.master_kernel.network
+        codes = tables["codes"]
+        max_lanes = tables["max_lanes"]
+        chain = []
+        this_edge, this_lane = edge, lane
+        add_length = 0  # length increment in headway
+        for _ in range(len(tables["edges"])):
+            if forward:
+                # break if there are no edge/lane pairs in front of the current one
+                if len(network.next_edge(this_edge, this_lane)) == 0:
+                    break
+                add_length += network.edge_length(this_edge)
+                this_edge, this_lane = network.next_edge(this_edge, this_lane)[0]
+            else:
+                # break if there are no edge/lane pairs behind the current one
+                if len(network.prev_edge(this_edge, this_lane)) == 0:
+                    break
+                this_edge, this_lane = network.prev_edge(this_edge, this_lane)[0]
+                add_length += network.edge_length(this_edge)
+
+            if this_edge in codes and this_lane < max_lanes:
+                chain.append((codes[this_edge] * max_lanes + this_lane, add_length))
             else:
-                self._ids_by_edge[edge_id] = []
+                chain.append((None, add_length))
+
+        chains[edge, lane, forward] = chain
+        return chain
 
-    def _multi_lane_headways_util(self, veh_id, edge_dict, num_edges):
+    def _multi_lane_headways_util(self, veh_id, vehicles):
         """Compute multi-lane data for the specified vehicle.
 
         Parameters
         ----------
         veh_id : str
             name of the vehicle
-        edge_dict : dict < list<tuple> >
-            Key = Edge name
-                Index = lane index
-                Element = list sorted by position of (vehicle id, position)
+        vehicles : (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+            sorting keys, positions, and names of all placed vehicles, sorted
+            by edge, lane and position
 
         Returns
         -------
@@ -800,12 +1051,6 @@ class TraCIVehicle(KernelVehicle):
         tailway : list<float>
             Index = lane index
             Element = tailway at this lane
-        lead_speed : list<str>
-            Index = lane index
-            Element = speed of leader at this lane
-        follow_speed : list<str>
-            Index = lane index
-            Element = speed of follower at this lane
         leader : list<str>
             Index = lane index
             Element = leader at this lane
@@ -813,6 +1058,8 @@ class TraCIVehicle(KernelVehicle):
             Index = lane index
             Element = follower at this lane
         """
+        sorted_keys, sorted_pos, sorted_ids = vehicles
+        tables = self._lane_tables()
         this_pos = self.get_position(veh_id)
         this_edge = self.get_edge(veh_id)
         this_lane = self.get_lane(veh_id)
@@ -824,54 +1071,53 @@ class TraCIVehicle(KernelVehicle):
         leader = [""] * num_lanes
         follower = [""] * num_lanes
 
+        # blocks of the vehicles in every lane of the current edge
+        lane_keys = tables["codes"][this_edge] * tables["max_lanes"] + np.arange(num_lanes)
+        starts = np.searchsorted(sorted_keys, lane_keys, side="left")
+        stops = np.searchsorted(sorted_keys, lane_keys, side="right")
+
         for lane in range(num_lanes):
+            start, stop = starts[lane], stops[lane]
             # check the vehicle's current  edge for lane leaders and followers
-            if len(edge_dict[this_edge][lane]) > 0:
-                ids, positions = zip(*edge_dict[this_edge][lane])
-                ids = list(ids)
-                positions = list(positions)
-                index = bisect_left(positions, this_pos)
+            if stop > start:
+                index = start + np.searchsorted(sorted_pos[start:stop], this_pos, side="left")
 
                 # if you are at the end or the front of the edge, the lane
                 # leader is in the edges in front of you
-                if (lane == this_lane and index < len(positions) - 1) \
-                        or (lane != this_lane and index < len(positions)):
+                if (lane == this_lane and index < stop - 1) \
+                        or (lane != this_lane and index < stop):
                     # check if the index does not correspond to the current
                     # vehicle
-                    if ids[index] == veh_id:
-                        leader[lane] = ids[index + 1]
-                        headway[lane] = (positions[index + 1] - this_pos -
-                                         self.get_length(leader[lane]))
-                    else:
-                        leader[lane] = ids[index]
-                        headway[lane] = (positions[index] - this_pos
-                                         - self.get_length(leader[lane]))
+                    lead = index + 1 if sorted_ids[index] == veh_id else index
+                    leader[lane] = sorted_ids[lead]
+                    headway[lane] = (float(sorted_pos[lead]) - this_pos -
+                                     self.get_length(leader[lane]))
 
                 # you are in the back of the queue, the lane follower is in the
                 # edges behind you
-                if index > 0:
-                    follower[lane] = ids[index - 1]
-                    tailway[lane] = (this_pos - positions[index - 1]
+                if index > start:
+                    follower[lane] = sorted_ids[index - 1]
+                    tailway[lane] = (this_pos - float(sorted_pos[index - 1])
                                      - self.get_length(veh_id))
 
             # if lane leader not found, check next edges
             if leader[lane] == "":
                 headway[lane], leader[lane] = self._next_edge_leaders(
-                    veh_id, edge_dict, lane, num_edges)
+                    veh_id, vehicles, lane)
 
             # if lane follower not found, check previous edges
             if follower[lane] == "":
                 tailway[lane], follower[lane] = self._prev_edge_followers(
-                    veh_id, edge_dict, lane, num_edges)
+                    veh_id, vehicles, lane)
 
         return headway, tailway, leader, follower
 
-    def _next_edge_leaders(self, veh_id, edge_dict, lane, num_edges):
+    def _next_edge_leaders(self, veh_id, vehicles, lane):
         """Search for leaders in the next edge.
 
         Looks to the edges/junctions in front of the vehicle's current edge
-        for potential leaders. This is currently done by only looking one
-        edge/junction forwards.
+        for potential leaders, following the first next edge/lane pair of
+        every edge.
 
         Returns
         -------
@@ -880,43 +1126,29 @@ class TraCIVehicle(KernelVehicle):
         leader : str
             lane leader for the specified lane
         """
+        sorted_keys, sorted_pos, sorted_ids = vehicles
         pos = self.get_position(veh_id)
         edge = self.get_edge(veh_id)
 
-        headway = 1000  # env.network.length
-        leader = ""
-        add_length = 0  # length increment in headway
-
-        for _ in range(num_edges):
-            # break if there are no edge/lane pairs behind the current one
-            if len(self.master_kernel.network.next_edge(edge, lane)) == 0:
-                break
-
-            add_length += self.master_kernel.network.edge_length(edge)
-            edge, lane = self.master_kernel.network.next_edge(edge, lane)[0]
-
-            try:
-                if len(edge_dict[edge][lane]) > 0:
-                    leader = edge_dict[edge][lane][0][0]
-                    headway = edge_dict[edge][lane][0][1] - pos + add_length \
-                        - self.get_length(leader)
-            except KeyError:
-                # current edge has no vehicles, so move on
-                # print(traceback.format_exc())
+        for key, add_length in self._edge_chain(edge, lane, forward=True):
+            if key is None:
                 continue
+            start = np.searchsorted(sorted_keys, key, side="left")
+            # stop at the rearmost vehicle of the first lane with vehicles
+            if start < len(sorted_keys) and sorted_keys[start] == key:
+                leader = sorted_ids[start]
+                headway = float(sorted_pos[start]) - pos + add_length \
+                    - self.get_length(leader)
+                return headway, leader
 
-            # stop if a lane follower is found
-            if leader != "":
-                break
-
-        return headway, leader
+        return 1000, ""
 
-    def _prev_edge_followers(self, veh_id, edge_dict, lane, num_edges):
+    def _prev_edge_followers(self, veh_id, vehicles, lane):
         """Search for followers in the previous edge.
 
         Looks to the edges/junctions behind the vehicle's current edge for
-        potential followers. This is currently done by only looking one
-        edge/junction backwards.
+        potential followers, following the first previous edge/lane pair of
+        every edge.
 
         Returns
         -------
@@ -925,36 +1157,21 @@ class TraCIVehicle(KernelVehicle):
         follower : str
             lane follower for the specified lane
         """
+        sorted_keys, sorted_pos, sorted_ids = vehicles
         pos = self.get_position(veh_id)
         edge = self.get_edge(veh_id)
 
-        tailway = 1000  # env.network.length
-        follower = ""
-        add_length = 0  # length increment in headway
-
-        for _ in range(num_edges):
-            # break if there are no edge/lane pairs behind the current one
-            if len(self.master_kernel.network.prev_edge(edge, lane)) == 0:
-                break
-
-            edge, lane = self.master_kernel.network.prev_edge(edge, lane)[0]
-            add_length += self.master_kernel.network.edge_length(edge)
-
-            try:
-                if len(edge_dict[edge][lane]) > 0:
-                    tailway = pos - edge_dict[edge][lane][-1][1] + add_length \
-                              - self.get_length(veh_id)
-                    follower = edge_dict[edge][lane][-1][0]
-            except KeyError:
-                # current edge has no vehicles, so move on
-                # print(traceback.format_exc())
+        for key, add_length in self._edge_chain(edge, lane, forward=False):
+            if key is None:
                 continue
+            stop = np.searchsorted(sorted_keys, key, side="right")
+            # stop at the frontmost vehicle of the first lane with vehicles
+            if stop > 0 and sorted_keys[stop - 1] == key:
+                tailway = pos - float(sorted_pos[stop - 1]) + add_length \
+                    - self.get_length(veh_id)
+                return tailway, sorted_ids[stop - 1]
 
-            # stop if a lane follower is found
-            if follower != "":
-                break
-
-        return tailway, follower
+        return 1000, ""
 
     def apply_acceleration(self, veh_ids, acc, smooth=True):
         """See parent class."""
@@ -963,8 +1180,9 @@ class TraCIVehicle(KernelVehicle):
             veh_ids = [veh_ids]
             acc = [acc]
 
+        ids = set(self.__ids)
         for i, vid in enumerate(veh_ids):
-            if acc[i] is not None and vid in self.get_ids():
+            if acc[i] is not None and vid in ids:
                 self.__vehicles[vid]["accel"] = acc[i]
                 this_vel = self.get_speed(vid)
                 next_vel = max([this_vel + acc[i] * self.sim_step, 0])
@@ -985,6 +1203,7 @@ class TraCIVehicle(KernelVehicle):
             raise ValueError(
                 "Direction values for lane changes may only be: -1, 0, or 1.")
 
+        rl_ids = set(self.__rl_ids)
         for i, veh_id in enumerate(veh_ids):
             # check for no lane change
             if direction[i] == 0:
@@ -1003,7 +1222,7 @@ class TraCIVehicle(KernelVehicle):
                 self.kernel_api.vehicle.changeLane(
                     veh_id, int(target_lane), self.sim_step)
 
-                if veh_id in self.get_rl_ids():
+                if veh_id in rl_ids:
                     self.prev_last_lc[veh_id] = \
                         self.__vehicles[veh_id]["last_lc"]
 
@@ -1022,7 +1241,11 @@ class TraCIVehicle(KernelVehicle):
     def get_x_by_id(self, veh_id):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_x_by_id(vehID) for vehID in veh_id]
+            # the positions of all vehicles are mapped at once by the network
+            edges = self.get_edge(veh_id)
+            x = self.master_kernel.network.get_x(
+                edges, self.get_position(veh_id))
+            return np.where([edge == '' for edge in edges], 0., x).tolist()
         if self.get_edge(veh_id) == '':
             # occurs when a vehicle crashes is teleported for some other reason
             return 0.
@@ -1048,9 +1271,10 @@ class TraCIVehicle(KernelVehicle):
                 print('Error when updating rl vehicle colors:', e)
 
         # color vehicles white if not observed and cyan if observed
+        observed_ids = set(self.__observed_ids)
         for veh_id in self.get_human_ids():
             try:
-                color = CYAN if veh_id in self.get_observed_ids() else WHITE
+                color = CYAN if veh_id in observed_ids else WHITE
                 # If vehicle is already being colored via argument to vehicles.add(), don't re-color it.
                 if self._force_color_update or 'color' not in \
                         self.type_parameters[self.get_type(veh_id)]:
@@ -1180,11 +1404,14 @@ class TraCIVehicle(KernelVehicle):
 
     def get_2d_position(self, veh_id, error=-1001):
         """See parent class."""
-        return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_POSITION, error)
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_2d_position(vehID, error) for vehID in veh_id]
+        x = self.__store.get("x", veh_id, None)
+        return error if x is None else (x, self.__store.get("y", veh_id, None))
 
     def get_distance(self, veh_id, error=-1001):
         """See parent class."""
-        return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_DISTANCE, error)
+        return self.__store.get("distance", veh_id, error)
 
     def get_road_grade(self, veh_id):
         """See parent class."""
@@ -1192,12 +1419,8 @@ class TraCIVehicle(KernelVehicle):
         return 0
 
     def get_waiting(self, veh_id, error=-1001):
-        if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_waiting(vehID, error) for vehID in veh_id]
-        return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_WAITING_TIME, error)
+        return self.__store.get("waiting_time", veh_id, error)
 
     def get_waiting_accumulative(self, veh_id, error=-1001):
-        if isinstance(veh_id, (list, np.ndarray)):
-            return [self.get_waiting_accumulative(vehID, error) for vehID in veh_id]
-        return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_ACCUMULATED_WAITING_TIME, error)
+        return self.__store.get("accumulated_waiting_time", veh_id, error)
 
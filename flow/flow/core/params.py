@@ -588,6 +588,52 @@ class SumoParams(SimParams):
         current time step
     use_ballistic: bool, optional
         If true, use a ballistic integration step instead of an euler step
+    warmup_snapshot : bool, optional
+        specifies whether to store the state of the simulation after the
+        warmup steps of a rollout in an on-disk cache, and to restore it in
+        later rollouts instead of replaying the warmup steps. The cache is
+        keyed by the network files, the simulation parameters and the seed.
+    warmup_seeds : list of int, optional
+        seeds that are sampled from when a sumo instance is restarted while
+        `warmup_snapshot` is set to True. A bounded number of seeds is needed
+        for the stored states to be reused; defaults to range(10)
+    backend : str, optional
+        interface used to communicate with sumo. One of:
+
+        * "traci": sumo runs in a subprocess and is controlled through a TraCI
+          socket, defaults
+        * "libsumo": sumo runs within the python process through libsumo, which
+          avoids the socket communication and the start delay. This requires
+          the libsumo package, and only one simulation may run per process.
+          Rollouts that are rendered with sumo-gui always use TraCI
+    emission_fields : list of str, optional
+        vehicle data recorded at every step in the emission file of flow when
+        `emission_path` is specified, in addition to the time and vehicle id.
+        See flow.core.kernel.simulation.emission.EMISSION_FIELDS for the
+        available fields; defaults to all of them
+    emission_format : str, optional
+        format of the emission file of flow, one of "csv" (default),
+        "parquet" or "arrow" (Arrow IPC). The last two require pyarrow
+    trip_metrics : bool, optional
+        whether the metrics of the trips of vehicles (travel time, fuel, CO2,
+        number of running vehicles...) are aggregated during the simulation,
+        see flow.core.kernel.simulation.metrics.TripMetrics. They are
+        returned by the get_trip_metrics method of the simulation kernel.
+        Defaults to False, as the CO2 emission of the vehicles is only
+        subscribed to when they are collected
+    reload_instance : bool, optional
+        if `restart_instance` is set to True, whether to keep the sumo process
+        alive and load the simulation again in it with traci.load upon
+        reset, with a new seed, instead of starting a new sumo process. This
+        saves starting sumo and regenerating the network on every reset.
+        Sumo is still restarted if it runs with another gui setting or more
+        clients
+    timeseries_path : str, optional
+        path to the folder in which the number of running vehicles, the mean
+        speed and the number of halting vehicles at every step of every
+        rollout are saved, as compressed numpy archives, see
+        flow.core.kernel.simulation.timeseries.TimeSeriesRecorder. Nothing is
+        saved if this value is not specified
     """
 
     def __init__(self,
@@ -609,7 +655,15 @@ class SumoParams(SimParams):
                  teleport_time=-1,
                  num_clients=1,
                  color_by_speed=False,
-                 use_ballistic=False):
+                 use_ballistic=False,
+                 warmup_snapshot=False,
+                 warmup_seeds=None,
+                 backend="traci",
+                 emission_fields=None,
+                 emission_format="csv",
+                 trip_metrics=False,
+                 timeseries_path=None,
+                 reload_instance=False):
         """Instantiate SumoParams."""
         super(SumoParams, self).__init__(
             sim_step, render, restart_instance, emission_path, save_render,
@@ -624,6 +678,18 @@ class SumoParams(SimParams):
         self.num_clients = num_clients
         self.color_by_speed = color_by_speed
         self.use_ballistic = use_ballistic
+        self.warmup_snapshot = warmup_snapshot
+        self.warmup_seeds = list(range(10)) if warmup_seeds is None \
+            else list(warmup_seeds)
+        if backend not in ["traci", "libsumo"]:
+            raise ValueError('backend must be one of "traci" or "libsumo", got "{}"'.format(backend))
+        self.backend = backend
+        self.emission_fields = None if emission_fields is None \
+            else list(emission_fields)
+        self.emission_format = emission_format
+        self.trip_metrics = trip_metrics
+        self.timeseries_path = timeseries_path
+        self.reload_instance = reload_instance
 
 
 class EnvParams:
@@ -700,9 +766,12 @@ class NetParams:
     osm_path : str, optional
         path to the .osm file that should be used to generate the network
         configuration files
-    template : str, optional
+    template : str or dict, optional
         path to the network template file that can be used to instantiate a
-        netowrk in the simulator of choice
+        netowrk in the simulator of choice. For sumo, this may also be a dict
+        with the paths of the "net", "rou" and "vtype" files, and "add", the
+        path(s) of additional files loaded along with the network, e.g. E1
+        detectors
     additional_params : dict, optional
         network specific parameters; see each subclass for a description of
         what is needed
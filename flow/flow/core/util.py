@@ -2,10 +2,20 @@
 
 import csv
 import errno
+import hashlib
 import os
+import pickle
+import stat
+import warnings
 from lxml import etree
 from xml.etree import ElementTree
 
+import flow.config as config
+
+# version of the format of the files of read_cached, caches of other versions
+# are read again
+CACHE_VERSION = 1
+
 
 def makexml(name, nsl):
     """Create an xml file."""
@@ -32,6 +42,111 @@ def ensure_dir(path):
     return path
 
 
+def ensure_cache_dir():
+    """Create the cache directory of flow, and check that it can be trusted.
+
+    The directory `flow.config.CACHE_DIR` is created with permissions
+    restricted to the current user. As the files of the cache are unpickled,
+    the cache is not used if the directory is owned by another user, or if
+    other users may write into it.
+
+    Returns
+    -------
+    str or None
+        path to the cache directory, or None if it cannot be used
+    """
+    path = config.CACHE_DIR
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        status = os.stat(path)
+    except OSError as e:
+        warnings.warn('Cache directory {} cannot be used: {}'.format(path, e))
+        return None
+
+    if hasattr(os, 'getuid') and status.st_uid != os.getuid():
+        warnings.warn('Cache directory {} is not owned by the current user, '
+                      'it is not used.'.format(path))
+        return None
+    if status.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        warnings.warn('Cache directory {} is writable by other users, it is '
+                      'not used.'.format(path))
+        return None
+    return path
+
+
+def hash_files(file_names, extra=None):
+    """Compute a digest of the content of a collection of files.
+
+    Parameters
+    ----------
+    file_names : list of str
+        paths to the files to include in the digest. Paths that do not exist
+        are ignored
+    extra : str, optional
+        additional information to include in the digest, e.g. the parameters
+        that were used to generate the files
+
+    Returns
+    -------
+    str
+        the hexadecimal sha1 digest
+    """
+    digest = hashlib.sha1()
+    for file_name in file_names:
+        if file_name is None or not os.path.isfile(file_name):
+            continue
+        with open(file_name, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    if extra is not None:
+        digest.update(str(extra).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def read_cached(name, file_names, read):
+    """Read data from files through a cache in `flow.config.CACHE_DIR`.
+
+    The data is keyed by the content of the files, the qualified name of
+    `read` and `CACHE_VERSION`, so that it is read only once for all networks,
+    rollout workers and runs using the same files and reader. The version must
+    be incremented when a reader returns data in another format.
+
+    Parameters
+    ----------
+    name : str
+        prefix of the name of the cache file
+    file_names : str or list of str
+        paths to the files, passed to `read`
+    read : callable
+        function reading the data from the files on a cache miss
+
+    Returns
+    -------
+    Any
+        the data returned by `read`
+    """
+    cache_dir = ensure_cache_dir()
+    if cache_dir is None:
+        return read(file_names)
+
+    paths = [file_names] if isinstance(file_names, str) else list(file_names)
+    reader = '{}:{}.{}'.format(CACHE_VERSION, read.__module__, read.__qualname__)
+    cache_file = os.path.join(
+        cache_dir, '{}-{}.pkl'.format(name, hash_files(paths, extra=reader)))
+    if os.path.isfile(cache_file):
+        with open(cache_file, 'rb') as f:
+            return pickle.load(f)
+
+    data = read(file_names)
+    # write to a temporary file first, so that concurrent workers never read
+    # a partially written cache
+    tmp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+    with open(tmp_file, 'wb') as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+    return data
+
+
 def emission_to_csv(emission_path, output_path=None):
     """Convert an emission file generated by sumo into a csv file.
 
@@ -2,14 +2,18 @@
 
 from abc import ABCMeta, abstractmethod
 from copy import deepcopy
+import hashlib
+import json
 import os
 import atexit
-import time
+import pickle
 import traceback
 import numpy as np
 import random
+import re
 import shutil
 import subprocess
+import warnings
 from flow.renderer.pyglet_renderer import PygletRenderer as Renderer
 from flow.utils.flow_warnings import deprecated_attribute
 
@@ -21,10 +25,34 @@ from traci.exceptions import TraCIException
 
 import sumolib
 
-from flow.core.util import ensure_dir
+import flow.config as config
+from flow.core.util import ensure_dir, ensure_cache_dir
 from flow.core.kernel import Kernel
 from flow.utils.exceptions import FatalFlowError
 
+# comments of the xml files, which are not part of the key of the warm-up
+# snapshots
+XML_COMMENT = re.compile(rb'<!--.*?-->', re.DOTALL)
+
+
+def _snapshot_key_value(value):
+    """Convert a parameter of the key of the warm-up snapshots to json.
+
+    Only values with a stable representation across processes are accepted.
+
+    Raises
+    ------
+    TypeError
+        if the value cannot be converted
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
 
 class Env(gym.Env, metaclass=ABCMeta):
     """Base environment class.
@@ -97,8 +125,16 @@ class Env(gym.Env, metaclass=ABCMeta):
         renderer class, used to collect image-based representations of the
         traffic network. This attribute is set to None if `sim_params.render`
         is set to True or False.
+    snapshot_attributes : list of str
+        names of the attributes of the environment that are stored and
+        restored alongside the state of the simulation when the warm-up
+        snapshots of `SumoParams(warmup_snapshot=True)` are used. Environments
+        that accumulate information during the warm-up steps should list it
+        here.
     """
 
+    snapshot_attributes = []
+
     def __init__(self,
                  env_params,
                  sim_params,
@@ -133,12 +169,9 @@ class Env(gym.Env, metaclass=ABCMeta):
         # check whether we should be rendering
         self.should_render = self.sim_params.render
         self.sim_params.render = False
-        time_stamp = ''.join(str(time.time()).split('.'))
-        if os.environ.get("TEST_FLAG", 0):
-            # 1.0 works with stress_test_start 10k times
-            time.sleep(1.0 * int(time_stamp[-6:]) / 1e6)
         # FIXME: this is sumo-specific
-        self.sim_params.port = sumolib.miscutils.getFreeSocketPort()
+        if getattr(self.sim_params, "backend", "traci") == "traci":
+            self.sim_params.port = sumolib.miscutils.getFreeSocketPort()
         # time_counter: number of steps taken since the start of a rollout
         self.time_counter = 0
         # step_counter: number of total steps taken
@@ -244,10 +277,25 @@ class Env(gym.Env, metaclass=ABCMeta):
         render : bool, optional
             specifies whether to use the gui
         """
+        if getattr(sim_params, "reload_instance", False) and self.simulator == 'traci' \
+                and render in [None, self.sim_params.render] \
+                and self.k.simulation.can_reload(self.sim_params):
+            # keep the sumo process, and load the simulation again in it
+            if sim_params.emission_path is not None:
+                ensure_dir(sim_params.emission_path)
+                self.sim_params.emission_path = sim_params.emission_path
+            self.k.vehicle.initialize(deepcopy(self.network.vehicles))
+            kernel_api = self.k.simulation.reload_simulation(
+                network=self.k.network, sim_params=self.sim_params,
+                random_num=random.randint(1, 3))
+            self.k.pass_api(kernel_api)
+            self.setup_initial_state()
+            return
+
         self.k.close()
 
         # killed the sumo process if using sumo/TraCI
-        if self.simulator == 'traci':
+        if self.simulator == 'traci' and self.k.simulation.sumo_proc is not None:
             self.k.simulation.sumo_proc.kill()
 
         if render is not None:
@@ -455,7 +503,11 @@ class Env(gym.Env, metaclass=ABCMeta):
         if self.sim_params.restart_instance or (self.step_counter > 2e6 and self.simulator != 'aimsun'):
             self.step_counter = 0
             # issue a random seed to induce randomness into the next rollout
-            self.sim_params.seed = random.randint(0, 1e5)
+            if getattr(self.sim_params, "warmup_snapshot", False):
+                self.sim_params.seed = random.choice(
+                    self.sim_params.warmup_seeds)
+            else:
+                self.sim_params.seed = random.randint(0, 1e5)
 
             self.k.vehicle = deepcopy(self.initial_vehicles)
             self.k.vehicle.master_kernel = self.k
@@ -553,14 +605,176 @@ class Env(gym.Env, metaclass=ABCMeta):
         observation = np.copy(states)
 
         # perform (optional) warm-up steps before training
-        for _ in range(self.env_params.warmup_steps):
-            observation, _, _, _ = self.step(rl_actions=None)
+        observation = self.warmup(observation)
 
         # render a frame
         self.render(reset=True)
 
         return observation
 
+    def warmup(self, observation):
+        """Perform the warm-up steps of a rollout.
+
+        If `warmup_snapshot` is set to True in SumoParams, the state of the
+        simulation one step before the end of the warm-up period is stored in
+        `flow.config.CACHE_DIR` the first time a network is simulated with a
+        given seed. Later rollouts load this state, along with the state of the
+        kernel that is not stored by the simulator (see the `get_snapshot`
+        method of the kernel, e.g. the trip metrics and the traffic light
+        controllers) and the attributes listed in `snapshot_attributes`,
+        instead of replaying the warm-up steps. The last warm-up step is
+        always simulated, so that every kernel holds the results of a full
+        simulation step. The warm-up steps are
+        replayed if the cache directory cannot be trusted, see
+        `flow.core.util.ensure_cache_dir`, or if the parameters of the
+        environment cannot identify the snapshot, see
+        `_warmup_snapshot_prefix`.
+
+        Note that restored rollouts are not bitwise identical to replayed ones,
+        as sumo does not store every internal state of the vehicles. Moreover,
+        the output files of sumo do not cover the restored period.
+
+        Parameters
+        ----------
+        observation : array_like
+            the observation at the start of the warm-up period
+
+        Returns
+        -------
+        array_like
+            the observation at the end of the warm-up period
+        """
+        warmup_steps = self.env_params.warmup_steps
+        prefix = None
+        if warmup_steps > 0 and self.simulator == 'traci' and \
+                getattr(self.sim_params, "warmup_snapshot", False) and \
+                ensure_cache_dir() is not None:
+            prefix = self._warmup_snapshot_prefix()
+        if prefix is None:
+            for _ in range(warmup_steps):
+                observation, _, _, _ = self.step(rl_actions=None)
+            return observation
+
+        state_file, snapshot_file = prefix + '.xml.gz', prefix + '.pkl'
+
+        if os.path.isfile(state_file) and os.path.isfile(snapshot_file):
+            with open(snapshot_file, 'rb') as f:
+                snapshot = pickle.load(f)
+
+            # sumo drops all subscriptions when loading a state, so the kernel
+            # api is passed once again to renew them
+            self.k.simulation.load_state(state_file)
+            self.k.pass_api(self.k.kernel_api)
+            self.k.vehicle.synchronize()
+
+            self.k.simulation.time = snapshot['sim_time']
+            self.k.restore_snapshot(snapshot['kernel'])
+            self.time_counter = snapshot['time_counter']
+            self.step_counter += snapshot['time_counter']
+            for key, value in snapshot['attributes'].items():
+                setattr(self, key, value)
+        else:
+            for _ in range(warmup_steps - 1):
+                self.step(rl_actions=None)
+
+            snapshot = {
+                'sim_time': self.k.simulation.time,
+                'time_counter': self.time_counter,
+                'kernel': self.k.get_snapshot(),
+                'attributes': {key: deepcopy(getattr(self, key))
+                               for key in self.snapshot_attributes},
+            }
+
+            # write to temporary files first, so that concurrent environments
+            # never read partially written snapshots
+            tmp_prefix = '{}.{}.tmp'.format(prefix, os.getpid())
+            with open(tmp_prefix + '.pkl', 'wb') as f:
+                pickle.dump(snapshot, f)
+            os.replace(tmp_prefix + '.pkl', snapshot_file)
+            self.k.simulation.save_state(tmp_prefix + '.xml.gz')
+            os.replace(tmp_prefix + '.xml.gz', state_file)
+
+        observation, _, _, _ = self.step(rl_actions=None)
+        return observation
+
+    def _warmup_snapshot_prefix(self):
+        """Return the path prefix of the warm-up snapshot of this rollout.
+
+        The name of the snapshot is a digest of the files used to start sumo,
+        and of the parameters that affect the outcome of the warm-up steps.
+        The generated files are named after the network and the time it was
+        created, so this name is replaced by the original name of the network
+        in their content, and their comments, which hold the time they were
+        generated at, are ignored. The same network therefore gets the same
+        snapshots in every process.
+
+        The parameters are serialized to json, so that they are represented in
+        the same way in every process. If one of them cannot be serialized,
+        e.g. an object of the additional parameters of the environment, no
+        snapshot is used.
+
+        Returns
+        -------
+        str or None
+            path to the snapshot files, without extension, or None if the
+            parameters cannot be serialized
+
+        Raises
+        ------
+        FileNotFoundError
+            if one of the files used to start sumo does not exist
+        """
+        net_kernel = self.k.network
+        template = self.net_params.template
+        # generated networks are written along with the configuration files
+        net_file = os.path.join(net_kernel.cfg_path, net_kernel.netfn) \
+            if template is None else net_kernel.netfn
+        file_names = [net_file]
+        file_names += [os.path.join(net_kernel.cfg_path, fn) for fn in
+                       [net_kernel.addfn, net_kernel.roufn, net_kernel.sumfn]]
+        if isinstance(template, dict):
+            add = template.get('add', [])
+            file_names += [add] if isinstance(add, str) else list(add)
+
+        name = self.network.name.encode('utf-8')
+        orig_name = self.network.orig_name.encode('utf-8')
+        digests = []
+        for file_name in file_names:
+            if not os.path.isfile(file_name):
+                raise FileNotFoundError(
+                    'File {} of the network is missing, the warm-up snapshot '
+                    'cannot be identified.'.format(file_name))
+            with open(file_name, 'rb') as f:
+                content = XML_COMMENT.sub(b'', f.read()).replace(name, orig_name)
+            digests.append(hashlib.sha1(content).hexdigest())
+
+        params = [
+            self.__class__.__name__,
+            self.sim_params.sim_step,
+            self.sim_params.seed,
+            self.sim_params.lateral_resolution,
+            self.sim_params.overtake_right,
+            self.sim_params.teleport_time,
+            self.sim_params.use_ballistic,
+            getattr(self.sim_params, "trip_metrics", False),
+            getattr(self.sim_params, "timeseries_path", None) is not None,
+            self.env_params.warmup_steps,
+            self.env_params.sims_per_step,
+            self.env_params.additional_params,
+            # the states of the controllers are part of the snapshot
+            [[controller.__class__.__name__] + list(controller.tl_ids)
+             for controller in self.k.traffic_light.get_controllers()],
+        ]
+        try:
+            params = json.dumps(params, sort_keys=True, default=_snapshot_key_value)
+        except (TypeError, ValueError) as e:
+            warnings.warn('The warm-up snapshots are not used, as the parameters of the environment cannot be '
+                          'serialized: {}'.format(e))
+            return None
+
+        key = hashlib.sha1(json.dumps([digests, params]).encode('utf-8')).hexdigest()
+        return os.path.join(config.CACHE_DIR, 'warmup-{}'.format(key))
+
     def additional_command(self):
         """Additional commands that may be performed by the step method."""
         pass
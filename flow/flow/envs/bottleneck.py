@@ -673,8 +673,9 @@ class BottleneckAccelEnv(BottleneckEnv):
         direction = np.round(actions[1::2])[:num_rl]
 
         # re-arrange actions according to mapping in observation space
-        sorted_rl_ids = sorted(self.k.vehicle.get_rl_ids(),
-                               key=self.k.vehicle.get_x_by_id)
+        rl_ids = self.k.vehicle.get_rl_ids()
+        rl_pos = dict(zip(rl_ids, self.k.vehicle.get_x_by_id(rl_ids)))
+        sorted_rl_ids = sorted(rl_ids, key=rl_pos.get)
 
         # represents vehicles that are allowed to change lanes
         non_lane_changing_veh = [
@@ -175,7 +175,11 @@ class MultiEnv(MultiAgentEnv, Env):
         if self.sim_params.restart_instance or (self.step_counter > 2e6 and self.simulator != 'aimsun'):
             self.step_counter = 0
             # issue a random seed to induce randomness into the next rollout
-            self.sim_params.seed = random.randint(0, 1e5)
+            if getattr(self.sim_params, "warmup_snapshot", False):
+                self.sim_params.seed = random.choice(
+                    self.sim_params.warmup_seeds)
+            else:
+                self.sim_params.seed = random.randint(0, 1e5)
 
             self.k.vehicle = deepcopy(self.initial_vehicles)
             self.k.vehicle.master_kernel = self.k
@@ -258,8 +262,7 @@ class MultiEnv(MultiAgentEnv, Env):
             raise FatalFlowError(msg=msg)
 
         # perform (optional) warm-up steps before training
-        for _ in range(self.env_params.warmup_steps):
-            observation, _, _, _ = self.step(rl_actions=None)
+        self.warmup(observation=None)
 
         # render a frame
         self.render(reset=True)
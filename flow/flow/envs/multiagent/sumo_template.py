@@ -4,15 +4,166 @@ import numpy as np
 from gym.spaces import Box
 from gym.spaces.discrete import Discrete
 from flow.envs.multiagent.base import MultiEnv
+from flow.core.kernel.traffic_light import SCATSController
 
 import math
+from bisect import bisect_right
 
 ADDITIONAL_ENV_PARAMS_UAV = {
     "controlled_intersections": [],
 }
+# optional: "lane_subscriptions" (default True) collects the state of the lanes around the controlled intersections
+# with sumo lane subscriptions, instead of reading the edge and lane of every vehicle in the network
+# optional: "scats_intersections" (default []) are controlled by SCATS in the same simulation, starting from program
+# "0", and "scats_plans" (default []) are sumo files with additional signal plans of these intersections. SCATS
+# reads the occupancy of the incoming lanes from E1 detectors, e.g. "{}/scenarios/UAV/SCATS/e1.add.xml" in the "add"
+# files of the network template; "scats_lane_occupancy" (default False) reads that of the lanes without a detector
+# from the lanes themselves instead
+
+
+def add_scats_controller(env, additional_params):
+    """Let SCATS control the intersections of "scats_intersections", if any.
+
+    Parameters
+    ----------
+    env : flow.envs.Env
+        environment, whose agents control the intersections of
+        "controlled_intersections"
+    additional_params : dict
+        additional parameters of the environment
+
+    Returns
+    -------
+    list of str
+        intersections controlled by SCATS
+    """
+    scats_tl = list(additional_params.get("scats_intersections", []))
+    overlap = set(scats_tl) & set(additional_params["controlled_intersections"])
+    if overlap:
+        raise ValueError('Intersections {} cannot be controlled by both the agents and SCATS.'.format(sorted(overlap)))
+    if scats_tl:
+        env.k.traffic_light.add_controller(SCATSController(
+            scats_tl, initial_program="0", plan_files=additional_params.get("scats_plans", []),
+            lane_occupancy=additional_params.get("scats_lane_occupancy", False)))
+    return scats_tl
+
+
+class LaneIndex(object):
+    """Index arrays of the lanes around a set of controlled intersections.
+
+    The watched lanes are numbered in a fixed order, with one additional
+    padding slot that always holds zero. Per-lane quantities are aggregated
+    from per-vehicle arrays with `np.bincount`, and gathered into one row per
+    intersection (incoming lanes first, then outgoing lanes, padded to the
+    maximum number of lanes) with a single fancy-indexing operation.
+
+    Attributes
+    ----------
+    lanes : list of str
+        names of the watched lanes, in the order of their slots
+    pad : int
+        index of the padding slot, equal to the number of watched lanes
+    in_index : np.ndarray of int
+        (n_tl, num_in_max) slots of the incoming lanes of each intersection
+    out_index : np.ndarray of int
+        (n_tl, num_out_max) slots of the outgoing lanes of each intersection
+    """
+
+    def __init__(self, tl_ids, mapping_inc, num_in_max, mapping_out, num_out_max):
+        """Instantiate the index.
+
+        Parameters
+        ----------
+        tl_ids : list of str
+            names of the controlled intersections, in the order of the rows
+        mapping_inc : dict of list of str
+            incoming lanes of every intersection
+        num_in_max : int
+            maximum number of incoming lanes of an intersection
+        mapping_out : dict of list of str
+            outgoing lanes of every intersection
+        num_out_max : int
+            maximum number of outgoing lanes of an intersection
+        """
+        self.lanes = []
+        for tl_id in tl_ids:
+            for lane in mapping_inc[tl_id] + mapping_out[tl_id]:
+                if lane not in self.lanes:
+                    self.lanes.append(lane)
+        self.pad = len(self.lanes)
+
+        slot_of = {lane: i for i, lane in enumerate(self.lanes)}
+
+        # vehicles are looked up by (edge, lane index) to avoid building names
+        self._slots = {}
+        for lane, i in slot_of.items():
+            edge, index = lane.rsplit('_', 1)
+            self._slots[(edge, int(index))] = i
+
+        self.in_index = np.full((len(tl_ids), num_in_max), self.pad)
+        self.out_index = np.full((len(tl_ids), num_out_max), self.pad)
+        for row, tl_id in enumerate(tl_ids):
+            self.in_index[row, :len(mapping_inc[tl_id])] = [slot_of[lane] for lane in mapping_inc[tl_id]]
+            self.out_index[row, :len(mapping_out[tl_id])] = [slot_of[lane] for lane in mapping_out[tl_id]]
+
+    def edges(self):
+        """Return the edge of every watched lane."""
+        return [lane.rsplit('_', 1)[0] for lane in self.lanes]
+
+    def lookup(self, edges, lanes):
+        """Return the slots of vehicles given their edges and lane indices.
+
+        Vehicles that are not on a watched lane are assigned the padding slot.
+        """
+        slots = self._slots
+        pad = self.pad
+        return np.fromiter((slots.get(key, pad) for key in zip(edges, lanes)),
+                           dtype=int, count=len(edges))
+
+    def aggregate(self, slots, weights=None):
+        """Sum per-vehicle values (or count vehicles) for every slot.
+
+        Parameters
+        ----------
+        slots : np.ndarray of int
+            slot of every vehicle, see `lookup`
+        weights : array_like, optional
+            value of every vehicle; vehicles are counted if not specified
+
+        Returns
+        -------
+        np.ndarray of float
+            the sum of every watched lane, followed by a zero padding slot
+        """
+        total = np.bincount(slots, weights=weights, minlength=self.pad + 1)
+        total = total.astype(float)
+        total[self.pad] = 0
+        return total
+
+    def collect(self, values):
+        """Return per-lane values, ordered as `lanes`, with the padding slot appended."""
+        return np.append(np.asarray(values, dtype=float), 0.)
+
+    def gather(self, values):
+        """Gather per-lane values into one row per intersection.
+
+        Parameters
+        ----------
+        values : np.ndarray
+            values of every slot, including the padding slot
+
+        Returns
+        -------
+        np.ndarray
+            (n_tl, num_in_max + num_out_max) values of the incoming lanes,
+            followed by those of the outgoing lanes
+        """
+        return np.concatenate([values[self.in_index], values[self.out_index]], axis=1)
 
 
 class UAVEnvAVARS(MultiEnv):
+    snapshot_attributes = ['observation_info']
+
     def __init__(self, env_params, sim_params, network, simulator='traci'):
         super().__init__(env_params, sim_params, network, simulator)
 
@@ -31,6 +182,16 @@ class UAVEnvAVARS(MultiEnv):
         for each in self.mapping_out.values():
             self.lanes_related.extend(each)
         self.lanes_related = list(set(self.lanes_related))
+        self.lane_index = LaneIndex(self.controlled_tl, self.mapping_inc, self.num_in_edges_max,
+                                    self.mapping_out, self.num_out_edges_max)
+        # normalization term of the number of vehicles per lane, 1 for the padding slot
+        self.lane_capacity = np.ones(self.lane_index.pad + 1)
+        self.lane_capacity[:-1] = [math.ceil(self.k.network.edge_length(edge) / 7.5)
+                                   for edge in self.lane_index.edges()]
+        self.lane_subscriptions = env_params.additional_params.get("lane_subscriptions", True)
+        if self.lane_subscriptions:
+            self.k.network.subscribe_lanes(self.lane_index.lanes)
+        self.scats_tl = add_scats_controller(self, env_params.additional_params)
         # vehicle
         self.num_traffic_lights = len(self.mapping_inc.keys())
         self.state_tl = network.get_states_choose(self.controlled_tl)
@@ -58,54 +219,32 @@ class UAVEnvAVARS(MultiEnv):
         max_speed = self.k.network.max_speed()
 
         if self.time_counter < 2700:
-            veh_lane_pair = {each: [] for each in self.lanes_related}
-            for each_veh in self.k.vehicle.get_ids():
-                if self.full_name_edge_lane(each_veh) in self.lanes_related:
-                    veh_lane_pair[self.full_name_edge_lane(each_veh)].append(each_veh)
-            veh_num_per_edge = {}  # key: name of each edge in the road network
-            avg_speed_per_edge = {}
-            for lane, veh_list in veh_lane_pair.items():
-                w_nor = math.ceil(self.k.network.edge_length(lane.split('_')[0]) / 7.5)
-                veh_num_per_edge.update({lane: len(veh_list) / w_nor})
-
-                speed_list = []
-                for each_veh in veh_list:
-                    speed_this_veh = self.k.vehicle.get_speed(each_veh)
-                    speed_list.append(speed_this_veh)
-                if len(veh_list) != 0:
-                    avg_speed_per_edge.update({lane: np.mean(speed_list) / max_speed})
-                else:
-                    avg_speed_per_edge.update({lane: 0})
+            if self.lane_subscriptions:
+                lanes = self.lane_index.lanes
+                veh_num = self.lane_index.collect(self.k.network.get_lane_num_vehicles(lanes))
+                # sumo reports the speed limit as the mean speed of empty lanes
+                mean_speed = self.lane_index.collect(self.k.network.get_lane_mean_speed(lanes))
+                avg_speed_per_lane = np.where(veh_num > 0, mean_speed, 0) / max_speed
+            else:
+                veh_ids = self.k.vehicle.get_ids()
+                slots = self.lane_index.lookup(self.k.vehicle.get_edge(veh_ids), self.k.vehicle.get_lane(veh_ids))
+                veh_num = self.lane_index.aggregate(slots)
+                speed_sum = self.lane_index.aggregate(slots, weights=self.k.vehicle.get_speed(veh_ids))
+                avg_speed_per_lane = np.divide(speed_sum, veh_num, out=np.zeros_like(speed_sum),
+                                               where=veh_num > 0) / max_speed
+            veh_num_per_lane = veh_num / self.lane_capacity
 
             # Traffic light information
+            phase = []
             for tl_id in self.controlled_tl:
-                local_edges = self.mapping_inc[tl_id]
-                local_edges_out = self.mapping_out[tl_id]
-
-                veh_num_per_in = [veh_num_per_edge[each] for each in local_edges]
-                veh_num_per_out = [veh_num_per_edge[each] for each in local_edges_out]
-                avg_speed_per_in = [avg_speed_per_edge[each] for each in local_edges]
-                avg_speed_per_out = [avg_speed_per_edge[each] for each in local_edges_out]
-
-                # not 4-leg intersection
-                if len(local_edges) < self.num_in_edges_max:
-                    diff = self.num_in_edges_max - len(local_edges)
-                    veh_num_per_in.extend([0] * diff)
-                    avg_speed_per_in.extend([0] * diff)
-                if len(local_edges_out) < self.num_out_edges_max:
-                    diff = self.num_out_edges_max - len(local_edges_out)
-                    veh_num_per_out.extend([0] * diff)
-                    avg_speed_per_out.extend([0] * diff)
-
                 states = self.state_tl[tl_id]
                 now_state = self.k.traffic_light.get_state(tl_id)
-                state_index = states.index(now_state)
-
-                con = [round(i, 8) for i in np.concatenate(
-                    [veh_num_per_in, veh_num_per_out, avg_speed_per_in, avg_speed_per_out, [state_index / len(states)]])]
+                phase.append(states.index(now_state) / len(states))
 
-                observation = np.array(con)
-                obs.update({tl_id: observation})
+            observations = np.round(np.concatenate(
+                [self.lane_index.gather(veh_num_per_lane), self.lane_index.gather(avg_speed_per_lane),
+                 np.array(phase)[:, None]], axis=1), 8)
+            obs = dict(zip(self.controlled_tl, observations))
 
         self.observation_info = obs
         return obs
@@ -138,7 +277,126 @@ class UAVEnvAVARS(MultiEnv):
                 self.k.traffic_light.set_state_specific(node_id=rl_id, index=state_index + 1)
 
 
+class LaneVehicleTracker(object):
+    """Incremental record of the vehicles on the lanes around intersections.
+
+    The vehicles of every lane are kept in the order in which they entered the
+    network, i.e. the order of the vehicle kernel, and are updated at every
+    step from the vehicles that entered and left the lane. Vehicles that left
+    an incoming lane since the previous step are reported as passing, and the
+    number of steps that every vehicle spent on incoming lanes is accumulated
+    until the vehicle leaves the network, so that a vehicle coming back to the
+    tracked lanes keeps its order and its travel time.
+
+    Attributes
+    ----------
+    lanes : list of str
+        names of the tracked lanes
+    incoming_lanes : list of str
+        names of the tracked lanes that lead to an intersection
+    vehicles : dict of list of str
+        vehicles on every lane
+    passing : dict of list of str
+        vehicles that left every incoming lane during the last step
+    travel_time : dict of int
+        number of steps that every vehicle spent on incoming lanes. This is
+        reset by the environment once the vehicle passes an intersection
+    """
+
+    def __init__(self, lanes, incoming_lanes):
+        """Instantiate the tracker.
+
+        Parameters
+        ----------
+        lanes : list of str
+            names of the lanes to track
+        incoming_lanes : list of str
+            names of the tracked lanes that lead to an intersection
+        """
+        self.lanes = list(lanes)
+        self.incoming_lanes = list(dict.fromkeys(incoming_lanes))
+        self._incoming = set(self.incoming_lanes)
+        self.reset()
+
+    def reset(self):
+        """Forget all vehicles."""
+        self.vehicles = {lane: [] for lane in self.lanes}
+        self.passing = {lane: [] for lane in self.lanes}
+        self.travel_time = {}
+        # order of the vehicles of every lane, sorted, as in self.vehicles
+        self._keys = {lane: [] for lane in self.lanes}
+        self._order = None
+        self._next_order = 0
+        self._arrived = []
+
+    def update(self, lane_vehicles, vehicle_kernel):
+        """Update the record with the vehicles currently on every lane.
+
+        Parameters
+        ----------
+        lane_vehicles : dict of iterable of str
+            vehicles currently on every tracked lane, in any order
+        vehicle_kernel : flow.core.kernel.vehicle.KernelVehicle
+            vehicle kernel, used to collect departed and arrived vehicles
+        """
+        if self._order is None:
+            # vehicles that were added during a reset are ordered by the kernel
+            self._order = {}
+            self._add_order(vehicle_kernel.get_ids())
+        self._add_order(vehicle_kernel.get_departed_ids() or [])
+
+        # vehicles that arrived during the previous step have been rewarded
+        # by now and cannot appear on any lane again
+        for veh_id in self._arrived:
+            self._order.pop(veh_id, None)
+            self.travel_time.pop(veh_id, None)
+        self._arrived = list(vehicle_kernel.get_arrived_ids() or [])
+
+        self.passing = {lane: [] for lane in self.lanes}
+        for lane in self.lanes:
+            veh_ids = lane_vehicles[lane]
+            previous = self.vehicles[lane]
+            current = set(veh_ids)
+            left = [veh_id for veh_id in previous if veh_id not in current]
+            if left:
+                keys = self._keys[lane]
+                kept = [i for i, veh_id in enumerate(previous) if veh_id in current]
+                self.vehicles[lane] = previous = [previous[i] for i in kept]
+                self._keys[lane] = [keys[i] for i in kept]
+                if lane in self._incoming:
+                    self.passing[lane] = left
+
+            if len(previous) != len(current):
+                known = set(previous)
+                entered = [veh_id for veh_id in veh_ids if veh_id not in known]
+                # vehicles that were not seen departing, e.g. loaded with a state
+                self._add_order(entered)
+                keys = self._keys[lane]
+                for veh_id in entered:
+                    key = self._order[veh_id]
+                    index = bisect_right(keys, key)
+                    keys.insert(index, key)
+                    previous.insert(index, veh_id)
+
+        travel_time = self.travel_time
+        for lane in self.incoming_lanes:
+            for veh_id in self.vehicles[lane]:
+                if veh_id in travel_time:
+                    travel_time[veh_id] += 1
+                else:
+                    travel_time[veh_id] = 0
+
+    def _add_order(self, veh_ids):
+        """Order the given vehicles after all vehicles already known."""
+        for veh_id in veh_ids:
+            if veh_id not in self._order:
+                self._order[veh_id] = self._next_order
+                self._next_order += 1
+
+
 class UAVEnvIntelliLight(MultiEnv):
+    snapshot_attributes = ['custom_timestep', 'waiting_veh_lane', 'delay_lane', 'tracker', 'sum_waiting_time']
+
     def __init__(self, env_params, sim_params, network, simulator='traci'):
         super().__init__(env_params, sim_params, network, simulator)
 
@@ -165,6 +423,10 @@ class UAVEnvIntelliLight(MultiEnv):
         edge_length = []
         edge_length.extend([self.k.network.edge_length(edge) for edge in self.k.network.get_edge_list()])
         self.max_length = max(edge_length)
+        # length and speed limit of the edge of every lane
+        self.lane_length = {each: self.k.network.edge_length(each.split('_')[0]) for each in self.lanes_related}
+        self.lane_speed_limit = {each: self.k.network.speed_limit(each.split('_')[0])
+                                 for each in self.lanes_related}
 
         self.max_number_vehicles_lane = int(np.ceil(230 / 7.5))  # max road length / (veh length + min gap)
         # updated value per timestep
@@ -173,14 +435,17 @@ class UAVEnvIntelliLight(MultiEnv):
         # related to vehicle speed
         self.waiting_veh_lane = {each: 0 for each in self.incoming_lanes}
         self.delay_lane = {each: 0 for each in self.incoming_lanes}
-        # vehs list for the lanes around the selected intersections in the network
-        self.veh_lane_pair = {each: [] for each in self.lanes_related}
-        self.veh_passing_lane = {each: [] for each in self.incoming_lanes}
+        # vehs on the lanes around the selected intersections in the network, vehs passing the intersections, and
         # travel time that vehicles spent on approaching lanes, 0 if passing the intersection
-        self.travel_time_veh = {}
+        self.tracker = LaneVehicleTracker(self.lanes_related, self.incoming_lanes)
 
         self.sum_waiting_time = {each: 0 for each in self.controlled_tl}
 
+        self.lane_subscriptions = env_params.additional_params.get("lane_subscriptions", True)
+        if self.lane_subscriptions:
+            self.k.network.subscribe_lanes(self.lanes_related)
+        self.scats_tl = add_scats_controller(self, env_params.additional_params)
+
     @property
     def action_space(self):
         return Discrete(2)
@@ -195,6 +460,18 @@ class UAVEnvIntelliLight(MultiEnv):
         lane_id = self.k.vehicle.get_lane(veh_id)
         return edge_id + '_' + str(lane_id)
 
+    def lane_vehicles(self):
+        """Return the vehicles currently on the lanes around the controlled intersections."""
+        if self.lane_subscriptions:
+            return {each: self.k.network.get_lane_vehicle_ids(each) for each in self.lanes_related}
+
+        lane_vehicles = {each: [] for each in self.lanes_related}
+        for each_veh in self.k.vehicle.get_ids():
+            lane = self.full_name_edge_lane(each_veh)
+            if lane in lane_vehicles:
+                lane_vehicles[lane].append(each_veh)
+        return lane_vehicles
+
     def get_state(self, **kwargs):
         """
         For each lane at this intersection
@@ -208,57 +485,27 @@ class UAVEnvIntelliLight(MultiEnv):
         self.waiting_veh_lane = {each: 0 for each in self.incoming_lanes}
         self.delay_lane = {each: 0 for each in self.incoming_lanes}
         self.sum_waiting_time = {each: 0 for each in self.controlled_tl}
-        self.veh_passing_lane = {each: [] for each in self.lanes_related}
-
-        waiting_time_veh = {}
 
         obs = {}
         if self.time_counter <= 2700:
-            pre_veh_lane_pair = self.veh_lane_pair
-            self.veh_lane_pair = {each: [] for each in self.lanes_related}
-            for each_veh in self.k.vehicle.get_ids():
-                if self.full_name_edge_lane(each_veh) in self.lanes_related:
-                    self.veh_lane_pair[self.full_name_edge_lane(each_veh)].append(each_veh)
-
-            for each_lane in self.incoming_lanes:
-                for veh in pre_veh_lane_pair[each_lane]:
-                    if veh not in self.veh_lane_pair[each_lane]:
-                        self.veh_passing_lane[each_lane].append(veh)
+            self.tracker.update(self.lane_vehicles(), self.k.vehicle)
 
             veh_num_per_edge = {}  # key: name of each edge in the road network
             queue_per_lane = {}
             position_per_lane = {}
-            for lane, veh_list in self.veh_lane_pair.items():
-                speed_list = []
-                position_list = []
-                for each_veh in veh_list:
-                    if lane in self.incoming_lanes:
-                        if each_veh not in self.travel_time_veh.keys():
-                            self.travel_time_veh.update({each_veh: 0})
-                        else:
-                            if each_veh not in self.veh_passing_lane[lane]:
-                                self.travel_time_veh[each_veh] += 1
-                    speed_this_veh = self.k.vehicle.get_speed(each_veh)
-                    speed_list.append(speed_this_veh)
-                    position_list.append(self.k.vehicle.get_position(each_veh))
-                    if speed_this_veh < 0.1:
-                        if lane in self.incoming_lanes:
-                            self.waiting_veh_lane[lane] += 1
-                        if each_veh in waiting_time_veh.keys():
-                            waiting_time_veh[each_veh] += 1
-                        else:
-                            waiting_time_veh.update({each_veh: 1})
-                    else:
-                        waiting_time_veh[each_veh] = 0
-                if lane in self.incoming_lanes:
-                    self.delay_lane[lane] = np.mean(speed_list) / self.k.network.speed_limit(lane.split('_')[0]) \
-                        if speed_list else 0
-                if not position_list:
-                    queue_per_lane.update({lane: 0})
-                else:
-                    queue_per_lane.update({lane: self.k.network.edge_length(lane.split('_')[0]) - np.min(position_list)})
-                position_per_lane.update({lane: position_list})
-                veh_num_per_edge.update({lane: len(veh_list)})
+            waiting_per_lane = {}
+            for lane, veh_list in self.tracker.vehicles.items():
+                speed_list = self.k.vehicle.get_speed(veh_list)
+                position_list = self.k.vehicle.get_position(veh_list)
+                # a vehicle is waiting if its speed is below 0.1 m/s
+                waiting_per_lane[lane] = sum(speed < 0.1 for speed in speed_list)
+                if lane in self.waiting_veh_lane:
+                    self.waiting_veh_lane[lane] = waiting_per_lane[lane]
+                    self.delay_lane[lane] = np.mean(speed_list) / self.lane_speed_limit[lane] if speed_list else 0
+                queue_per_lane[lane] = self.lane_length[lane] - np.min(position_list) if position_list else 0
+                # keep the observation size fixed on crowded lanes
+                position_per_lane[lane] = position_list[:self.max_number_vehicles_lane]
+                veh_num_per_edge[lane] = len(veh_list)
 
             # Traffic light information
             for tl_id in self.controlled_tl:
@@ -269,18 +516,14 @@ class UAVEnvIntelliLight(MultiEnv):
                 queue_per_lane_out = [queue_per_lane[each] for each in local_edges_out]
                 veh_num_per_in = [veh_num_per_edge[each] for each in local_edges]
                 veh_num_per_out = [veh_num_per_edge[each] for each in local_edges_out]
+                waiting_time_lane_in = [waiting_per_lane[each] for each in local_edges]
+                waiting_time_lane_out = [waiting_per_lane[each] for each in local_edges_out]
+                self.sum_waiting_time[tl_id] = np.sum(waiting_time_lane_in)
 
                 position_inter = []
-
-                waiting_time_lane_in = []
                 for each_lane in local_edges:
-                    sum_waiting = 0
-                    for each_veh in self.veh_lane_pair[each_lane]:
-                        sum_waiting += waiting_time_veh[each_veh]
                     position_inter.extend(position_per_lane[each_lane])
                     position_inter.extend([0] * (self.max_number_vehicles_lane - len(position_per_lane[each_lane])))
-                    waiting_time_lane_in.append(sum_waiting)
-                self.sum_waiting_time[tl_id] = np.sum(waiting_time_lane_in)
 
                 # not 4-leg intersection
                 if len(local_edges) < self.num_in_edges_max:
@@ -290,15 +533,10 @@ class UAVEnvIntelliLight(MultiEnv):
                     waiting_time_lane_in.extend([0] * diff)
                     position_inter.extend([0] * diff * self.max_number_vehicles_lane)
 
-                waiting_time_lane_out = []
                 for each_lane in local_edges_out:
-                    sum_waiting = 0
-                    for each_veh in self.veh_lane_pair[each_lane]:
-                        sum_waiting += waiting_time_veh[each_veh]
                     position_inter.extend(position_per_lane[each_lane])
                     position_inter.extend(
                             [0] * (self.max_number_vehicles_lane - len(position_per_lane[each_lane])))
-                    waiting_time_lane_out.append(sum_waiting)
 
                 if len(local_edges_out) < self.num_out_edges_max:
                     diff = self.num_out_edges_max - len(local_edges_out)
@@ -338,11 +576,10 @@ class UAVEnvIntelliLight(MultiEnv):
                 for each_lane in local_edges:
                     sum_waiting_vehs += self.waiting_veh_lane[each_lane]
                     sum_delay += (1 - self.delay_lane[each_lane])
-                    sum_passing_vehs += len(self.veh_passing_lane[each_lane])
-                    for veh in self.veh_passing_lane[each_lane]:
-                        sum_travel_time += self.travel_time_veh[veh]
-                        # del self.travel_time_veh[veh]
-                        self.travel_time_veh[veh] = 0
+                    sum_passing_vehs += len(self.tracker.passing[each_lane])
+                    for veh in self.tracker.passing[each_lane]:
+                        sum_travel_time += self.tracker.travel_time.get(veh, 0)
+                        self.tracker.travel_time[veh] = 0
 
                 reward[rl_id] = -0.25 * sum_waiting_vehs - 0.25 * sum_delay - 0.25 * self.sum_waiting_time[rl_id] \
                                 - 5 * rl_actions[rl_id] + sum_passing_vehs + sum_travel_time / 60
@@ -353,9 +590,7 @@ class UAVEnvIntelliLight(MultiEnv):
         self.custom_timestep = 0
         self.waiting_veh_lane = {each: 0 for each in self.incoming_lanes}
         self.delay_lane = {each: 0 for each in self.incoming_lanes}
-        self.veh_lane_pair = {each: [] for each in self.lanes_related}
-        self.veh_passing_lane = {each: [] for each in self.incoming_lanes}
-        self.travel_time_veh = {}
+        self.tracker.reset()
         self.sum_waiting_time = {each: 0 for each in self.controlled_tl}
         return super().reset()
 
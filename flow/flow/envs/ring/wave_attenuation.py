@@ -142,8 +142,8 @@ class WaveAttenuationEnv(Env):
         """See class definition."""
         speed = [self.k.vehicle.get_speed(veh_id) / self.k.network.max_speed()
                  for veh_id in self.k.vehicle.get_ids()]
-        pos = [self.k.vehicle.get_x_by_id(veh_id) / self.k.network.length()
-               for veh_id in self.k.vehicle.get_ids()]
+        pos = [x / self.k.network.length()
+               for x in self.k.vehicle.get_x_by_id(self.k.vehicle.get_ids())]
 
         return np.array(speed + pos)
 
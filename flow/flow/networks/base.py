@@ -4,10 +4,9 @@ from flow.core.params import InitialConfig
 from flow.core.params import TrafficLightParams
 from flow.core.params import SumoCarFollowingParams
 from flow.core.params import SumoLaneChangeParams
+from flow.core.util import read_cached
 import time
-import xml.etree.ElementTree as ElementTree
 from lxml import etree
-from collections import defaultdict
 
 # default sumo probability value  TODO (ak): remove
 DEFAULT_PROBABILITY = 0
@@ -668,7 +667,9 @@ class Network(object):
 
         This is a utility function for computing vehicle information. It
         imports a network configuration file, and returns the information on
-        the vehicle and add it into the Vehicle object.
+        the vehicle and add it into the Vehicle object. The result is read
+        from a cached copy in `flow.config.CACHE_DIR`, keyed by the content of
+        the files, and is extracted by `read_vehicle_infos` on a cache miss.
 
         Parameters
         ----------
@@ -686,54 +687,14 @@ class Network(object):
         # this is meant to deal with the case that there is only one rou file
         if isinstance(file_names, str):
             file_names = [file_names]
-
-        vehicle_data = dict()
-        routes_data = dict()
-        type_data = defaultdict(int)
-
-        for filename in file_names:
-            # import the .net.xml file containing all edge/type data
-            parser = etree.XMLParser(recover=True)
-            tree = ElementTree.parse(filename, parser=parser)
-            root = tree.getroot()
-
-            # collect the departure properties and routes and vehicles whose
-            # properties are instantiated within the .rou.xml file. This will
-            # only apply if such data is within the file (it is not implemented
-            # by networks in Flow).
-            for vehicle in root.findall('vehicle'):
-                # collect the edges the vehicle is meant to traverse
-                route = vehicle.find('route')
-                if route:
-                    route_edges = route.attrib["edges"].split(' ')
-                    routes_data[vehicle.attrib['id']] = route_edges
-
-                # collect the names of each vehicle type and number of vehicles
-                # of each type
-                type_vehicle = vehicle.attrib['type']
-                type_data[type_vehicle] += 1
-
-                vehicle_data[vehicle.attrib['id']] = {
-                    'departSpeed': vehicle.attrib['departSpeed'],
-                    'depart': vehicle.attrib['depart'],
-                    'typeID': type_vehicle,
-                    'departPos': vehicle.attrib['departPos'],
-                    'routeID': vehicle.attrib['route']  # added for dublin route
-                }
-
-            # collect the edges the vehicle is meant to traverse for the given
-            # sets of routes that are not associated with individual vehicles
-            for route in root.findall('route'):
-                route_edges = route.attrib["edges"].split(' ')
-                routes_data[route.attrib['id']] = route_edges
-
-        return vehicle_data, routes_data
+        return read_cached('routes', file_names, read_vehicle_infos)
 
     @staticmethod
     def _vehicle_type(filename):
         """Import vehicle type data from a *.add.xml file.
 
         This is a utility function for outputting all the type of vehicle.
+        The result is cached as in `_vehicle_infos`, see `read_vehicle_types`.
 
         Parameters
         ----------
@@ -749,31 +710,7 @@ class Network(object):
         """
         if filename is None:
             return None
-        parser = etree.XMLParser(recover=True)
-        tree = ElementTree.parse(filename, parser=parser)
-
-        root = tree.getroot()
-        veh_type = {}
-        # this hack is meant to support the LuST network and Flow networks
-        root = [root] if len(root.findall('vTypeDistribution')) == 0 \
-            else root.findall('vTypeDistribution')
-        for r in root:
-            for vtype in r.findall('vType'):
-                # TODO: make for everything
-                veh_type[vtype.attrib['id']] = {
-                    'vClass': vtype.attrib.get('vClass', DEFAULT_VCLASS),
-                    'accel': vtype.attrib['accel'],
-                    'decel': vtype.attrib['decel'],
-                    'sigma': vtype.attrib['sigma'],
-                    'length': vtype.attrib.get('length', DEFAULT_LENGTH),
-                    'minGap': vtype.attrib['minGap'],
-                    'maxSpeed': vtype.attrib['maxSpeed'],
-                    'probability': vtype.attrib.get(
-                        'probability', DEFAULT_PROBABILITY),
-                    'speedDev': vtype.attrib['speedDev']
-                }
-
-        return veh_type
+        return read_cached('vtypes', filename, read_vehicle_types)
 
     @staticmethod
     def _get_cf_params(vtypes):
@@ -808,3 +745,129 @@ class Network(object):
         """Return the name of the network and the number of vehicles."""
         return 'Network ' + self.name + ' with ' + \
                str(self.vehicles.num_vehicles) + ' vehicles.'
+
+
+def _iter_top_level(filename, tags):
+    """Stream the elements of a sumo xml file with the given tags.
+
+    The elements are yielded once they are completely parsed, along with
+    their parent, and are cleared afterwards, along with the top level
+    elements that precede them, so that the tree is never held in memory.
+    Malformed files are parsed as far as possible.
+
+    Parameters
+    ----------
+    filename : str
+        path to the xml file
+    tags : list of str
+        tags of the yielded elements
+
+    Yields
+    ------
+    lxml.etree.Element
+        the element
+    lxml.etree.Element
+        its parent
+    """
+    for _, elem in etree.iterparse(filename, events=('end',), tag=tags, recover=True):
+        parent = elem.getparent()
+        if parent is None:
+            continue
+        yield elem, parent
+        if parent.getparent() is None:
+            # the children of a top level element are read with it
+            elem.clear()
+            while elem.getprevious() is not None:
+                del parent[0]
+
+
+def read_vehicle_infos(file_names):
+    """Read the vehicles and routes of sumo route files in a single pass.
+
+    Parameters
+    ----------
+    file_names : list of str
+        paths to the .rou.xml files
+
+    Returns
+    -------
+    dict <dict>
+        departure speed, departure time, type, departure position and route
+        of every vehicle of the files defined at their top level, keyed by the
+        id of the vehicle
+    dict <list of str>
+        edges of every route, keyed by the id of the route, or of the vehicle
+        for routes defined within a vehicle
+    """
+    vehicle_data = dict()
+    routes_data = dict()
+
+    for filename in file_names:
+        for elem, parent in _iter_top_level(filename, ['vehicle', 'route']):
+            # routes are read at the top level, and along with their vehicle
+            if parent.getparent() is not None:
+                continue
+            if elem.tag == 'route':
+                routes_data[elem.attrib['id']] = elem.attrib["edges"].split(' ')
+                continue
+
+            # collect the edges the vehicle is meant to traverse
+            route = elem.find('route')
+            if route is not None:
+                routes_data[elem.attrib['id']] = route.attrib["edges"].split(' ')
+
+            vehicle_data[elem.attrib['id']] = {
+                'departSpeed': elem.attrib['departSpeed'],
+                'depart': elem.attrib['depart'],
+                'typeID': elem.attrib['type'],
+                'departPos': elem.attrib['departPos'],
+                'routeID': elem.attrib['route']  # added for dublin route
+            }
+
+    return vehicle_data, routes_data
+
+
+def read_vehicle_types(filename):
+    """Read the vehicle types of a sumo additional file in a single pass.
+
+    If the file defines vehicle type distributions, only the types of the
+    distributions are read, to support the LuST network and Flow networks.
+
+    Parameters
+    ----------
+    filename : str
+        path to the vtypes.add.xml file
+
+    Returns
+    -------
+    dict <dict>
+        attributes of every vehicle type, keyed by its id
+    """
+    top_level_types = {}
+    distribution_types = {}
+    has_distributions = False
+    for elem, parent in _iter_top_level(filename, ['vType', 'vTypeDistribution']):
+        if elem.tag == 'vTypeDistribution':
+            has_distributions = has_distributions or parent.getparent() is None
+            continue
+        if parent.getparent() is None:
+            veh_type = top_level_types
+        elif parent.tag == 'vTypeDistribution' and parent.getparent().getparent() is None:
+            veh_type = distribution_types
+        else:
+            continue
+        # TODO: make for everything
+        veh_type[elem.attrib['id']] = {
+            'vClass': elem.attrib.get('vClass', DEFAULT_VCLASS),
+            'accel': elem.attrib['accel'],
+            'decel': elem.attrib['decel'],
+            'sigma': elem.attrib['sigma'],
+            'length': elem.attrib.get('length', DEFAULT_LENGTH),
+            'minGap': elem.attrib['minGap'],
+            'maxSpeed': elem.attrib['maxSpeed'],
+            'probability': elem.attrib.get(
+                'probability', DEFAULT_PROBABILITY),
+            'speedDev': elem.attrib['speedDev']
+        }
+
+    return distribution_types if has_distributions else top_level_types
@@ -1,7 +1,9 @@
 from flow.networks import Network
 from flow.core.params import InitialConfig
 from flow.core.params import TrafficLightParams
-import sumolib
+from flow.core.util import read_cached
+import gzip
+from xml.etree import ElementTree
 
 ADDITIONAL_NET_PARAMS = {
     "controlled_intersections": []
@@ -23,9 +25,27 @@ class UAVNetwork(Network):
 
         self.net_file_path = net_params.template["net"]
         self.controlled_tl = net_params.additional_params.get("controlled_intersections")
+        self._topology = None
 
         super().__init__(name, vehicles, net_params, initial_config, traffic_lights)
 
+    @property
+    def topology(self):
+        """Return the traffic light topology of the network.
+
+        The topology is read once per network from a cached copy in
+        `flow.config.CACHE_DIR`, keyed by the content of the net file, and is
+        extracted from the net file by `read_topology` on a cache miss.
+
+        Returns
+        -------
+        dict
+            see `read_topology`
+        """
+        if self._topology is None:
+            self._topology = read_cached('topology', self.net_file_path, read_topology)
+        return self._topology
+
     def node_mapping_choose(self, controlled_tl):
         """
         Map the specific TLs with edges
@@ -37,20 +57,20 @@ class UAVNetwork(Network):
         """
         mapping_inc = {}
         num_local_edges_max = 0
-        for junction in sumolib.output.parse(self.net_file_path, ['junction']):
-            if junction.type == 'traffic_light' and junction.id in controlled_tl:
-                inc_edges = junction.incLanes.split(' ')
-                mapping_inc.update({junction.id: inc_edges})
+        for junction_id, inc_edges in self.topology["incoming_lanes"].items():
+            if junction_id in controlled_tl:
+                inc_edges = list(inc_edges)
+                mapping_inc.update({junction_id: inc_edges})
                 num_local_edges_max = (len(inc_edges), num_local_edges_max)[num_local_edges_max > len(inc_edges)]
 
+        connections = self.topology["connections"]
         mapping_out = {each: [] for each in mapping_inc.keys()}
         num_out_edges_max = 0
         for tl_id, inc_edges in mapping_inc.items():
-            out_edges = []
-            for connection in sumolib.output.parse(self.net_file_path, ['connection']):
-                if connection.attr_from + '_' + connection.fromLane in inc_edges:
-                    out_edges.append(connection.to + '_' + connection.toLane)
-            mapping_out[tl_id] = list(set(out_edges))
+            # outgoing lanes are collected in the order of the connections in
+            # the net file
+            out_edges = sorted(conn for lane in set(inc_edges) for conn in connections.get(lane, []))
+            mapping_out[tl_id] = list(set(to_lane for _, to_lane in out_edges))
             num_out_edges_max = (len(mapping_out[tl_id]), num_out_edges_max)[num_out_edges_max
                                                                              > len(mapping_out[tl_id])]
         # return sorted(mapping.items(), key=lambda x: x[0])
@@ -58,10 +78,49 @@ class UAVNetwork(Network):
 
     def get_states_choose(self, controlled_tl):
         states_tl = {}
-        for tlLogic in sumolib.output.parse(self.net_file_path, ['tlLogic']):
-            if tlLogic.id in controlled_tl:
-                states = []
-                for each in tlLogic['phase']:
-                    states.append(each.state)
-                states_tl.update({tlLogic.id: states})
+        for tl_id, states in self.topology["phases"].items():
+            if tl_id in controlled_tl:
+                states_tl.update({tl_id: list(states)})
         return states_tl
+
+
+def read_topology(net_file):
+    """Extract the traffic light topology of a network in a single pass.
+
+    Parameters
+    ----------
+    net_file : str
+        path to the sumo net file, optionally gzipped
+
+    Returns
+    -------
+    dict
+        * "incoming_lanes": incoming lanes of every traffic light junction
+        * "connections": lanes that every lane is connected to, along with the
+          position of each connection in the net file
+        * "phases": states of the phases of every traffic light logic
+    """
+    incoming_lanes = {}
+    connections = {}
+    phases = {}
+
+    opener = gzip.open if net_file.endswith('.gz') else open
+    with opener(net_file, 'rb') as f:
+        num_connections = 0
+        for _, elem in ElementTree.iterparse(f):
+            if elem.tag == 'junction':
+                if elem.get('type') == 'traffic_light':
+                    incoming_lanes[elem.get('id')] = elem.get('incLanes', '').split(' ')
+            elif elem.tag == 'connection':
+                from_lane = elem.get('from') + '_' + elem.get('fromLane')
+                connections.setdefault(from_lane, []).append(
+                    (num_connections, elem.get('to') + '_' + elem.get('toLane')))
+                num_connections += 1
+            elif elem.tag == 'tlLogic':
+                phases[elem.get('id')] = [phase.get('state') for phase in elem.iter('phase')]
+            elif elem.tag == 'phase':
+                # phases are read along with their traffic light logic
+                continue
+            elem.clear()
+
+    return {"incoming_lanes": incoming_lanes, "connections": connections, "phases": phases}
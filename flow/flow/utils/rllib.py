@@ -8,6 +8,8 @@ from copy import deepcopy
 import os
 import sys
 
+import numpy as np
+
 import flow.envs
 from flow.core.params import SumoLaneChangeParams, SumoCarFollowingParams, \
     SumoParams, InitialConfig, EnvParams, NetParams, InFlows
@@ -192,6 +194,31 @@ def get_flow_params(config):
     return flow_params
 
 
+def on_episode_end(info):
+    """Store the metrics of the trips of an episode in its custom metrics.
+
+    This is meant to be used as the "on_episode_end" callback of RLlib, e.g.
+
+    >>> config["callbacks"] = {"on_episode_end": tune.function(on_episode_end)}
+
+    so that the metrics collected by the simulation kernel, e.g. the average
+    travel time, are reported by RLlib during the training, averaged over the
+    episodes. See flow.core.kernel.simulation.metrics.TripMetrics.
+
+    Parameters
+    ----------
+    info : dict
+        the environment ("env") and the episode ("episode") which ended
+    """
+    episode = info["episode"]
+    # flow runs a single environment per rollout worker
+    env = info["env"].get_unwrapped()[0]
+    trip_metrics = env.k.simulation.get_trip_metrics() or {}
+    for key, value in trip_metrics.items():
+        if np.ndim(value) == 0:
+            episode.custom_metrics[key] = value
+
+
 def get_rllib_config(path):
     """Return the data from the specified rllib configuration file."""
     config_path = os.path.join(path, "params.json")
@@ -0,0 +1,212 @@
+"""Degree of saturation (DS) engine used by SCATS to select signal plans.
+
+SCATS measures the DS of every phase during a cycle of a traffic light, and
+at the end of the cycle switches to the predefined plan that would have had
+the minimum total DS, assuming that the DS of a phase is inversely
+proportional to its green time. The plans of all traffic lights are compiled
+into numpy arrays, so that the plans of any number of traffic lights can be
+selected with a single array operation.
+"""
+
+import gzip
+import numpy as np
+import xml.etree.ElementTree as ElementTree
+
+
+def phase_degree_of_saturation(occupied_time, duration):
+    """Return the degree of saturation of a phase.
+
+    Parameters
+    ----------
+    occupied_time : array_like
+        time during which the detector of every incoming lane was occupied
+        during the phase, in seconds
+    duration : float
+        duration of the phase, in seconds
+
+    Returns
+    -------
+    float
+        degree of saturation of the phase, computed from the most occupied
+        incoming lane
+    """
+    return 1 - np.max(occupied_time) / duration
+
+
+def read_phases(file_names, tl_ids=None):
+    """Read the phases of the signal plans of traffic lights from sumo files.
+
+    Parameters
+    ----------
+    file_names : list of str
+        network or additional files containing tlLogic elements, which may be
+        gzipped. A plan defined in several files is taken from the last one
+    tl_ids : list of str, optional
+        traffic lights whose plans are read, defaults to all of them
+
+    Returns
+    -------
+    dict <str, dict <str, list of dict>>
+        attributes of the phases (duration, state, ...) of every plan of every
+        traffic light, keyed by the id of the traffic light and then by the id
+        of the program
+    """
+    plans = {}
+    for file_name in file_names:
+        opener = gzip.open if file_name.endswith(".gz") else open
+        with opener(file_name, "rb") as f:
+            for _, elem in ElementTree.iterparse(f):
+                if elem.tag != "tlLogic":
+                    continue
+                tl_id = elem.get("id")
+                if tl_ids is None or tl_id in tl_ids:
+                    plans.setdefault(tl_id, {})[elem.get("programID")] = [
+                        dict(phase.attrib) for phase in elem.iter("phase")]
+                elem.clear()
+    return plans
+
+
+def read_plans(file_names, tl_ids=None):
+    """Read the phase durations of the signal plans of traffic lights.
+
+    See read_phases for a description of the parameters.
+
+    Returns
+    -------
+    dict <str, dict <str, list of float>>
+        phase durations of every plan of every traffic light, keyed by the id
+        of the traffic light and then by the id of the program
+    """
+    return {tl_id: {program_id: [float(phase["duration"]) for phase in phases]
+                    for program_id, phases in programs.items()}
+            for tl_id, programs in read_phases(file_names, tl_ids).items()}
+
+
+class SCATSPlans(object):
+    """Phase durations of the signal plans of several traffic lights.
+
+    The plans are stored in arrays indexed by (traffic light, program, phase),
+    in which the rows of traffic lights with fewer programs, and of programs
+    with fewer phases, are padded.
+
+    Attributes
+    ----------
+    tl_ids : list of str
+        ids of the traffic lights, in the order of the rows of the arrays
+    program_ids : list of list of str
+        ids of the programs of every traffic light, in the order of the
+        columns of the arrays
+    durations : numpy.ndarray
+        duration of every phase of every program of every traffic light, NaN
+        for padding
+    num_phases : numpy.ndarray
+        number of phases of every program of every traffic light, 0 for
+        padding
+    """
+
+    def __init__(self, plans):
+        """Compile the plans of traffic lights.
+
+        Parameters
+        ----------
+        plans : dict <str, dict <str, list of float>>
+            phase durations of every plan of every traffic light, keyed by the
+            id of the traffic light and then by the id of the program, as
+            returned by read_plans
+        """
+        self.tl_ids = list(plans)
+        self.program_ids = [list(plans[tl_id]) for tl_id in self.tl_ids]
+        max_programs = max([len(programs) for programs in plans.values()] + [1])
+        max_phases = max([len(durations) for programs in plans.values()
+                          for durations in programs.values()] + [1])
+
+        self.durations = np.full((len(self.tl_ids), max_programs, max_phases), np.nan)
+        self.num_phases = np.zeros((len(self.tl_ids), max_programs), dtype=int)
+        for row, tl_id in enumerate(self.tl_ids):
+            for col, durations in enumerate(plans[tl_id].values()):
+                self.durations[row, col, :len(durations)] = durations
+                self.num_phases[row, col] = len(durations)
+
+        self._rows = {tl_id: row for row, tl_id in enumerate(self.tl_ids)}
+        self._cols = [{program_id: col for col, program_id in enumerate(programs)}
+                      for programs in self.program_ids]
+
+    @classmethod
+    def from_files(cls, file_names, tl_ids=None):
+        """Compile the plans of traffic lights defined in sumo files.
+
+        See read_plans for a description of the parameters.
+        """
+        return cls(read_plans(file_names, tl_ids))
+
+    @classmethod
+    def from_logics(cls, logics):
+        """Compile the plans of traffic lights returned by TraCI.
+
+        Parameters
+        ----------
+        logics : dict <str, list of traci.trafficlight.Logic>
+            logics of every traffic light, as returned by
+            traci.trafficlight.getAllProgramLogics
+        """
+        return cls({tl_id: {logic.programID: [phase.duration for phase in logic.phases]
+                            for logic in tl_logics}
+                    for tl_id, tl_logics in logics.items()})
+
+    @property
+    def max_phases(self):
+        """Return the maximum number of phases of a program."""
+        return self.durations.shape[2]
+
+    def index(self, tl_id, program_id=None):
+        """Return the row of a traffic light, or its row and the column of one of its programs."""
+        row = self._rows[tl_id]
+        if program_id is None:
+            return row
+        return row, self._cols[row][program_id]
+
+    def select(self, ds, current, rows=None):
+        """Select the plan of minimum degree of saturation for traffic lights.
+
+        The degree of saturation (DS) that a plan would have had is the sum,
+        over the phases it shares with the current plan, of the DS of every
+        phase scaled by the ratio of the durations of the phase in the current
+        plan and in that plan. Traffic lights keep their current plan unless
+        another plan has a strictly smaller DS; ties between other plans are
+        broken by the order of the programs.
+
+        Parameters
+        ----------
+        ds : array_like
+            DS of every phase of the current plan of every traffic light, with
+            one row per traffic light. Columns beyond the number of phases of
+            the current plan are ignored
+        current : array_like of int
+            column of the current plan of every traffic light
+        rows : array_like of int, optional
+            rows of the traffic lights, defaults to all traffic lights
+
+        Returns
+        -------
+        numpy.ndarray
+            column of the selected plan of every traffic light
+        """
+        rows = np.arange(len(self.tl_ids)) if rows is None else np.asarray(rows, dtype=int)
+        current = np.asarray(current, dtype=int)
+        ds = np.asarray(ds, dtype=float)[:, :self.max_phases]
+
+        durations = self.durations[rows]
+        tls = np.arange(len(rows))
+        current_durations = durations[tls, current]
+        # the DS of every phase is scaled by the ratio of its durations, which
+        # is exactly 1 for phases whose duration is the same in both plans, so
+        # that the current plan is kept on such ties. Phases missing in either
+        # plan do not contribute to the DS
+        with np.errstate(invalid="ignore"):
+            ratios = current_durations[:, None, :] / durations
+        candidate_ds = np.nansum(ds[:, None, :] * ratios, axis=2)
+        candidate_ds[self.num_phases[rows] == 0] = np.inf
+
+        best = np.argmin(candidate_ds, axis=1)
+        current_ds = candidate_ds[tls, current]
+        return np.where(current_ds <= candidate_ds[tls, best], current, best)
@@ -3,6 +3,7 @@ import unittest
 from flow.core.params import SumoParams, EnvParams, InitialConfig, \
     NetParams, SumoCarFollowingParams, SumoLaneChangeParams
 from flow.core.params import VehicleParams
+from flow.core.kernel.simulation import TraCISimulation
 
 from flow.controllers.routing_controllers import ContinuousRouter
 from flow.controllers.car_following_models import IDMController
@@ -11,10 +12,18 @@ from flow.envs.ring.accel import ADDITIONAL_ENV_PARAMS
 from flow.utils.exceptions import FatalFlowError
 from flow.envs import Env, TestEnv
 
+from flow.core.params import TrafficLightParams
+from flow.core.kernel.traffic_light import SCATSController
+import flow.config as config
 from tests.setup_scripts import ring_road_exp_setup, highway_exp_setup
 import os
+import tempfile
+import subprocess
+import sys
+import sumolib
 import gym.spaces as spaces
 from gym.spaces.box import Box
+from traci.exceptions import TraCIException
 import numpy as np
 
 os.environ["TEST_FLAG"] = "True"
@@ -136,6 +145,50 @@ class TestEmissionPath(unittest.TestCase):
         self.assertIsNone(self.env.sim_params.emission_path)
 
 
+class TestSumoStart(unittest.TestCase):
+    """
+    Tests that the connection to sumo fails as soon as the sumo subprocess
+    exits, instead of retrying until the timeout.
+    """
+
+    def test_exited_subprocess(self):
+        simulation = TraCISimulation(None)
+        simulation.sumo_proc = subprocess.Popen([sys.executable, "-c", "pass"])
+        simulation.sumo_proc.wait()
+        self.assertRaises(TraCIException, simulation._connect,
+                          sumolib.miscutils.getFreeSocketPort())
+
+
+class TestReloadInstance(unittest.TestCase):
+    """
+    Tests that with reload_instance, the simulation is reset in the running
+    sumo process, which gives the same rollouts as restarting sumo.
+    """
+
+    def run_rollout(self, env):
+        env.reset()
+        for _ in range(5):
+            env.step(rl_actions=None)
+        veh_ids = env.k.vehicle.get_ids()
+        return env.k.vehicle.get_position(veh_ids)
+
+    def test_reload(self):
+        positions = []
+        for reload_instance in [False, True]:
+            sim_params = SumoParams(restart_instance=True, seed=1,
+                                    reload_instance=reload_instance)
+            env, _, _ = ring_road_exp_setup(sim_params=sim_params)
+            env.reset()
+            sumo_proc = env.k.simulation.sumo_proc
+            positions.append(self.run_rollout(env))
+            # the sumo process is only kept if it is reloaded
+            self.assertEqual(env.k.simulation.sumo_proc is sumo_proc,
+                             reload_instance)
+            env.terminate()
+
+        np.testing.assert_array_almost_equal(positions[0], positions[1])
+
+
 class TestApplyingActionsWithSumo(unittest.TestCase):
     """
     Tests the apply_acceleration, apply_lane_change, and choose_routes
@@ -313,6 +366,98 @@ class TestWarmUpSteps(unittest.TestCase):
         self.assertEqual(t2 - t1, warmup_step)
 
 
+class TestWarmUpSnapshot(unittest.TestCase):
+    """Tests the identification of the warm-up snapshots of rollouts."""
+
+    def snapshot_prefix(self, length, additional_params=None):
+        net_params = NetParams(additional_params={
+            "length": length, "lanes": 1, "speed_limit": 30, "resolution": 40})
+        sim_params = SumoParams(sim_step=0.1, render=False, seed=1, warmup_snapshot=True)
+        env_params = EnvParams(additional_params=dict(ADDITIONAL_ENV_PARAMS, **(additional_params or {})))
+        env, _, _ = ring_road_exp_setup(sim_params=sim_params, net_params=net_params, env_params=env_params)
+        prefix = env._warmup_snapshot_prefix()
+        env.terminate()
+        return prefix
+
+    def test_prefix(self):
+        # the same network has the same snapshots in every environment, and
+        # the geometry of the network is part of the key
+        self.assertEqual(self.snapshot_prefix(230), self.snapshot_prefix(230))
+        self.assertNotEqual(self.snapshot_prefix(230), self.snapshot_prefix(260))
+
+    def test_parameters(self):
+        # numpy values and sets are serialized
+        prefix = self.snapshot_prefix(230, {"ids": {"b", "a"}, "max": np.float32(2), "bounds": np.arange(3)})
+        self.assertEqual(prefix, self.snapshot_prefix(230, {"ids": {"a", "b"}, "max": 2., "bounds": [0, 1, 2]}))
+        self.assertNotEqual(prefix, self.snapshot_prefix(230, {"ids": {"a"}, "max": 2., "bounds": [0, 1, 2]}))
+
+        # objects represented by their address are not part of any key
+        with self.assertWarns(UserWarning):
+            self.assertIsNone(self.snapshot_prefix(230, {"controller": object()}))
+
+    def test_restore(self):
+        # the state of the kernel after restoring a snapshot matches the
+        # state after replaying the warm-up steps
+        traffic_lights = TrafficLightParams()
+        traffic_lights.add("top", phases=[
+            {"duration": "4", "state": "G"},
+            {"duration": "1", "state": "y"},
+            {"duration": "4", "state": "r"}])
+        vehicles = VehicleParams()
+        vehicles.add(veh_id="idm", acceleration_controller=(IDMController, {}),
+                     routing_controller=(ContinuousRouter, {}), num_vehicles=10)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_dir = config.CACHE_DIR
+            config.CACHE_DIR = os.path.join(tmp_dir, "cache")
+            sim_params = SumoParams(sim_step=0.1, render=False, restart_instance=True, warmup_snapshot=True,
+                                    warmup_seeds=[1], trip_metrics=True, timeseries_path=tmp_dir)
+            env_params = EnvParams(warmup_steps=250, additional_params=ADDITIONAL_ENV_PARAMS)
+            env, _, _ = ring_road_exp_setup(sim_params=sim_params, env_params=env_params, vehicles=vehicles,
+                                            traffic_lights=traffic_lights)
+            controller = SCATSController(["top"], lane_occupancy=True)
+            env.k.traffic_light.add_controller(controller)
+
+            # the first rollout with the controller replays the warm-up steps
+            # and stores the snapshot, which the second one restores
+            states = []
+            for restored in [False, True]:
+                self.assertEqual(os.path.isfile(env._warmup_snapshot_prefix() + ".pkl"), restored)
+                env.reset()
+                states.append({
+                    "controller": controller.get_snapshot(),
+                    "metrics": env.k.simulation.get_trip_metrics(),
+                    "timeseries": len(env.k.simulation.timeseries_recorder),
+                    "num_departed": list(env.k.vehicle._num_departed),
+                })
+            env.terminate()
+            config.CACHE_DIR = cache_dir
+
+        replayed, restored = states
+        self.assertTrue(np.all(replayed["controller"]["ds"] > 0))
+        for key in ["programs", "phase_count", "last_switch"]:
+            np.testing.assert_array_equal(restored["controller"][key], replayed["controller"][key])
+        # the last warm-up step is simulated from the restored state of sumo,
+        # which is not bitwise identical
+        for key in ["ds", "occupied_time"]:
+            np.testing.assert_allclose(restored["controller"][key], replayed["controller"][key], rtol=1e-5)
+        signals = zip(restored["controller"]["signals"], replayed["controller"]["signals"])
+        for (program, phase, remaining), signal in signals:
+            self.assertEqual((program, phase), signal[:2])
+            self.assertAlmostEqual(remaining, signal[2])
+        for key, value in replayed["metrics"].items():
+            np.testing.assert_allclose(restored["metrics"][key], value, rtol=1e-5)
+        self.assertEqual(restored["timeseries"], 251)
+        self.assertEqual(restored["timeseries"], replayed["timeseries"])
+        self.assertEqual(restored["num_departed"], replayed["num_departed"])
+
+    def test_missing_file(self):
+        sim_params = SumoParams(sim_step=0.1, render=False, seed=1, warmup_snapshot=True)
+        env, _, _ = ring_road_exp_setup(sim_params=sim_params)
+        os.remove(os.path.join(env.k.network.cfg_path, env.k.network.roufn))
+        self.assertRaises(FileNotFoundError, env._warmup_snapshot_prefix)
+        env.terminate()
+
+
 class TestSimsPerStep(unittest.TestCase):
     """Ensures that the appropriate number of simultaions are run at any given
     steps when using flow.core.params.EnvParams.sims_per_step"""
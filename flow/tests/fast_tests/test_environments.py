@@ -21,6 +21,7 @@ from flow.envs.multiagent import MultiAgentHighwayPOEnv
 from flow.envs.multiagent import MultiAgentAccelPOEnv
 from flow.envs.multiagent import MultiAgentWaveAttenuationPOEnv
 from flow.envs.multiagent import MultiAgentMergePOEnv
+from flow.envs.multiagent.sumo_template import LaneIndex, LaneVehicleTracker
 
 os.environ["TEST_FLAG"] = "True"
 
@@ -1326,6 +1327,123 @@ class TestMultiAgentHighwayPOEnv(unittest.TestCase):
         )
 
 
+class TestLaneIndex(unittest.TestCase):
+    """Tests the lane index used by the observations of the UAV envs."""
+
+    def setUp(self):
+        self.index = LaneIndex(
+            tl_ids=["a", "b"],
+            mapping_inc={"a": ["e1_0", "e1_1"], "b": ["e2_0"]},
+            num_in_max=2,
+            mapping_out={"a": ["e2_0"], "b": ["e3_0", "e3_1"]},
+            num_out_max=2)
+
+    def test_lookup(self):
+        # vehicles on unwatched lanes are assigned to the padding slot
+        slots = self.index.lookup(["e1", "e2", "e1", "e4", "e1"], [1, 0, 1, 0, 2])
+        np.testing.assert_array_equal(
+            slots, [1, 2, 1, self.index.pad, self.index.pad])
+        self.assertEqual(self.index.edges(), ["e1", "e1", "e2", "e3", "e3"])
+
+    def test_aggregate_and_gather(self):
+        slots = self.index.lookup(["e1", "e2", "e1", "e4"], [1, 0, 1, 0])
+        counts = self.index.aggregate(slots)
+        speeds = self.index.aggregate(slots, weights=[1., 2., 3., 4.])
+        np.testing.assert_array_equal(counts, [0, 2, 1, 0, 0, 0])
+        np.testing.assert_array_equal(speeds, [0, 4, 2, 0, 0, 0])
+
+        # incoming lanes followed by outgoing lanes, padded with zeros
+        np.testing.assert_array_equal(
+            self.index.gather(counts),
+            [[0, 2, 1, 0],
+             [1, 0, 0, 0]])
+
+
+class TestLaneVehicleTracker(unittest.TestCase):
+    """Tests the incremental record of the vehicles around intersections."""
+
+    class _Vehicles(object):
+        def __init__(self):
+            self.ids, self.departed, self.arrived = [], [], []
+
+        def get_ids(self):
+            return self.ids
+
+        def get_departed_ids(self):
+            return self.departed
+
+        def get_arrived_ids(self):
+            return self.arrived
+
+    def setUp(self):
+        self.vehicles = self._Vehicles()
+        self.tracker = LaneVehicleTracker(["in_0", "out_0"], ["in_0"])
+
+    def step(self, lane_vehicles, departed=(), arrived=()):
+        self.vehicles.departed = list(departed)
+        self.vehicles.arrived = list(arrived)
+        self.vehicles.ids = [veh for veh in self.vehicles.ids if veh not in arrived] + list(departed)
+        self.tracker.update(lane_vehicles, self.vehicles)
+
+    def test_order_passing_and_travel_time(self):
+        self.step({"in_0": ["b", "a"], "out_0": []}, departed=["a", "b"])
+        # vehicles are kept in the order in which they entered the network
+        self.assertEqual(self.tracker.vehicles["in_0"], ["a", "b"])
+        self.assertEqual(self.tracker.travel_time, {"a": 0, "b": 0})
+
+        self.step({"in_0": ["b"], "out_0": ["a"]})
+        self.assertEqual(self.tracker.passing, {"in_0": ["a"], "out_0": []})
+        self.assertEqual(self.tracker.travel_time, {"a": 0, "b": 1})
+
+        # the travel time of arrived vehicles is kept for one more step
+        self.step({"in_0": [], "out_0": ["b"]}, arrived=["a"])
+        self.assertEqual(self.tracker.passing["in_0"], ["b"])
+        self.assertEqual(self.tracker.travel_time, {"a": 0, "b": 1})
+        self.step({"in_0": [], "out_0": []}, arrived=["b"])
+        self.assertEqual(self.tracker.travel_time, {"b": 1})
+
+    def reward(self):
+        # as in UAVEnvIntelliLight.compute_reward
+        reward = 0
+        for lane in self.tracker.incoming_lanes:
+            for veh_id in self.tracker.passing[lane]:
+                reward += self.tracker.travel_time.get(veh_id, 0)
+                self.tracker.travel_time[veh_id] = 0
+        return reward
+
+    def test_vehicle_coming_back(self):
+        self.tracker = LaneVehicleTracker(["in_0", "in_1", "out_0"], ["in_0", "in_1"])
+        # warm-up steps, without any reward
+        self.step({"in_0": ["a"], "in_1": [], "out_0": []}, departed=["a"])
+        self.step({"in_0": ["a"], "in_1": [], "out_0": []})
+        self.step({"in_0": ["a"], "in_1": [], "out_0": []}, departed=["b"])
+        self.step({"in_0": [], "in_1": [], "out_0": []})
+        self.assertEqual(self.tracker.travel_time, {"a": 2})
+
+        # "a" leaves the tracked lanes and comes back after "b"
+        rewards = []
+        for lanes in [{"in_0": [], "in_1": [], "out_0": []},
+                      {"in_0": [], "in_1": ["b", "a"], "out_0": []},
+                      {"in_0": [], "in_1": ["b", "a"], "out_0": []},
+                      {"in_0": [], "in_1": [], "out_0": ["a", "b"]}]:
+            self.step(lanes)
+            rewards.append(self.reward())
+        # it keeps its order and its travel time until it leaves the network
+        self.assertEqual(self.tracker.vehicles["out_0"], ["a", "b"])
+        self.assertEqual(rewards, [0, 0, 0, 5])
+        self.assertEqual(self.tracker.travel_time, {"a": 0, "b": 0})
+
+    def test_unknown_vehicles(self):
+        # vehicles that were not seen departing are ordered by the kernel
+        self.vehicles.ids = ["c", "a"]
+        self.tracker.update({"in_0": ["a", "c"], "out_0": []}, self.vehicles)
+        self.assertEqual(self.tracker.vehicles["in_0"], ["c", "a"])
+
+        self.tracker.reset()
+        self.assertEqual(self.tracker.vehicles["in_0"], [])
+        self.assertEqual(self.tracker.travel_time, {})
+
+
 ###############################################################################
 #                              Utility methods                                #
 ###############################################################################
@@ -70,7 +70,8 @@ class TestNonRLExamples(unittest.TestCase):
             'exp_config': 'exp_config',
             'gen_emission': False,
             'no_render': False,
-            'num_runs': 1
+            'num_runs': 1,
+            'trip_metrics': False
         })
 
         # test the case when optional args are specified
@@ -79,7 +80,8 @@ class TestNonRLExamples(unittest.TestCase):
             '--aimsun',
             '--gen_emission',
             '--no_render',
-            '--num_runs', '2'
+            '--num_runs', '2',
+            '--trip_metrics'
         ])
 
         self.assertDictEqual(vars(args), {
@@ -87,7 +89,8 @@ class TestNonRLExamples(unittest.TestCase):
             'exp_config': 'exp_config',
             'gen_emission': True,
             'no_render': True,
-            'num_runs': 2
+            'num_runs': 2,
+            'trip_metrics': True
         })
 
     def test_bottleneck(self):
@@ -4,6 +4,9 @@ import time
 import csv
 
 from flow.core.experiment import Experiment
+from flow.core.kernel.simulation.emission import EmissionRecorder
+from flow.core.kernel.simulation.metrics import TripMetrics
+from flow.core.kernel.simulation.timeseries import TimeSeriesRecorder
 from flow.core.params import VehicleParams
 from flow.controllers import IDMController, RLController, ContinuousRouter
 from flow.core.params import SumoCarFollowingParams
@@ -210,5 +213,168 @@ class TestConvertToCSV(unittest.TestCase):
             exp.env.network.name)))
 
 
+class TestEmissionRecorder(unittest.TestCase):
+    """Tests the streaming recorder of the emission data."""
+
+    def setUp(self):
+        # create the environment and network classes for a ring road
+        self.env, _, _ = ring_road_exp_setup()
+        self.file_name = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), "test_emission.csv")
+
+    def tearDown(self):
+        # terminate the traci instance
+        self.env.terminate()
+        self.env = None
+        if os.path.isfile(self.file_name):
+            os.remove(self.file_name)
+
+    def test_record(self):
+        # record a few steps in small chunks, so that some are flushed by the
+        # background thread while recording. Every time is recorded twice, and
+        # only the last record should be kept
+        recorder = EmissionRecorder(
+            self.file_name, fields=["speed", "edge_id", "lane_number"],
+            chunk_size=5)
+        self.env.reset()
+        expected = []
+        for t in range(3):
+            self.env.step(rl_actions=None)
+            veh_ids = self.env.k.vehicle.get_ids()
+            recorder.record(t, self.env.k.vehicle)
+            recorder.record(t, self.env.k.vehicle)
+            expected.extend([
+                [str(float(t)), veh_id,
+                 str(self.env.k.vehicle.get_speed(veh_id)),
+                 self.env.k.vehicle.get_edge(veh_id),
+                 str(self.env.k.vehicle.get_lane(veh_id))]
+                for veh_id in veh_ids])
+        recorder.close()
+
+        # check that all rows are written in the order they were recorded
+        with open(self.file_name, "r") as f:
+            rows = list(csv.reader(f))
+        self.assertListEqual(
+            rows[0], ["time", "id", "speed", "edge_id", "lane_number"])
+        self.assertListEqual(rows[1:], expected)
+
+    def test_invalid_parameters(self):
+        self.assertRaises(ValueError, EmissionRecorder, self.file_name,
+                          fields=["speed", "unknown"])
+        self.assertRaises(ValueError, EmissionRecorder, self.file_name,
+                          fmt="unknown")
+
+
+class _Vehicles(object):
+    """Vehicle kernel stub returning fixed values for the trip metrics."""
+
+    def __init__(self):
+        self.ids = []
+        self.arrived_ids = []
+        self.distance = {}
+        self.speed = {}
+
+    def get_ids(self):
+        return self.ids
+
+    def get_arrived_ids(self):
+        return self.arrived_ids
+
+    def get_emission(self, veh_ids, emission, error=-1001):
+        return [1 if emission == "fuel" else 2 for _ in veh_ids]
+
+    def get_distance(self, veh_ids, error=-1001):
+        return [self.distance[veh_id] for veh_id in veh_ids]
+
+    def get_speed(self, veh_ids, error=-1001):
+        return [self.speed[veh_id] for veh_id in veh_ids]
+
+
+class TestTripMetrics(unittest.TestCase):
+    """Tests the online aggregation of the metrics of the trips."""
+
+    def test_metrics(self):
+        metrics = TripMetrics(travel_time_bins=[0, 2, 4])
+        vehicles = _Vehicles()
+        metrics.reset(10)
+
+        # "a" departs at 10 and arrives at 13, "b" departs at 11 and arrives
+        # at 16, the last bin also counting longer travel times
+        steps = [(["a"], []), (["a", "b"], []), (["a", "b"], []), (["b"], ["a"]),
+                 (["b"], []), (["b"], []), ([], ["b"])]
+        for step, (ids, arrived_ids) in enumerate(steps):
+            vehicles.ids, vehicles.arrived_ids = ids, arrived_ids
+            vehicles.distance = {veh_id: 10 * step for veh_id in ids}
+            metrics.update(10 + step, 1, vehicles)
+
+        result = metrics.get_metrics()
+        self.assertEqual(result["num_trips"], 2)
+        self.assertAlmostEqual(result["travel_time"], 4)
+        # route lengths of 20 and 50 m
+        self.assertAlmostEqual(result["route_length"], 35)
+        # fuel and CO2 of 3 and 5 steps
+        self.assertAlmostEqual(result["fuel"], 8 / (70 / 100))
+        self.assertAlmostEqual(result["co2"], 16 / 70)
+        self.assertAlmostEqual(result["running_vehicles"], 8 / 7)
+        self.assertEqual(result["max_running_vehicles"], 2)
+        np.testing.assert_array_equal(result["travel_time_histogram"], [0, 2])
+
+        # the metrics only cover the trips since the last reset
+        metrics.reset(20)
+        self.assertEqual(metrics.get_metrics()["num_trips"], 0)
+        self.assertTrue(np.isnan(metrics.get_metrics()["travel_time"]))
+
+    def test_disabled_by_default(self):
+        # neither the metrics nor the CO2 emission are collected by default
+        env, _, _ = ring_road_exp_setup()
+        env.reset()
+        env.step(None)
+        self.assertIsNone(env.k.simulation.get_trip_metrics())
+        veh_id = env.k.vehicle.get_ids()[0]
+        self.assertIsNone(env.k.vehicle.get_emission(veh_id, "co2", error=None))
+        env.terminate()
+
+        env, _, _ = ring_road_exp_setup(sim_params=SumoParams(sim_step=0.1, render=False, trip_metrics=True))
+        env.reset()
+        env.step(None)
+        self.assertEqual(env.k.simulation.get_trip_metrics()["num_trips"], 0)
+        veh_id = env.k.vehicle.get_ids()[0]
+        self.assertGreaterEqual(env.k.vehicle.get_emission(veh_id, "co2"), 0)
+        env.terminate()
+
+
+class TestTimeSeriesRecorder(unittest.TestCase):
+    """Tests the recorder of the time series of a rollout."""
+
+    def setUp(self):
+        self.file_name = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), "test_timeseries.npz")
+
+    def tearDown(self):
+        if os.path.isfile(self.file_name):
+            os.remove(self.file_name)
+
+    def test_record(self):
+        recorder = TimeSeriesRecorder(self.file_name)
+        vehicles = _Vehicles()
+        recorder.save()
+        self.assertFalse(os.path.isfile(self.file_name))
+
+        # the speed of the teleporting vehicle "c" is ignored
+        vehicles.ids = []
+        recorder.record(10, 3, vehicles)
+        vehicles.ids = ["a", "b", "c"]
+        vehicles.speed = {"a": 0, "b": 10, "c": -2 ** 30}
+        recorder.record(11, 3, vehicles)
+        recorder.save()
+
+        with np.load(self.file_name) as data:
+            np.testing.assert_array_equal(data["time"], [10, 11])
+            np.testing.assert_array_equal(data["running"], [0, 3])
+            np.testing.assert_array_equal(data["min_expected"], [3, 3])
+            np.testing.assert_array_equal(data["mean_speed"], [np.nan, 5])
+            np.testing.assert_array_equal(data["halting"], [0, 1])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 import os
+import tempfile
 import numpy as np
 
 from flow.config import PROJECT_PATH
@@ -12,6 +13,10 @@ from flow.core.params import SumoCarFollowingParams
 from flow.networks.ring import RingNetwork, ADDITIONAL_NET_PARAMS
 from flow.envs import TestEnv
 from flow.networks import Network
+from flow.networks.sumo_network import read_topology
+from flow.core.kernel.network.traci import read_net
+from flow.core.util import read_cached
+import flow.config as config
 
 from flow.controllers.routing_controllers import ContinuousRouter
 from flow.controllers.car_following_models import IDMController
@@ -64,6 +69,26 @@ class TestGetX(unittest.TestCase):
         pos = 4.72
         self.assertAlmostEqual(self.env.k.network.get_x(edge, pos), -1001)
 
+    def test_getx_vector(self):
+        # the positions of several edges are computed at once
+        np.testing.assert_array_almost_equal(
+            self.env.k.network.get_x(["bottom", ":bottom", ""], [4.72, 0.1, 4.72]),
+            [5, 0.1, -1001])
+
+        # the same positions as for single edges, including internal links
+        # which are generalized for by a single element
+        edges = np.array(self.env.k.network.get_edge_list() + [":bottom", ":bottom_1", ""])
+        positions = np.linspace(0, 1, len(edges))
+        np.testing.assert_array_equal(
+            self.env.k.network.get_x(edges, positions),
+            [self.env.k.network.get_x(edge, pos) for edge, pos in zip(edges, positions)])
+
+        # the positions of all vehicles are mapped in a single call
+        ids = self.env.k.vehicle.get_ids()
+        self.assertListEqual(
+            self.env.k.vehicle.get_x_by_id(ids),
+            [self.env.k.vehicle.get_x_by_id(veh_id) for veh_id in ids])
+
 
 class TestGetEdge(unittest.TestCase):
     """
@@ -92,6 +117,18 @@ class TestGetEdge(unittest.TestCase):
         self.assertTupleEqual(
             self.env.k.network.get_edge(x2), (":bottom", 0.1))
 
+        # test for a position before the start of the network
+        self.assertIsNone(self.env.k.network.get_edge(-1))
+
+    def test_get_edge_vector(self):
+        # the edges of several positions are found at once, and match the
+        # edges of the positions taken one by one
+        x = np.linspace(-1, self.env.k.network.length(), 200)
+        self.assertListEqual(
+            self.env.k.network.get_edge(x),
+            [self.env.k.network.get_edge(x_i) for x_i in x.tolist()])
+        self.assertListEqual(self.env.k.network.get_edge([]), [])
+
 
 class TestEvenStartPos(unittest.TestCase):
     """
@@ -885,6 +922,206 @@ class TestNextPrevEdge(unittest.TestCase):
         self.assertTrue(len(prev_edge) == 0)
 
 
+class TestLaneSubscriptions(unittest.TestCase):
+    """
+    Tests that the lane subscriptions of the network kernel match the state of
+    the vehicles on these lanes.
+    """
+
+    def test_lane_subscriptions(self):
+        env, _, _ = ring_road_exp_setup()
+        lanes = ["{}_0".format(edge) for edge in env.k.network.get_edge_list()]
+        env.k.network.subscribe_lanes(lanes)
+        env.reset()
+
+        for _ in range(5):
+            env.step(rl_actions=None)
+
+            for lane in lanes:
+                edge = lane.rsplit("_", 1)[0]
+                veh_ids = env.k.vehicle.get_ids_by_edge(edge)
+                self.assertCountEqual(
+                    env.k.network.get_lane_vehicle_ids(lane), veh_ids)
+                self.assertEqual(
+                    env.k.network.get_lane_num_vehicles(lane), len(veh_ids))
+                if len(veh_ids) > 0:
+                    self.assertAlmostEqual(
+                        env.k.network.get_lane_mean_speed(lane),
+                        np.mean(env.k.vehicle.get_speed(veh_ids)))
+                self.assertEqual(
+                    env.k.network.get_lane_num_halting(lane),
+                    sum(speed < 0.1 for speed in
+                        env.k.vehicle.get_speed(veh_ids)))
+
+        # lanes that are not subscribed to return the error value
+        self.assertEqual(env.k.network.get_lane_num_vehicles("top_1"), -1001)
+        self.assertEqual(env.k.network.get_lane_vehicle_ids("top_1"), ())
+
+        env.terminate()
+
+
+class TestReadTopology(unittest.TestCase):
+    """Tests the single pass extraction of the traffic light topology."""
+
+    NET = """<net>
+    <edge id="a"><lane id="a_0"/><lane id="a_1"/></edge>
+    <tlLogic id="j" type="static" programID="0" offset="0">
+        <phase duration="30" state="Gr"/>
+        <phase duration="3" state="yr"/>
+    </tlLogic>
+    <junction id="j" type="traffic_light" incLanes="a_0 a_1 b_0"/>
+    <junction id="k" type="priority" incLanes="c_0"/>
+    <connection from="a" to="c" fromLane="0" toLane="0" tl="j"/>
+    <connection from="b" to="c" fromLane="0" toLane="1" tl="j"/>
+    <connection from="a" to="d" fromLane="1" toLane="0" tl="j"/>
+</net>
+"""
+
+    def test_read_topology(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            net_file = os.path.join(tmp_dir, "test.net.xml")
+            with open(net_file, "w") as f:
+                f.write(self.NET)
+            topology = read_topology(net_file)
+
+        # only traffic light junctions are kept
+        self.assertEqual(topology["incoming_lanes"], {"j": ["a_0", "a_1", "b_0"]})
+        self.assertEqual(topology["connections"],
+                         {"a_0": [(0, "c_0")], "b_0": [(1, "c_1")], "a_1": [(2, "d_0")]})
+        self.assertEqual(topology["phases"], {"j": ["Gr", "yr"]})
+
+
+class TestVehicleInfos(unittest.TestCase):
+    """Tests the cached extraction of the vehicles, routes and types."""
+
+    ROU = """<routes>
+    <route id="r0" edges="a b"/>
+    <vehicle id="v0" type="car" route="r0" depart="1" departSpeed="0" departPos="2"/>
+    <vehicle id="v1" type="car" route="r1" depart="2" departSpeed="max" departPos="0">
+        <route edges="b c"/>
+    </vehicle>
+</routes>
+"""
+
+    ADD = """<additional>
+    <vType id="unused" accel="1" decel="2" sigma="0" minGap="1" maxSpeed="10" speedDev="0"/>
+    <vTypeDistribution id="d">
+        <vType id="car" accel="2" decel="3" sigma="0.5" minGap="2" maxSpeed="20" speedDev="0.1" length="4"/>
+    </vTypeDistribution>
+</additional>
+"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = config.CACHE_DIR
+        config.CACHE_DIR = os.path.join(self.tmp_dir.name, "cache")
+
+    def tearDown(self):
+        config.CACHE_DIR = self.cache_dir
+        self.tmp_dir.cleanup()
+
+    def test_vehicle_infos(self):
+        rou_file = os.path.join(self.tmp_dir.name, "test.rou.xml")
+        add_file = os.path.join(self.tmp_dir.name, "test.add.xml")
+        with open(rou_file, "w") as f:
+            f.write(self.ROU)
+        with open(add_file, "w") as f:
+            f.write(self.ADD)
+
+        expected_vehicles = {
+            "v0": {"departSpeed": "0", "depart": "1", "typeID": "car",
+                   "departPos": "2", "routeID": "r0"},
+            "v1": {"departSpeed": "max", "depart": "2", "typeID": "car",
+                   "departPos": "0", "routeID": "r1"},
+        }
+        # routes within vehicles are stored under the id of the vehicle
+        expected_routes = {"r0": ["a", "b"], "v1": ["b", "c"]}
+        # only the types of the distributions are read
+        expected_types = {"car": {
+            "vClass": 0, "accel": "2", "decel": "3", "sigma": "0.5",
+            "length": "4", "minGap": "2", "maxSpeed": "20", "probability": 0,
+            "speedDev": "0.1"}}
+
+        # the second reads are served by the cache
+        for _ in range(2):
+            vehicles, routes = Network._vehicle_infos(rou_file)
+            self.assertDictEqual(vehicles, expected_vehicles)
+            self.assertDictEqual(routes, expected_routes)
+            self.assertDictEqual(Network._vehicle_type(add_file), expected_types)
+            self.assertEqual(len(os.listdir(config.CACHE_DIR)), 2)
+        self.assertIsNone(Network._vehicle_type(None))
+
+
+class TestReadNet(unittest.TestCase):
+    """Tests the single pass import of the edges and connections of a net."""
+
+    NET = """<net>
+    <type id="fast" speed="25" numLanes="2"/>
+    <edge id="a" type="fast">
+        <lane id="a_0" speed="10" length="100"/><lane id="a_1" speed="10" length="100"/>
+    </edge>
+    <edge id="b"><lane id="b_0" speed="15" length="50"/></edge>
+    <edge id="c"><lane id="c_0" length="20.5"/></edge>
+    <edge id=":j_0" function="internal"><lane id=":j_0_0" speed="5" length="3"/></edge>
+    <connection from="a" to="b" fromLane="0" toLane="0" via=":j_0_0"/>
+    <connection from=":j_0" to="b" fromLane="0" toLane="0"/>
+    <connection from="a" to="c" fromLane="1" toLane="0" via=":j_0_0"/>
+</net>
+"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = config.CACHE_DIR
+        config.CACHE_DIR = os.path.join(self.tmp_dir.name, "cache")
+        self.net_file = os.path.join(self.tmp_dir.name, "test.net.xml")
+        with open(self.net_file, "w") as f:
+            f.write(self.NET)
+
+    def tearDown(self):
+        config.CACHE_DIR = self.cache_dir
+        self.tmp_dir.cleanup()
+
+    def test_read_net(self):
+        net_data, connection_data = read_net(self.net_file)
+
+        # the speed of the type has precedence over the speed of the lanes
+        self.assertDictEqual(net_data, {
+            "a": {"speed": 25., "lanes": 2, "length": 100.},
+            "b": {"speed": 15., "lanes": 1, "length": 50.},
+            "c": {"speed": 30, "lanes": 1, "length": 20.5},
+            ":j_0": {"speed": 5., "lanes": 1, "length": 3.},
+        })
+        # connections from normal edges lead to their internal lane
+        self.assertDictEqual(connection_data["next"], {
+            "a": {0: [(":j_0", 0)], 1: [(":j_0", 0)]},
+            ":j_0": {0: [("b", 0)]},
+        })
+        self.assertDictEqual(connection_data["prev"], {
+            ":j_0": {0: [("a", 0), ("a", 1)]},
+            "b": {0: [(":j_0", 0)]},
+        })
+
+    def test_read_cached(self):
+        expected = read_net(self.net_file)
+        # the second read is served by the cache
+        for _ in range(2):
+            self.assertEqual(read_cached("net", self.net_file, read_net), expected)
+            self.assertEqual(len(os.listdir(config.CACHE_DIR)), 1)
+
+        # a modified file is read again
+        with open(self.net_file, "w") as f:
+            f.write(self.NET.replace('length="50"', 'length="60"'))
+        net_data, _ = read_cached("net", self.net_file, read_net)
+        self.assertEqual(net_data["b"]["length"], 60.)
+        self.assertEqual(len(os.listdir(config.CACHE_DIR)), 2)
+
+        # another reader of the same file does not get the cached data
+        def read_edges(net_file):
+            return sorted(read_net(net_file)[0])
+        self.assertEqual(read_cached("net", self.net_file, read_edges), [":j_0", "a", "b", "c"])
+        self.assertEqual(len(os.listdir(config.CACHE_DIR)), 3)
+
+
 class TestDefaultRoutes(unittest.TestCase):
 
     def test_default_routes(self):
@@ -1,5 +1,8 @@
 import unittest
 import os
+import tempfile
+
+import numpy as np
 
 from tests.setup_scripts import ring_road_exp_setup, traffic_light_grid_mxn_exp_setup
 from flow.core.params import VehicleParams
@@ -7,6 +10,7 @@ from flow.core.params import NetParams
 from flow.core.params import SumoCarFollowingParams
 from flow.core.params import TrafficLightParams
 from flow.core.experiment import Experiment
+from flow.core.kernel.traffic_light import SCATSController
 from flow.controllers.routing_controllers import GridRouter
 from flow.controllers.car_following_models import IDMController
 
@@ -375,5 +379,113 @@ class TestCustomization(unittest.TestCase):
                 self.env.step([])
 
 
+class TestSCATSController(unittest.TestCase):
+    """Tests the SCATS controller run by the traffic light kernel."""
+
+    def setUp(self):
+        # add a traffic light with a 4s green phase to the top node
+        traffic_lights = TrafficLightParams()
+        traffic_lights.add("top", phases=[
+            {"duration": "4", "state": "G"},
+            {"duration": "1", "state": "y"},
+            {"duration": "4", "state": "r"}])
+
+        # a plan with a longer green phase, loaded by the controller
+        self.plan_file = tempfile.NamedTemporaryFile(suffix=".xml")
+        self.plan_file.write(b"""<additional>
+            <tlLogic id="top" type="static" programID="long_green" offset="0">
+                <phase duration="8" state="G"/>
+                <phase duration="1" state="y"/>
+                <phase duration="2" state="r"/>
+            </tlLogic>
+        </additional>""")
+        self.plan_file.flush()
+
+        net_params = NetParams(additional_params={
+            "length": 230, "lanes": 1, "speed_limit": 30, "resolution": 40})
+        self.env, _, _ = ring_road_exp_setup(
+            net_params=net_params, traffic_lights=traffic_lights)
+
+    def tearDown(self):
+        # terminate the traci instance
+        self.env.terminate()
+
+        # free data used by the class
+        self.env = None
+        self.plan_file.close()
+
+    def test_controller(self):
+        # the ring has no detectors, so the occupancy is read from the lanes
+        controller = SCATSController(["top"], program_ids=["10", "long_green"],
+                                     plan_files=[self.plan_file.name], lane_occupancy=True)
+        self.env.k.traffic_light.add_controller(controller)
+        self.env.reset()
+
+        # the selected programs, including those of the plan file, are
+        # candidates, and the program of the network is kept initially
+        self.assertListEqual(controller.plans.program_ids, [["10", "long_green"]])
+        self.assertEqual(controller.programs[0], 0)
+        self.assertEqual(self.env.k.kernel_api.trafficlight.getProgram("top"), "10")
+
+        # the phase timing is available for the controlled traffic light
+        self.assertAlmostEqual(self.env.k.traffic_light.get_phase_duration("top"), 4)
+
+        # run a few cycles, during which the degree of saturation of every
+        # phase is measured and the plans are selected
+        sim_multiplier = int(1 / self.env.sim_params.sim_step)
+        for _ in range(4 * 9 * sim_multiplier):
+            self.env.step([])
+        self.assertTrue(np.all(controller.ds <= 1))
+        self.assertTrue(np.all(controller.ds[0, :3] > 0))
+        self.assertEqual(self.env.k.kernel_api.trafficlight.getProgram("top"),
+                         controller.plans.program_ids[0][controller.programs[0]])
+
+    def test_missing_detectors(self):
+        # the incoming lanes have no detectors, and the lanes themselves are
+        # not used unless requested
+        with self.assertRaises(ValueError):
+            self.env.k.traffic_light.add_controller(SCATSController(["top"]))
+
+    def test_detectors(self):
+        # place an E1 detector on every lane controlled by the traffic light
+        lanes = self.env.k.kernel_api.trafficlight.getControlledLanes("top")
+        detector_file = tempfile.NamedTemporaryFile(suffix=".add.xml")
+        detector_file.write("<additional>{}</additional>".format("".join(
+            '<e1Detector id="e1_{0}" lane="{0}" pos="-5" freq="900" file="NUL"/>'.format(lane)
+            for lane in lanes)).encode())
+        detector_file.flush()
+
+        # load the detectors along with the network generated for the ring,
+        # which is removed when the simulation is terminated
+        net_kernel = self.env.k.network
+        net_file = tempfile.NamedTemporaryFile(suffix=".net.xml")
+        with open(os.path.join(net_kernel.cfg_path, net_kernel.netfn), "rb") as f:
+            net_file.write(f.read())
+        net_file.flush()
+        self.env.terminate()
+        traffic_lights = TrafficLightParams()
+        traffic_lights.add("top", phases=[
+            {"duration": "4", "state": "G"},
+            {"duration": "1", "state": "y"},
+            {"duration": "4", "state": "r"}])
+        net_params = NetParams(template={
+            "net": net_file.name,
+            "add": [detector_file.name]}, additional_params=self.env.net_params.additional_params)
+        self.env, _, _ = ring_road_exp_setup(net_params=net_params, traffic_lights=traffic_lights)
+
+        controller = SCATSController(["top"])
+        self.env.k.traffic_light.add_controller(controller)
+        self.env.reset()
+        self.assertListEqual(controller._detectors, ["e1_{}".format(lane) for lane in lanes])
+
+        sim_multiplier = int(1 / self.env.sim_params.sim_step)
+        for _ in range(4 * 9 * sim_multiplier):
+            self.env.step([])
+        self.assertTrue(np.all(controller.ds <= 1))
+        self.assertTrue(np.all(controller.ds[0, :3] > 0))
+        detector_file.close()
+        net_file.close()
+
+
 if __name__ == '__main__':
     unittest.main()
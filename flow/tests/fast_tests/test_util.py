@@ -3,6 +3,9 @@ import csv
 import os
 import json
 import collections
+import tempfile
+
+import numpy as np
 
 from flow.envs import AccelEnv
 from flow.networks import FigureEightNetwork
@@ -11,11 +14,13 @@ from flow.core.params import TrafficLightParams
 from flow.controllers import IDMController, ContinuousRouter, RLController
 from flow.core.params import SumoParams, EnvParams, NetParams, InitialConfig, \
     InFlows, SumoCarFollowingParams
-from flow.core.util import emission_to_csv
+from flow.core.util import emission_to_csv, hash_files, ensure_cache_dir
+import flow.config as config
 from flow.envs import MergePOEnv
 from flow.networks import MergeNetwork
 from flow.utils.registry import make_create_env
 from flow.utils.rllib import FlowParamsEncoder, get_flow_params
+from flow.utils.scats import SCATSPlans, read_plans
 
 os.environ["TEST_FLAG"] = "True"
 
@@ -59,6 +64,104 @@ class TestEmissionToCSV(unittest.TestCase):
         self.assertEqual(len(dict1), 104)
 
 
+class TestHashFiles(unittest.TestCase):
+    """Tests the hash_files function used to key the warm-up snapshots."""
+
+    def test_hash_files(self):
+        current_path = os.path.realpath(__file__).rsplit("/", 1)[0]
+        fig8 = current_path + "/test_files/fig8.json"
+        merge = current_path + "/test_files/merge.json"
+
+        # the digest only depends on the content of the files and the extras
+        self.assertEqual(hash_files([fig8], extra=[1, 2]),
+                         hash_files([fig8], extra=[1, 2]))
+        self.assertNotEqual(hash_files([fig8], extra=[1, 2]),
+                            hash_files([fig8], extra=[1, 3]))
+        self.assertNotEqual(hash_files([fig8]), hash_files([merge]))
+
+        # files that do not exist are ignored
+        self.assertEqual(hash_files([fig8, "nonexistent.xml"]),
+                         hash_files([fig8]))
+
+
+class TestEnsureCacheDir(unittest.TestCase):
+    """Tests that the cache directory is private to the current user."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = config.CACHE_DIR
+        config.CACHE_DIR = os.path.join(self.tmp_dir.name, "cache")
+
+    def tearDown(self):
+        config.CACHE_DIR = self.cache_dir
+        self.tmp_dir.cleanup()
+
+    def test_ensure_cache_dir(self):
+        # the directory is created with access restricted to the user
+        self.assertEqual(ensure_cache_dir(), config.CACHE_DIR)
+        self.assertEqual(os.stat(config.CACHE_DIR).st_mode & 0o777, 0o700)
+
+        # a directory other users may write into is not used
+        os.chmod(config.CACHE_DIR, 0o777)
+        with self.assertWarns(UserWarning):
+            self.assertIsNone(ensure_cache_dir())
+
+
+class TestSCATSPlans(unittest.TestCase):
+    """Tests the degree of saturation engine used to select SCATS plans."""
+
+    def setUp(self):
+        self.plans = SCATSPlans({
+            "a": {"0": [40, 3, 40, 3], "1": [50, 3, 30, 3], "2": [30, 3, 50, 3]},
+            "b": {"0": [20, 20, 20], "1": [30, 15, 15]},
+        })
+
+    def test_compile(self):
+        self.assertListEqual(self.plans.tl_ids, ["a", "b"])
+        self.assertListEqual(self.plans.program_ids, [["0", "1", "2"], ["0", "1"]])
+        self.assertEqual(self.plans.max_phases, 4)
+        np.testing.assert_array_equal(self.plans.num_phases, [[4, 4, 4], [3, 3, 0]])
+        self.assertEqual(self.plans.index("b", "1"), (1, 1))
+
+    def test_select(self):
+        # a: the first phase is saturated, so the plan giving it the longest
+        # green time is selected. b: the current plan is kept on ties
+        ds = [[0.9, 0.1, 0.2, 0.1], [0.5, 0.5, 0.5, 0]]
+        np.testing.assert_array_equal(self.plans.select(ds, [0, 1]), [1, 1])
+
+        # compare with the DS computed phase by phase
+        ds = np.random.RandomState(0).uniform(size=(1, 4))
+        expected = [sum(ds[0, i] * 40 / d for i, d in enumerate(durations))
+                    for durations in [[40, 3, 40, 3], [50, 3, 30, 3], [30, 3, 50, 3]]]
+        self.assertEqual(self.plans.select(ds, [0], rows=[0])[0], np.argmin(expected))
+
+    def test_select_ties(self):
+        # phases with the same duration in two plans contribute exactly the
+        # same DS to both, so the current plan is kept on such ties
+        plans = SCATSPlans({"a": {"0": [42, 3, 42, 3], "1": [45, 3, 35, 3]}})
+        ds = np.zeros((100, 4))
+        ds[:, [1, 3]] = np.random.RandomState(0).uniform(size=(100, 2))
+        for row in ds:
+            np.testing.assert_array_equal(plans.select([row], [0]), [0])
+            np.testing.assert_array_equal(plans.select([row], [1]), [1])
+
+    def test_read_plans(self):
+        xml = b"""<additional>
+            <tlLogic id="a" type="static" programID="1" offset="0">
+                <phase duration="45" state="GGr"/>
+                <phase duration="3" state="yyr"/>
+            </tlLogic>
+            <tlLogic id="b" type="static" programID="1" offset="0">
+                <phase duration="10" state="GGr"/>
+            </tlLogic>
+        </additional>"""
+        with tempfile.NamedTemporaryFile(suffix=".xml") as f:
+            f.write(xml)
+            f.flush()
+            self.assertDictEqual(read_plans([f.name]), {"a": {"1": [45, 3]}, "b": {"1": [10]}})
+            self.assertDictEqual(read_plans([f.name], tl_ids=["b"]), {"b": {"1": [10]}})
+
+
 class TestRegistry(unittest.TestCase):
     """Tests the methods located in flow/utils/registry.py"""
 
@@ -9,6 +9,7 @@ from flow.controllers.car_following_models import IDMController, \
     SimCarFollowingController
 from flow.controllers.lane_change_controllers import StaticLaneChanger
 from flow.controllers.rlcontroller import RLController
+from flow.core.kernel.vehicle.store import VehicleStateStore
 
 from tests.setup_scripts import ring_road_exp_setup, highway_exp_setup
 
@@ -600,5 +601,83 @@ class TestObservedIDs(unittest.TestCase):
         self.assertCountEqual(env.k.vehicle.get_observed_ids(), ["test_1"])
 
 
+class TestLeaderFollower(unittest.TestCase):
+    """Tests the leaders and followers computed from the sumo leaders."""
+
+    def test_ring(self):
+        vehicles = VehicleParams()
+        vehicles.add(veh_id="test", num_vehicles=10)
+
+        env, _, _ = ring_road_exp_setup(vehicles=vehicles)
+        env.reset()
+        for _ in range(5):
+            env.step(rl_actions=None)
+
+        # on a single-lane ring, every vehicle follows its leader's follower
+        ids = env.k.vehicle.get_ids()
+        leaders = env.k.vehicle.get_leader(ids)
+        followers = env.k.vehicle.get_follower(ids)
+        self.assertCountEqual(leaders, ids)
+        for veh_id, leader in zip(ids, leaders):
+            self.assertEqual(env.k.vehicle.get_follower(leader), veh_id)
+        self.assertListEqual(env.k.vehicle.get_leader(followers), ids)
+        self.assertListEqual(env.k.vehicle.get_headway(ids),
+                             [env.k.vehicle.get_headway(veh_id) for veh_id in ids])
+
+        # a vehicle whose follower is removed keeps no follower
+        env.k.vehicle.set_follower(ids[0], None)
+        self.assertIsNone(env.k.vehicle.get_follower(ids[0]))
+        self.assertEqual(env.k.vehicle.get_follower("unknown", error="err"), "err")
+
+        env.terminate()
+
+
+class TestVehicleStateStore(unittest.TestCase):
+    """Tests the structure-of-arrays store of the vehicle kernel."""
+
+    def setUp(self):
+        self.store = VehicleStateStore({"speed": float, "edge": object},
+                                       capacity=2)
+
+    def test_get_set(self):
+        self.store.add("a")
+        self.store.add("b")
+        self.store.set("speed", ["a", "b"], [1.5, 2.5])
+        self.store.set("edge", "a", "e1")
+
+        self.assertEqual(self.store.get("speed", "a", -1001), 1.5)
+        self.assertEqual(self.store.get("speed", ["b", "a", "c"], -1001),
+                         [2.5, 1.5, -1001])
+        # unset values and unknown vehicles return the error value
+        self.assertEqual(self.store.get("edge", ["a", "b", "c"], ""),
+                         ["e1", "", ""])
+        self.assertEqual(self.store.get("edge", "c", ""), "")
+
+    def test_slot_reuse(self):
+        for veh_id in ["a", "b", "c"]:
+            self.store.add(veh_id)
+        self.store.set("speed", ["a", "b", "c"], [1., 2., 3.])
+        self.assertEqual(len(self.store), 3)
+
+        # the slot of a removed vehicle is reused, with its state unset
+        slot = self.store.slots(["b"])[0]
+        self.store.remove("b")
+        self.assertEqual(self.store.add("d"), slot)
+        self.assertEqual(self.store.get("speed", ["a", "c", "d"], 0),
+                         [1., 3., 0])
+        np.testing.assert_array_equal(self.store.slots(["b", "d"]),
+                                      [-1, slot])
+
+    def test_swap(self):
+        store = VehicleStateStore({"speed": float, "previous_speed": float})
+        store.add("a")
+        store.set("speed", "a", 3.)
+        store.swap("speed", "previous_speed")
+        store.set("speed", "a", 4.)
+        self.assertEqual(store.get("previous_speed", "a", 0), 3.)
+        self.assertEqual(store.get("speed", "a", 0), 4.)
+        self.assertRaises(ValueError, self.store.swap, "speed", "edge")
+
+
 if __name__ == '__main__':
     unittest.main()
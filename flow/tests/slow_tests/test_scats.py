@@ -0,0 +1,128 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import traci
+
+from flow.utils.scats import SCATSPlans
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+SCENARIO = os.path.join(ROOT, "scenarios", "UAV")
+
+os.environ["TEST_FLAG"] = "True"
+
+
+class RecordingArray(np.ndarray):
+    """Array recording the (row, phase) of every DS written into it."""
+
+    events = None
+
+    def __setitem__(self, key, value):
+        if self.events is not None:
+            self.events.append(("ds", int(key[0]), int(key[1])))
+        super().__setitem__(key, value)
+
+
+class RecordingNumpy(object):
+    """numpy, except that the 2D arrays of zeros record the values written into them."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def __getattr__(self, name):
+        return getattr(np, name)
+
+    def zeros(self, shape, dtype=float):
+        array = np.zeros(shape, dtype)
+        if array.ndim == 2:
+            array = array.view(RecordingArray)
+            array.events = self.events
+        return array
+
+
+def recording_plans(events):
+    """Return a SCATSPlans class recording the inputs and outputs of select."""
+
+    class RecordingPlans(SCATSPlans):
+
+        def select(self, ds, current, rows=None):
+            selected = super().select(ds, current, rows)
+            events.append(("select", self, np.array(ds), np.array(current), list(rows), selected))
+            return selected
+
+    return RecordingPlans
+
+
+def reference_ds(plans, row, current, ds):
+    """Return the DS that every plan of a traffic light would have had, computed phase by phase."""
+    candidates = []
+    for col in range(len(plans.program_ids[row])):
+        total = 0
+        for phase in range(min(plans.num_phases[row, current], plans.num_phases[row, col])):
+            total += ds[phase] * plans.durations[row, current, phase] / plans.durations[row, col, phase]
+        candidates.append(total)
+    return candidates
+
+
+@unittest.skipIf("SUMO_HOME" not in os.environ, "SCATS/Imple_SCATS.py requires SUMO_HOME")
+class TestSCATS(unittest.TestCase):
+    """Tests the invariants of the plans selected by the standalone SCATS script."""
+
+    def test_center10_scats(self):
+        sys.path.insert(0, os.path.join(ROOT, "SCATS"))
+        try:
+            import Imple_SCATS
+        finally:
+            sys.path.pop(0)
+
+        events = []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # the scenario is copied, as the detectors write their output next to it
+            scenario = shutil.copytree(SCENARIO, os.path.join(tmp_dir, "UAV"))
+            traci.start(["sumo", "-c", os.path.join(scenario, "center10_SCATS.sumocfg"), "--seed", "7",
+                         "--no-step-log", "--no-warnings"], label="test_scats")
+            try:
+                with mock.patch.object(Imple_SCATS, "np", RecordingNumpy(events)), \
+                        mock.patch.object(Imple_SCATS, "SCATSPlans", recording_plans(events)), \
+                        contextlib.redirect_stdout(io.StringIO()):
+                    Imple_SCATS.run(Imple_SCATS.CONTROLLED_TLS, os.path.join(scenario, "SCATS", "e1.add.xml"))
+            finally:
+                traci.close()
+
+        measured = {}
+        num_cycles = num_ties = 0
+        for event in events:
+            if event[0] == "ds":
+                measured.setdefault(event[1], []).append(event[2])
+                continue
+
+            _, plans, ds, current, rows, selected = event
+            for i, row in enumerate(rows):
+                num_cycles += 1
+                # the DS of the phases of a cycle is indexed from 0, and the
+                # partial phase before the first switch is not measured, so
+                # that even the first cycle measures exactly its phases
+                self.assertEqual(measured.pop(row, []), list(range(plans.num_phases[row, current[i]])))
+
+                candidates = reference_ds(plans, row, current[i], ds[i])
+                best = min(candidates)
+                if np.isclose(best, candidates[current[i]]):
+                    # the current plan is kept on ties
+                    num_ties += sum(np.isclose(best, candidate) for candidate in candidates) > 1
+                    self.assertEqual(selected[i], current[i])
+                else:
+                    self.assertNotEqual(selected[i], current[i])
+                    self.assertAlmostEqual(candidates[selected[i]], best)
+
+        self.assertGreater(num_cycles, 0)
+        self.assertGreater(num_ties, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()